@@ -0,0 +1,311 @@
+'''
+@file       fastcsv.py
+@brief      Reads large CSV files in chunks into NumPy arrays
+@details    Reads a CSV file a block of lines at a time and converts the
+            selected columns of each block to numbers in one NumPy call. A
+            block holding rows that do not convert, or quoted fields, is
+            parsed row by row instead and the bad rows are counted and
+            skipped. Columns are selected by index or, when the file has a
+            header line, by name.
+
+            minmax() and Decimator shrink data for plotting by keeping the
+            smallest and largest value of each bin of samples, so spikes
+            stay visible. read_decimated() reads a file of any size into a
+            fixed number of points.
+@author     Nick De Simone
+@date       10/18/2026
+'''
+
+import csv
+import numpy as np
+
+def _header(line, delimiter):
+    ''' @brief   Splits a line into names if it is a header line
+        @details A line is a header when none of its fields is a number
+        @param   line      First line of the file
+        @param   delimiter Column separator
+        @return  List of names, or None if the line holds data
+    '''
+    fields = [field.strip().strip('"') for field in next(csv.reader([line], delimiter=delimiter))]
+    for field in fields:
+        try:
+            float(field)
+            return None
+        except ValueError:
+            pass
+    return fields
+
+def _parse_rows(lines, index, dtypes, delimiter):
+    ''' @brief   Converts lines one row at a time, skipping bad rows
+        @return  Tuple of a list of arrays, one per column, and the number of
+                 bad rows
+    '''
+    cols = [[] for i in index]
+    bad = 0
+    if '"' in ''.join(lines):
+        rows = csv.reader(lines, delimiter=delimiter)
+    else:
+        rows = (line.split(delimiter) for line in lines)
+    for row in rows:
+        if not row or (len(row) == 1 and not row[0].strip()):
+            continue
+        try:
+            values = [dtypes[j](row[i].strip()) for j, i in enumerate(index)]
+        except (ValueError, IndexError):
+            bad += 1
+            continue
+        for col, value in zip(cols, values):
+            col.append(value)
+    return [np.array(col, dtype=dtypes[j]) for j, col in enumerate(cols)], bad
+
+def _load(lines, index, dtypes, delimiter):
+    ''' @brief   Converts lines with one np.loadtxt call
+        @return  List of arrays, one per column, or None if a row did not
+                 convert
+    '''
+    try:
+        data = np.loadtxt(lines, delimiter=delimiter, usecols=index, ndmin=2, dtype=np.float64)
+    except (ValueError, IndexError):
+        return None
+    return [data[:, j].astype(dtypes[j]) for j in range(len(index))]
+
+def _parse_block(lines, index, dtypes, delimiter, small=512):
+    ''' @brief   Converts a block of lines to one array per column
+        @details Uses one np.loadtxt call for the block. When that fails the
+                 block is split into pieces of small lines, and only the
+                 pieces that fail again are converted row by row.
+        @return  Tuple of a list of arrays, one per column, and the number of
+                 bad rows
+    '''
+    if '"' in ''.join(lines):
+        return _parse_rows(lines, index, dtypes, delimiter)
+    cols = _load(lines, index, dtypes, delimiter)
+    if cols is not None:
+        return cols, 0
+    parts = []
+    bad = 0
+    for k in range(0, len(lines), small):
+        piece = lines[k:k + small]
+        cols = _load(piece, index, dtypes, delimiter)
+        if cols is None:
+            cols, n = _parse_rows(piece, index, dtypes, delimiter)
+            bad += n
+        parts.append(cols)
+    return [np.concatenate([part[j] for part in parts]) for j in range(len(index))], bad
+
+class Reader:
+    ''' @brief   Reads selected columns of a CSV file in chunks
+        @details Iterate over a Reader to get one tuple of arrays per chunk,
+                 or call read() for the whole file
+    '''
+
+    def __init__(self, filename, columns=(0, 1), dtype=float, header='auto',
+                 delimiter=',', chunk=16384, encoding='utf-8'):
+        ''' @brief   Opens nothing yet, only stores the settings
+            @param   filename  File to read
+            @param   columns   Column indexes or header names to read
+            @param   dtype     Type of every column, or a list with one type
+                               per column, for example (float, int)
+            @param   header    True if the first line names the columns,
+                               False if it holds data, 'auto' to decide from
+                               its contents
+            @param   delimiter Column separator
+            @param   chunk     About how many lines are converted at once
+            @param   encoding  Text encoding of the file
+        '''
+        self.filename = filename
+        self.columns = tuple(columns)
+        self.dtypes = list(dtype) if isinstance(dtype, (list, tuple)) else [dtype]*len(self.columns)
+        self.header = header
+        self.delimiter = delimiter
+        self.chunk = chunk
+        self.encoding = encoding
+
+        ## Column names from the header line, or None
+        self.names = None
+
+        ## Number of rows skipped because they did not convert
+        self.bad = 0
+
+        ## Number of rows read
+        self.rows = 0
+
+    def _index(self):
+        ''' @brief   Turns the selected columns into column indexes
+        '''
+        index = []
+        for column in self.columns:
+            if isinstance(column, str):
+                if self.names is None:
+                    raise ValueError(f'column {column!r} selected by name but {self.filename} has no header')
+                index.append(self.names.index(column))
+            else:
+                index.append(column)
+        return index
+
+    def __iter__(self):
+        ''' @brief   Yields a tuple of arrays, one per column, for each chunk
+        '''
+        self.bad = 0
+        self.rows = 0
+        with open(self.filename, 'r', encoding=self.encoding, newline='') as file:
+            first = file.readline()
+            names = _header(first, self.delimiter) if self.header == 'auto' else None
+            if self.header is True or names is not None:
+                self.names = names or [field.strip() for field in first.split(self.delimiter)]
+                first = ''
+            index = self._index()
+            lines = [first] if first.strip() else []
+            while True:
+                # Read whole lines, about chunk of them at a time
+                block = file.read(self.chunk*32)
+                if block:
+                    block += file.readline()
+                lines.extend(block.splitlines(True))
+                if len(lines) >= self.chunk or (lines and not block):
+                    yield self._convert(lines, index)
+                    lines = []
+                if not block:
+                    break
+
+    def _convert(self, lines, index):
+        ''' @brief   Converts one chunk and updates the counts
+        '''
+        cols, bad = _parse_block(lines, index, self.dtypes, self.delimiter)
+        self.bad += bad
+        self.rows += len(cols[0])
+        return tuple(cols)
+
+    def read(self):
+        ''' @brief   Reads the whole file
+            @return  Tuple of arrays, one per selected column
+        '''
+        parts = list(self)
+        if not parts:
+            return tuple(np.empty(0, dtype=t) for t in self.dtypes)
+        return tuple(np.concatenate([part[j] for part in parts]) for j in range(len(self.columns)))
+
+def read(filename, columns=(0, 1), **kwargs):
+    ''' @brief   Reads selected columns of a CSV file
+        @details Takes the same settings as Reader
+        @return  Tuple of the tuple of arrays, one per column, and the number
+                 of bad rows skipped
+    '''
+    reader = Reader(filename, columns, **kwargs)
+    cols = reader.read()
+    return cols, reader.bad
+
+def minmax(x, y, bins):
+    ''' @brief   Keeps the smallest and largest y of each bin of samples
+        @details The samples are split into bins of equal count. Each bin
+                 gives two points in the order they occur, so the plotted
+                 line still goes through every peak.
+        @param   x    Array of x values
+        @param   y    Array of y values
+        @param   bins Number of bins
+        @return  Tuple of the decimated x and y arrays, at most 2*bins long
+    '''
+    n = len(y)
+    if n <= 2*bins:
+        return np.asarray(x), np.asarray(y)
+    size = -(-n // bins)
+    pad = size*bins - n
+    yb = np.concatenate((y, np.full(pad, y[-1]))).reshape(bins, size)
+    rows = np.arange(bins)
+    lo = yb.argmin(axis=1)
+    hi = yb.argmax(axis=1)
+    first = np.minimum(lo, hi)
+    second = np.maximum(lo, hi)
+    keep = np.empty(2*bins, dtype=np.int64)
+    keep[0::2] = rows*size + first
+    keep[1::2] = rows*size + second
+    keep = np.minimum(keep, n - 1)
+    return np.asarray(x)[keep], np.asarray(y)[keep]
+
+class Decimator:
+    ''' @brief   Min/max decimation of data fed in pieces, in fixed memory
+        @details Every bin holds a fixed number of samples. When more than
+                 2*bins bins are full, neighbouring bins are merged and the
+                 bin size doubles, so memory stays bounded however much data
+                 is fed.
+    '''
+
+    def __init__(self, bins=2000):
+        ''' @brief   Creates an empty decimator
+            @param   bins Least number of bins kept once the data fills
+                          them. Up to twice as many are kept, so finish()
+                          returns at most 4*bins points plus one bin of
+                          samples not yet reduced.
+        '''
+        self.bins = bins
+
+        ## Number of samples per bin
+        self.size = 1
+        self._x = np.empty((0, 2))
+        self._y = np.empty((0, 2))
+        self._tail_x = np.empty(0)
+        self._tail_y = np.empty(0)
+
+    def feed(self, x, y):
+        ''' @brief   Adds samples
+            @param   x Array of x values
+            @param   y Array of y values
+        '''
+        x = np.concatenate((self._tail_x, np.asarray(x, dtype=np.float64)))
+        y = np.concatenate((self._tail_y, np.asarray(y, dtype=np.float64)))
+        full = len(y) // self.size*self.size
+        self._tail_x = x[full:]
+        self._tail_y = y[full:]
+        if full:
+            bx, by = self._reduce(x[:full].reshape(-1, self.size), y[:full].reshape(-1, self.size))
+            self._x = np.concatenate((self._x, bx))
+            self._y = np.concatenate((self._y, by))
+        while len(self._y) > 2*self.bins:
+            self._merge()
+
+    @staticmethod
+    def _reduce(xb, yb):
+        ''' @brief   Min and max point of each row of samples, in time order
+        '''
+        rows = np.arange(len(yb))
+        lo = yb.argmin(axis=1)
+        hi = yb.argmax(axis=1)
+        first = np.minimum(lo, hi)
+        second = np.maximum(lo, hi)
+        return (np.column_stack((xb[rows, first], xb[rows, second])),
+                np.column_stack((yb[rows, first], yb[rows, second])))
+
+    def _merge(self):
+        ''' @brief   Merges pairs of bins and doubles the bin size
+        '''
+        n = len(self._y) // 2*2
+        bx, by = self._reduce(self._x[:n].reshape(-1, 4), self._y[:n].reshape(-1, 4))
+        # An odd last bin is kept as it is, its min and max are still right
+        self._x = np.concatenate((bx, self._x[n:]))
+        self._y = np.concatenate((by, self._y[n:]))
+        self.size *= 2
+
+    def finish(self):
+        ''' @brief   Returns the decimated data
+            @return  Tuple of the x and y arrays
+        '''
+        x = np.concatenate((self._x.ravel(), self._tail_x))
+        y = np.concatenate((self._y.ravel(), self._tail_y))
+        return x, y
+
+def read_decimated(filename, columns=(0, 1), bins=2000, **kwargs):
+    ''' @brief   Reads two columns of a file of any size into few points
+        @details Only one chunk of the file and the decimated points are in
+                 memory at a time
+        @param   filename File to read
+        @param   columns  The x and y columns, by index or name
+        @param   bins     Number of min/max bins
+        @return  Tuple of the x and y arrays and the Reader, which holds the
+                 row counts
+    '''
+    reader = Reader(filename, columns, **kwargs)
+    dec = Decimator(bins)
+    for x, y in reader:
+        dec.feed(x, y)
+    x, y = dec.finish()
+    return x, y, reader
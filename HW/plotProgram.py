@@ -6,8 +6,9 @@
 """
 
 from matplotlib import pyplot
+import fastcsv
 
-# x and y int/float values
+# x and y float values read by readFile
 x = []
 y = []
 
@@ -18,103 +19,62 @@ class plotProgram:
     '''   
 
     def __init__(self, filename='eric.csv'):
-        ''' @brief
-            @details
-            @param encoder_num Encoder defined by main as either the 1 or 2 
-                                physical encoder
-            @param req_period Period at which encoder task will run
+        ''' @brief      Stores the file to read
+            @details    Nothing is read until readFile or plotFile is called
+            @param filename Name of the csv file
         '''
-    ## Start/Stop file reading
-    self.rdngFlag = True
+        ## Start/Stop file reading
+        self.rdngFlag = True
+        
+        ## On/Off debug comments
+        self.dbgFlag = True
+        self.filename = filename
+        
+        ## Number of rows skipped by the last read
+        self.bad = 0
     
-    ## On/Off debug comments
-    self.sdbgFlag = True
-    self.runs = 1
-    self.filename = filename
+    def readFile(self, filename=None, columns=(0, 1)):
+        ''' @brief      Reads the x and y columns into arrays
+            @details    Reads the file in large chunks with fastcsv. Rows whose
+                        x or y value is not a number are skipped and counted.
+            @param filename File to read, the one given to the constructor
+                            when left as None
+            @param columns  The x and y columns, by index or by header name
+            @return     Tuple of the x and y arrays
+        '''
+        global x, y
+        if not self.rdngFlag:
+            return x, y
+        (x, y), self.bad = fastcsv.read(filename or self.filename, columns)
+        if self.dbgFlag:
+            print('Read ' + str(len(x)) + ' rows, skipped ' + str(self.bad) + ' bad rows')
+        return x, y
     
-    def readFile(self, filename='eric.csv'):
-        ## Open file for reading, evaluate for int/float data, & add into x&y 
-        with open(self.filename, 'r') as file:
-            
-            # Continue file read until false
-            while self.rdngFlag == True:
-                
-                # Read each row of given file as an individual string
-                row = file.readline()
-               
-                # Strip empty chars from front/back of row, split columns into 
-                # list of individual strings 
-                dataList = row.strip().split(',')
-                
-                # Proceed if 2 or more column values in dataList
-                if len(dataList) > 1:
-                    # Add data to x&y if both values are digits
-                    x_point = dataList[0].strip().split(',')
-                    y_point = dataList[1].strip().split(',')                
-                    
-                    if x_point[0].isdigit() and y_point[0].isdigit():
-                        x.append(float(x_point[0]))                       
-                        y.append(float(y_point[0]))
-                        
-                        
-                if self.dbgFlag:           
-                    print('run = '+ str(runs))
-                    print('row = ' + row)
-                    print('data = ' + str(dataList))
-                    print('x = ' + str(x))
-                    print('y = ' + str(y))
-                    self.runs+=1
-                                
-                # Flag Condn: Empty row in file indicates end of file
-                if row == '':
-                    # Stop file read
-                    rdngFlag = False
-                    
-                else:
-                    pass
+    def plotFile(self, filename=None, columns=(0, 1), bins=2000):
+        ''' @brief      Plots a file of any size
+            @details    Reads the file a chunk at a time and keeps only the
+                        min and max of each bin of samples, so memory stays
+                        bounded however long the file is
+            @param filename File to plot, the one given to the constructor
+                            when left as None
+            @param columns  The x and y columns, by index or by header name
+            @param bins     Number of min/max bins
+        '''
+        xd, yd, reader = fastcsv.read_decimated(filename or self.filename, columns, bins)
+        self.bad = reader.bad
+        if self.dbgFlag:
+            print('Plotting ' + str(len(xd)) + ' of ' + str(reader.rows) + ' rows, skipped '
+                  + str(reader.bad) + ' bad rows')
+        pyplot.plot(xd, yd)
+        pyplot.show()
 
 # Run program
 if __name__ == '__main__':
     
-    ## Open file for reading, evaluate for int/float data, & add into x&y 
-    with open('eric1.csv', 'r') as file:
-        
-        # Continue file read until false
-        while rdngFlag == True:
-            
-            # Read each row of given file as an individual string
-            row = file.readline()
-           
-            # Strip empty chars from front/back of row, split columns into 
-            # list of individual strings 
-            dataList = row.strip().split(',')
-            
-            # Proceed if 2 or more column values in dataList
-            if len(dataList) > 1:
-                # Add data to x&y if both values are digits
-                x_point = dataList[0].strip().split(',')
-                y_point = dataList[1].strip().split(',')                
-                
-                if x_point[0].isdigit() and y_point[0].isdigit():
-                    x.append(x_point[0])                       
-                    y.append(y_point[0])
-                    
-                    
-            if dbgFlag:           
-                print('run = '+ str(runs))
-                print('row = ' + row)
-                print('data = ' + str(dataList))
-                print('x = ' + str(x))
-                print('y = ' + str(y))
-                runs+=1
-                            
-            # Flag Condn: Empty row in file indicates end of file
-            if row == '':
-                # Stop file read
-                rdngFlag = False
-                
-            else:
-                pass
+    ## Read and plot the valid rows of eric1.csv
+    prog = plotProgram('eric1.csv')
+    prog.readFile()
+    prog.plotFile()
 
             
             
@@ -15,7 +15,9 @@
 """
 
 from motor5 import Motor
-from pyb import Pin, ExtInt, I2C
+from pyb import Pin, ExtInt, I2C, Timer
+from array import array
+import micropython
 import time
 
 class BNO055:
@@ -47,6 +49,9 @@ class BNO055:
         self.i2c.mem_write(0x02, self.dev_adr, 0x42)
         self.eulbuf = bytearray(6*[0])
         self.omebuf = bytearray(6*[0])
+        # Gyro registers 0x14-0x19 followed by Euler registers 0x1A-0x1F,
+        # received as signed little-endian 16-bit values
+        self.motbuf = array('h', 6*[0])
         
 
     def change_mode (self, mode):
@@ -86,10 +91,12 @@ class BNO055:
         self.i2c.mem_write(setbuf, self.dev_adr, 0x55)
 
         
-    def get_euler (self):
+    def get_euler (self, buf=None):
         '''!@brief Obtains the euler angles.
             @details Gets the euler angles from the sensors
                      within the BNO055.
+            @param buf Optional preallocated buffer of three values to fill
+                       in place instead of returning a new tuple.
             @return The values for head, roll, and pitch
         '''        
         self.i2c.mem_read(self.eulbuf, self.dev_adr, 0x1A)
@@ -102,12 +109,19 @@ class BNO055:
             roll -= 65536
         if pitch > 32767:
             pitch -= 65536
+        if buf is not None:
+            buf[0] = -head/16
+            buf[1] = -roll/16
+            buf[2] = -pitch/16
+            return buf
         return (-head/16,-roll/16,-pitch/16) #z,y,x
         
-    def get_omega (self):
+    def get_omega (self, buf=None):
         '''!@brief Obtains the angular velocity.
             @details Gets the angular velocity from the sensors
                      within the BNO055. 
+            @param buf Optional preallocated buffer of three values to fill
+                       in place instead of returning a new tuple.
             @return The values of the angular velocities in the x,y,z directions
         '''        
         self.i2c.mem_read(self.omebuf, self.dev_adr, 0x14)
@@ -120,4 +134,104 @@ class BNO055:
             gyr_y -= 65536
         if gyr_z > 32767:
             gyr_z -= 65536
-        return (gyr_x/16,gyr_y/16,gyr_z/16) #x,y,z
\ No newline at end of file
+        if buf is not None:
+            buf[0] = gyr_x/16
+            buf[1] = gyr_y/16
+            buf[2] = gyr_z/16
+            return buf
+        return (gyr_x/16,gyr_y/16,gyr_z/16) #x,y,z
+        
+    def read_motion_into (self, buf):
+        '''!@brief Obtains the euler angles and angular velocities in one read.
+            @details The gyro and Euler registers are one contiguous block, so
+                     a single 12-byte I2C transaction replaces the separate
+                     reads of get_euler() and get_omega(). The bytes are
+                     received straight into a signed 16-bit array, which
+                     decodes them without shifts, sign checks or tuples.
+            @param buf A preallocated buffer of six values. Entries 0-2
+                       receive the euler angles in the order of get_euler()
+                       and entries 3-5 the angular velocities in the order of
+                       get_omega().
+            @return buf
+        '''
+        self.i2c.mem_read(self.motbuf, self.dev_adr, 0x14)
+        m = self.motbuf
+        buf[0] = -m[3]/16
+        buf[1] = -m[4]/16
+        buf[2] = -m[5]/16
+        buf[3] = m[0]/16
+        buf[4] = m[1]/16
+        buf[5] = m[2]/16
+        return buf
+
+class MotionSampler:
+    '''!@brief Timer-driven, double-buffered sampling of the BNO055.
+        @details A hardware timer interrupt schedules a burst read with
+                 micropython.schedule(), since I2C transfers cannot run inside
+                 the interrupt itself. The read fills the back buffer and
+                 then swaps it with the front buffer, so a task that only
+                 copies the front buffer never waits on the I2C bus and never
+                 sees a half-written reading.
+    '''
+
+    def __init__ (self, bno, timer, freq=100):
+        '''!@brief Creates a sampler without starting it.
+            @param bno The BNO055 object to read.
+            @param timer Number of a free hardware timer.
+            @param freq Sample rate in Hz.
+        '''
+        self.bno = bno
+        self._bufs = (array('f', 6*[0]), array('f', 6*[0]))
+        self._back = 0
+        self._pending = False
+        ## Number of completed reads
+        self.seq = 0
+        ## Number of samples skipped because the previous read was still pending
+        self.overruns = 0
+        # Bound methods are made here since the interrupt cannot allocate
+        self._isr_ref = self._isr
+        self._read_ref = self._read
+        self._tim = Timer(timer, freq=freq)
+
+    def start (self):
+        '''!@brief Starts sampling.
+            @details The first read happens half a period from now, so reads
+                     fall between the ticks of a task that calls start() from
+                     its own tick with the same period.
+        '''
+        self._tim.counter(self._tim.period()//2)
+        self._tim.callback(self._isr_ref)
+
+    def stop (self):
+        '''!@brief Stops sampling.
+        '''
+        self._tim.callback(None)
+
+    def _isr (self, tim):
+        '''!@brief Timer interrupt that schedules the next read.
+        '''
+        if self._pending:
+            self.overruns += 1
+            return
+        self._pending = True
+        try:
+            micropython.schedule(self._read_ref, None)
+        except RuntimeError:
+            self._pending = False
+            self.overruns += 1
+
+    def _read (self, arg):
+        '''!@brief Reads into the back buffer, then makes it the front buffer.
+        '''
+        self.bno.read_motion_into(self._bufs[self._back])
+        self._back ^= 1
+        self.seq += 1
+        self._pending = False
+
+    def latest (self):
+        '''!@brief Returns the most recent complete reading.
+            @details The buffer holds the euler angles in entries 0-2 and the
+                     angular velocities in entries 3-5, like read_motion_into().
+                     It stays valid until the next read completes.
+        '''
+        return self._bufs[self._back ^ 1]
\ No newline at end of file
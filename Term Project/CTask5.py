@@ -14,8 +14,11 @@
 @date 03-18-22
 """
    
+from array import array
 from time import ticks_us, ticks_add, ticks_diff
 import micropython
+from TTask import ABF_X, ABF_VX, ABF_Y, ABF_VY, ABF_Z
+from IMUTask import EUL_X, EUL_Y, GYR_X, GYR_Y
 
 ## @brief Creates a state called S0_INIT
 #  @details Variable will be the state 0 for starting the program
@@ -32,6 +35,12 @@ S1_RUN_OUTER = micropython.const (1)
 #
 S2_RUN_INNER = micropython.const (2)
 
+## @brief Creates a state called S3_RUN_BOTH
+#  @details Variable will be the state for running the outer and inner loops
+#           of both axes in the same tick
+#
+S3_RUN_BOTH = micropython.const (3)
+
 def loopFunction(taskName, period, CLC_OUT, CLC_IN, eulAng, wFlag, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, duty, gyrVel, numEul, numGyr, dFlag, DFlag, abfShare, posIdx, velIdx, RefVal, yFlag):
     '''! @brief ClosedLoop function that passes the values for closed loop control.
          @details This function passes the euler angles, angular velocities, gain values, and flags to 
@@ -40,7 +49,7 @@ def loopFunction(taskName, period, CLC_OUT, CLC_IN, eulAng, wFlag, KpShare, KdSh
          @param period Passes in the period at which the code is run.
          @param CLC_OUT A shared parameter that indicates the outer loop reference angle limits.
          @param CLC_IN A shared parameter that indicates the inner loop saturation limits.
-         @param eulAng A tuple containing the angular position for x,y,z.
+         @param eulAng A shares.ArrayShare containing the angular position for z,y,x.
          @param wFlag A shared parameter that indicates if the closed loop control keys have been pressed.
          @param KpShare A shared parameter that indicates the gain value Kp for the inner loop.
          @param KdShare A shared parameter that indicates the gain value Kd for the inner loop.
@@ -49,7 +58,7 @@ def loopFunction(taskName, period, CLC_OUT, CLC_IN, eulAng, wFlag, KpShare, KdSh
          @param KdOut A shared parameter that indicates the gain value Kd for the outer loop.
          @param KiOut A shared parameter that indicates the gain value Ki for the outer loop.
          @param duty A shared parameter that indicates the value of the duty cycle for the motor.
-         @param gyrVel A tuple the angular velocities for x,y,z.
+         @param gyrVel A shares.ArrayShare containing the angular velocities for x,y,z.
          @param numEul An input parameter for angles to determine if we are in the x or y axis for platform.
          @param numGyr An input parameter for angular velocities to determine if we are in the x or y axis for the platform.
          @param dFlag A shared parameter that indicates if the value for duty cycle of motor 1 are wanted.
@@ -101,7 +110,8 @@ def loopFunction(taskName, period, CLC_OUT, CLC_IN, eulAng, wFlag, KpShare, KdSh
                     #Run outer                    
                     CLC_OUT.set_Gain(KpOut.read(), KdOut.read(), KiOut.read())
 #                    CLC.OUT.set_Reference(RefVal.read())
-                    act_sig_out = CLC_OUT.run(abfShare.read()[posIdx], abfShare.read()[velIdx], 0, 0, abfShare.read()[4])
+                    abf = abfShare.read()
+                    act_sig_out = CLC_OUT.run(abf[posIdx], abf[velIdx], 0, 0, abf[ABF_Z])
                     if not yFlag.read():
                         RefVal.write(act_sig_out)
                     state = S2_RUN_INNER
@@ -133,4 +143,153 @@ def loopFunction(taskName, period, CLC_OUT, CLC_IN, eulAng, wFlag, KpShare, KdSh
 
         else:
             
-            yield None
\ No newline at end of file
+            yield None
+
+class Cascade:
+    '''!@brief The outer and inner loops of both platform axes.
+        @details Axis 1 tilts about y to move the ball in x and drives
+                 motor 1, axis 2 tilts about x to move the ball in y and
+                 drives motor 2. Each run() reads the gains, runs the outer
+                 loop and then the inner loop of each axis and writes the
+                 duty cycles. pipelineFunction() runs it as a task and
+                 fastloop.FastLoop from a timer.
+    '''
+
+    def __init__(self, loops, gains, refs, yFlag, duties, schedule=None):
+        '''!@brief Collects the controllers and the shares they use.
+            @param loops Tuple of the outer and inner loop controllers of
+                         axis 1 and then of axis 2.
+            @param gains Tuple of the Kp, Kd and Ki shares of the inner loops
+                         followed by those of the outer loops.
+            @param refs Tuple of the reference angle shares of axis 1 and 2.
+            @param yFlag A shared parameter that is True while the reference
+                         angles are set by the user.
+            @param duties Tuple of the duty shares of motor 1 and 2.
+            @param schedule A gainsched.GainTable scheduling the inner loop gains,
+                            or None to use the inner loop gains as they are.
+                            Each axis looks up its gains from the ball distance
+                            along its own direction and its own tilt, with the
+                            inner loop gains as the gains at the center.
+        '''
+        self.loops = loops
+        self.gains = gains
+        self.refs = refs
+        self.yFlag = yFlag
+        self.duties = duties
+        self.schedule = schedule
+        self._gain = array('f', 3*[0])
+
+    def run(self, abf, eul, gyr):
+        '''!@brief Runs both cascades once and writes the duty cycles.
+            @param abf Ball state indexed by ABF_X, ABF_VX, ABF_Y, ABF_VY and ABF_Z.
+            @param eul Euler angles indexed by EUL_X and EUL_Y.
+            @param gyr Angular velocities indexed by GYR_X and GYR_Y.
+        '''
+        CLC_O1, CLC_I1, CLC_O2, CLC_I2 = self.loops
+        KpShare, KdShare, KiShare, KpOut, KdOut, KiOut = self.gains
+        RefVal1, RefVal2 = self.refs
+        duty1, duty2 = self.duties
+        Kp = KpOut.read()
+        Kd = KdOut.read()
+        Ki = KiOut.read()
+        CLC_O1.set_Gain(Kp, Kd, Ki)
+        CLC_O2.set_Gain(Kp, Kd, Ki)
+        Kp = KpShare.read()
+        Kd = KdShare.read()
+        Ki = KiShare.read()
+        
+        schedule = self.schedule
+        if schedule is None:
+            CLC_I1.set_Gain(Kp, Kd, Ki)
+            CLC_I2.set_Gain(Kp, Kd, Ki)
+        else:
+            gains = self._gain
+            schedule.scale(Kp, Kd, Ki)
+            schedule.lookup(abf[ABF_X], eul[EUL_Y], gains)
+            CLC_I1.set_Gain(gains[0], gains[1], gains[2])
+            schedule.lookup(abf[ABF_Y], eul[EUL_X], gains)
+            CLC_I2.set_Gain(gains[0], gains[1], gains[2])
+        
+        # Outer loops turn the ball state into reference angles
+        act_out1 = CLC_O1.run(abf[ABF_X], abf[ABF_VX], 0, 0, abf[ABF_Z])
+        act_out2 = CLC_O2.run(abf[ABF_Y], abf[ABF_VY], 0, 0, abf[ABF_Z])
+        if not self.yFlag.read():
+            RefVal1.write(act_out1)
+            RefVal2.write(act_out2)
+        
+        # Inner loops turn the reference angles into duty cycles
+        duty1.write(CLC_I1.run(eul[EUL_Y], gyr[GYR_Y], RefVal1.read(), 1, 1))
+        duty2.write(CLC_I2.run(eul[EUL_X], gyr[GYR_X], RefVal2.read(), 1, 1))
+
+def pipelineFunction(taskName, period, CLC_O1, CLC_I1, CLC_O2, CLC_I2, eulAng, gyrVel, abfShare, wFlag, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, duty1, duty2, RefVal1, RefVal2, yFlag, dFlag, DFlag, schedule=None):
+    '''! @brief Runs the outer and inner loops of both platform axes in one task.
+         @details Replaces the two loopFunction() tasks. Every tick the gains,
+                  the ball filter output and the IMU state are read once, then
+                  a Cascade runs the outer loop and the inner loop of each axis
+                  back to back. Both loops therefore run at the task rate
+                  instead of every other tick.
+         @param taskName Names the task so that multiple tasks can be run simultaneously.
+         @param period Passes in the period at which the code is run.
+         @param CLC_O1 Outer loop controller of axis 1.
+         @param CLC_I1 Inner loop controller of axis 1.
+         @param CLC_O2 Outer loop controller of axis 2.
+         @param CLC_I2 Inner loop controller of axis 2.
+         @param eulAng A shares.ArrayShare containing the angular position for z,y,x.
+         @param gyrVel A shares.ArrayShare containing the angular velocities for x,y,z.
+         @param abfShare A shares.ArrayShare containing the filtered ball position and velocity.
+         @param wFlag A shared parameter that indicates if the closed loop control keys have been pressed.
+         @param KpShare A shared parameter that indicates the gain value Kp for the inner loops.
+         @param KdShare A shared parameter that indicates the gain value Kd for the inner loops.
+         @param KiShare A shared parameter that indicates the gain value Ki for the inner loops.
+         @param KpOut A shared parameter that indicates the gain value Kp for the outer loops.
+         @param KdOut A shared parameter that indicates the gain value Kd for the outer loops.
+         @param KiOut A shared parameter that indicates the gain value Ki for the outer loops.
+         @param duty1 A shared parameter that indicates the duty cycle of motor 1.
+         @param duty2 A shared parameter that indicates the duty cycle of motor 2.
+         @param RefVal1 A shared parameter holding the reference angle of axis 1.
+         @param RefVal2 A shared parameter holding the reference angle of axis 2.
+         @param yFlag A shared parameter that indicates if the set motor angle control keys have been pressed.
+         @param dFlag A shared parameter that indicates if the value for duty cycle of motor 1 are wanted.
+         @param DFlag A shared parameter that indicates if the value for duty cycle of motor 2 are wanted.
+         @param schedule A gainsched.GainTable scheduling the inner loop gains, or None
+                         to use the inner loop gains as they are, see Cascade.
+    '''
+    
+    state = S0_INIT
+    
+    start_time = ticks_us()
+    
+    next_time = ticks_add(start_time, period)
+    
+    cascade = Cascade((CLC_O1, CLC_I1, CLC_O2, CLC_I2), (KpShare, KdShare, KiShare, KpOut, KdOut, KiOut),
+                      (RefVal1, RefVal2), yFlag, (duty1, duty2), schedule)
+     
+    while True:
+    
+        current_time = ticks_us()
+        if ticks_diff(current_time, next_time) >= 0:
+            
+            if state == S0_INIT:
+                state = S3_RUN_BOTH
+                
+            elif state == S3_RUN_BOTH:
+                if wFlag.read():
+                    cascade.run(abfShare.read(), eulAng.read(), gyrVel.read())
+                    
+                    if dFlag.read():
+                        print(f'{taskName} 1: {duty1.read()}')
+                        dFlag.write(False)
+                    if DFlag.read():
+                        print(f'{taskName} 2: {duty2.read()}')
+                        DFlag.write(False)
+                
+            else:
+                pass
+            
+            next_time = ticks_add(next_time, period)
+                
+            yield state
+
+        else:
+            
+            yield None
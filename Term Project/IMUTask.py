@@ -18,6 +18,8 @@ from time import ticks_us, ticks_ms, ticks_add, ticks_diff
 import micropython
 import os
 import gc
+from array import array
+from logwriter import LogWriter
 
 ## @brief Creates a state called S0_INIT
 #  @details Variable will be the state 0 for starting the program
@@ -35,7 +37,53 @@ S3_SAVE_CAL_COEFFS = micropython.const (3)
 
 S4_WRITE_CAL_COEFFS = micropython.const (4)
 
-def bnoFunction(taskName, period, calStat, bno_obj, eulAng, gyrVel):
+## @brief Creates a state called S5_HANDOFF
+#  @details Variable will be the state 5 once the IMU is read by a fastloop.FastLoop
+#
+S5_HANDOFF = micropython.const (5)
+
+## @brief Creates a state called S6_PROMPT
+#  @details Variable will be the state 6 for printing the calibration instructions
+#
+S6_PROMPT = micropython.const (6)
+
+## @brief Calibration instructions, printed one line per second
+#
+CAL_INFO = ('Instructions: ',
+            ' - Rotate/tilt the platform to calibrate',
+            ' - [mag: 3, acc: 3, gyr: 3, sys: 3] = Calibration Complete',
+            '\n')
+
+## @brief Countdown printed one line per second before the calibration
+#
+GET_READY = ('Get ready', 'Get set', 'Calibrate', '\n')
+
+## @brief Index of the heading in the eulAng share
+#  @details The Euler angles are stored as rotations about the z, y, x axes
+#
+EUL_Z = micropython.const(0)
+
+## @brief Index of the rotation about the y axis in the eulAng share
+#
+EUL_Y = micropython.const(1)
+
+## @brief Index of the rotation about the x axis in the eulAng share
+#
+EUL_X = micropython.const(2)
+
+## @brief Index of the angular velocity about the x axis in the gyrVel share
+#
+GYR_X = micropython.const(0)
+
+## @brief Index of the angular velocity about the y axis in the gyrVel share
+#
+GYR_Y = micropython.const(1)
+
+## @brief Index of the angular velocity about the z axis in the gyrVel share
+#
+GYR_Z = micropython.const(2)
+
+def bnoFunction(taskName, period, calStat, bno_obj, eulAng, gyrVel, sampler=None, handoff=None):
     '''! @brief BNO function that passes the calibration, euler angles, and angular velocities.
          @details This function passes the values of calibration coeffiecients, 
                   euler angles, and angular velocities to the method of set_cal_coeff. 
@@ -43,8 +91,14 @@ def bnoFunction(taskName, period, calStat, bno_obj, eulAng, gyrVel):
          @param period Passes in the period at which the code is run.
          @param calStat A tuple containing mag, accel, gyro, and system values
          @param bno_obj Passes in an object of the BNO055 driver
-         @param eulAng A shared parameter that contains the euler angles
-         @param gyrVel A shared parameter that contains the angular velocities
+         @param eulAng A shares.ArrayShare that contains the euler angles
+         @param gyrVel A shares.ArrayShare that contains the angular velocities
+         @param sampler An optional BNO055.MotionSampler. When given, the IMU is
+                        read by a timer interrupt and this task only publishes
+                        the latest reading instead of reading the IMU itself.
+         @param handoff A shared parameter set True once the calibration is done, or None.
+                        When given, the task stops reading the IMU after the
+                        calibration and leaves it to a fastloop.FastLoop.
     '''
     
     ## @brief creates a variable called state
@@ -68,11 +122,26 @@ def bnoFunction(taskName, period, calStat, bno_obj, eulAng, gyrVel):
     #
     BNO = bno_obj
     
+    ## @brief Buffer receiving the euler angles and angular velocities
+    #  @details Filled in place by BNO055.read_motion_into() every period
+    #           when the IMU is not sampled by a timer
+    #
+    motionBuf = array('f', 6*[0])
+    
+    sampling = False
+    
     filename = "IMU_cal_coeffs.txt"
     
-    filestring = ''
+    prompts = CAL_INFO + GET_READY
+    
+    p = 0
     
-    n = 0
+    promptTime = 0
+    
+    ## @brief Calibration status printed last
+    #  @details The status is only printed when it changes
+    #
+    shown = None
      
     while True:
     
@@ -95,50 +164,60 @@ def bnoFunction(taskName, period, calStat, bno_obj, eulAng, gyrVel):
                     print('--- IMU Calibration Interface ---')
                     print('Calibration needed...')
                     BNO.change_mode(12)
-                    calInfo()
-                    getReady()
-                    state = S2_CALIB
+                    p = 0
+                    promptTime = ticks_ms()
+                    state = S6_PROMPT
                                 
                 
             elif state == S1_RUN:                
-                eulAng.write(BNO.get_euler())
-                head, pitch, roll = eulAng.read()
-#                print('head: ' +str(head), 'pitch: ' +str(pitch), 'roll: ' +str(roll))
-                gyrVel.write(BNO.get_omega())
-                gyr_x,gyr_y,gyr_z = gyrVel.read()
-#                print('ang_vel_x: ' +str(gyr_x), 'ang_vel_y: ' +str(gyr_y), 'ang_vel_z: ' +str(gyr_z))
+                if sampler is None:
+                    # One burst read of the gyro and Euler registers, decoded
+                    # in place and copied into the shares without tuples
+                    motion = BNO.read_motion_into(motionBuf)
+                elif not sampling:
+                    sampler.start()
+                    sampling = True
+                    motion = BNO.read_motion_into(motionBuf)
+                else:
+                    # The timer has already read the IMU, publish its latest reading
+                    motion = sampler.latest()
+                eul = eulAng.begin_write()
+                eul[0] = motion[0]
+                eul[1] = motion[1]
+                eul[2] = motion[2]
+                eulAng.end_write()
+                gyr = gyrVel.begin_write()
+                gyr[0] = motion[3]
+                gyr[1] = motion[4]
+                gyr[2] = motion[5]
+                gyrVel.end_write()
                 
                 
                     
             elif state == S2_CALIB:
                 calStat.write(BNO.get_cal_status())
                 mag, acc, gyr, sys = calStat.read()
-                print('mag: ' +str(mag), 'acc: ' +str(acc), 'gyr: ' +str(gyr), 
-                      'sys: ' +str(sys))
+                if (mag,acc,gyr,sys) != shown:
+                    print('mag: ' +str(mag), 'acc: ' +str(acc), 'gyr: ' +str(gyr), 
+                          'sys: ' +str(sys))
+                    shown = (mag,acc,gyr,sys)
                 if (mag,acc,gyr,sys) == (3,3,3,3):  
                     print('--- End Calibration ---')
                     
                     state = S3_SAVE_CAL_COEFFS
                     
             elif state == S3_SAVE_CAL_COEFFS:    
-                with open(filename, 'w') as f:
-                    # Perform manual calibration
-                    buf = bytearray(22*[0])
-                    gc.collect()
-                    cal_co_barr = BNO.get_cal_coeff(buf)
-                    print(cal_co_barr)
-                    
-                    for byte in cal_co_barr:
-                        filestring += hex(byte)
-                        filestring += ','
-                        n += 1
-                                                   
-                    if n == 22:
-                        print(filestring)
-                        print('writing calibration coeffs to file')
-                        filestring = filestring[:-1]
-                        f.write(filestring)
-                        state = S1_RUN
+                # Perform manual calibration
+                buf = bytearray(22*[0])
+                gc.collect()
+                cal_co_barr = BNO.get_cal_coeff(buf)
+                print(cal_co_barr)
+                print('writing calibration coeffs to file')
+                # Written as decimal integers, which S4_WRITE_CAL_COEFFS reads back
+                log = LogWriter(filename, 'w', 512)
+                log.write_row(cal_co_barr, 0, '\n')
+                log.close()
+                state = S1_RUN if handoff is None else S5_HANDOFF
                         
                         
             elif state == S4_WRITE_CAL_COEFFS:
@@ -152,11 +231,25 @@ def bnoFunction(taskName, period, calStat, bno_obj, eulAng, gyrVel):
                     
                     BNO.change_mode(0)
                     BNO.set_cal_coeff(cal_values)
-                state = S1_RUN
+                state = S1_RUN if handoff is None else S5_HANDOFF
                 
                 BNO.change_mode(12)
                     
             
+            elif state == S6_PROMPT:
+                # One line per second without holding up the other tasks
+                if ticks_diff(ticks_ms(), promptTime) > 1000:
+                    print(prompts[p])
+                    p += 1
+                    promptTime = ticks_ms()
+                    if p == len(prompts):
+                        state = S2_CALIB
+                
+            elif state == S5_HANDOFF:
+                # The sensor is read by the fast loop from now on
+                if not handoff.read():
+                    handoff.write(True)
+                
             else:
                 pass
             
@@ -167,48 +260,3 @@ def bnoFunction(taskName, period, calStat, bno_obj, eulAng, gyrVel):
         else:
             
             yield None
-            
-
-def calInfo():
-    '''
-    @brief Prints IMU calibration instructions
-    @details Prints three strings in a 3 second interval in order to inform the user
-
-    '''
-    start_time = ticks_ms()
-    cdn = 3 # countdown number
-    while cdn >= 0:
-        round_time = ticks_ms()
-        if ((ticks_diff(round_time,start_time)) > 1000):
-            if cdn == 3:
-                print('Instructions: ')
-            elif cdn == 2:
-                print(' - Rotate/tilt the platform to calibrate')
-            elif cdn == 1:
-                print(' - [mag: 3, acc: 3, gyr: 3, sys: 3] = Calibration Complete')
-            elif cdn == 0:
-                print('\n')
-            start_time = ticks_ms()
-            cdn -= 1
-
-def getReady():
-    '''
-    @brief Gives three ready statements as a buffer before calibration
-    @details Prints three strings in a 3 second interval in order to inform the user
-
-    '''
-    start_time = ticks_ms()
-    cdn = 3 # countdown number
-    while cdn >= 0:
-        round_time = ticks_ms()
-        if ((ticks_diff(round_time,start_time)) > 1000):
-            if cdn == 3:
-                print('Get ready')
-            elif cdn == 2:
-                print('Get set')
-            elif cdn == 1:
-                print('Calibrate')
-            elif cdn == 0:
-                print('\n')
-            start_time = ticks_ms()
-            cdn -= 1
\ No newline at end of file
@@ -83,4 +83,50 @@ def motorFunction(taskName, period, motor, dutyVal):
 
         else:
             
-            yield None
\ No newline at end of file
+            yield None
+
+def motorsFunction(taskName, period, motors, duties):
+    '''! @brief Generator function that passes the duty cycles to several motors.
+         @details One task drives every motor in turn, in place of one
+                  motorFunction() task per motor. Motor.set_duty() does
+                  nothing for a motor whose duty has not changed. The
+                  duties stay separate shares rather than one
+                  shares.ArrayShare, since the user task, the controllers,
+                  the telemetry and the flight recorder all read or write
+                  duty1 and duty2 on their own.
+         @param taskName Names the task so that multiple tasks can be run simultaneously.
+         @param period Passes in the period at which the code is run.
+         @param motors A tuple of the motor5.Motor objects to drive.
+         @param duties A tuple of shared parameters holding the duty cycle of each motor.
+    '''
+    
+    state = S0_INIT
+    
+    start_time = ticks_us()
+    
+    next_time = ticks_add(start_time, period)
+    
+    pairs = tuple(zip(motors, duties))
+     
+    while True:
+    
+        current_time = ticks_us()
+        if ticks_diff(current_time, next_time) >= 0:
+            
+            if state == S0_INIT:
+                state = S1_WAIT                
+                
+            elif state == S1_WAIT:
+                for motor, duty in pairs:
+                    motor.set_duty(duty.read())
+                    
+            else:
+                pass
+            
+            next_time = ticks_add(next_time, period)
+                
+            yield state
+
+        else:
+            
+            yield None
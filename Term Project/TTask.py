@@ -18,7 +18,10 @@ from time import ticks_us, ticks_ms, ticks_add, ticks_diff
 import micropython
 import os
 import gc
+from array import array
 from ulab import numpy as np
+from logwriter import LogWriter
+from estimator import AlphaBeta, EST_X, EST_VX, EST_Y, EST_VY
 
 ## @brief Creates a state called S0_INIT
 #  @details Variable will be the state 0 for starting the program
@@ -45,6 +48,16 @@ S3_SAVE_CAL_COEFFS = micropython.const (3)
 #
 S4_WRITE_CAL_COEFFS = micropython.const (4)
 
+## @brief Creates a state called S5_HANDOFF
+#  @details Variable will be the state 5 once the touchpad is read by a fastloop.FastLoop
+#
+S5_HANDOFF = micropython.const (5)
+
+## @brief Creates a state called S6_PROMPT
+#  @details Variable will be the state 6 for printing the calibration instructions
+#
+S6_PROMPT = micropython.const (6)
+
 ## @brief Creates a variable for the center of the pad
 #  @details Variable will be the location in the center used for calibration
 #
@@ -70,17 +83,169 @@ CAL_BOTTOM_LEFT = micropython.const(3)
 #
 CAL_BOTTOM_RIGHT = micropython.const(4)
 
-def TouchpadFunction(taskName, period, Pos, touch, alpha, betaf, abfShare):
+## @brief Number of touchpad readings averaged for each calibration point
+#  @details One reading is taken per period, so the panel is held for
+#           CAL_SAMPLES periods at each point.
+#
+CAL_SAMPLES = micropython.const(10)
+
+## @brief Calibration step waiting for the panel to be touched
+#
+CAL_WAIT_TOUCH = micropython.const(0)
+
+## @brief Calibration step collecting the readings of a calibration point
+#
+CAL_SAMPLE = micropython.const(1)
+
+## @brief Calibration step waiting for the panel to be released
+#
+CAL_WAIT_RELEASE = micropython.const(2)
+
+## @brief Prompts for the calibration points, indexed by CAL_CENTER to CAL_BOTTOM_RIGHT
+#
+CAL_PROMPTS = ('First touch the panel in the center.',
+               'Touch the panel in the top left corner',
+               'Touch the panel in the top right corner',
+               'Touch the panel in the bottom left corner',
+               'Touch the panel in the bottom right corner')
+
+## @brief Calibration instructions, printed one line per second
+#
+CAL_INFO = ('Instructions: ',
+            ' - Touch the panel as instructed on screen',
+            ' - 5 locations in total',
+            ' - Hold each touch until asked to release it',
+            '\n')
+
+## @brief Countdown printed one line per second before the calibration
+#
+GET_READY = ('Get ready', 'Get set', 'Calibrate', '\n')
+
+## @brief Index of the filtered x position in the abfShare share
+#
+ABF_X = micropython.const(0)
+
+## @brief Index of the filtered x velocity in the abfShare share
+#
+ABF_VX = micropython.const(1)
+
+## @brief Index of the filtered y position in the abfShare share
+#
+ABF_Y = micropython.const(2)
+
+## @brief Index of the filtered y velocity in the abfShare share
+#
+ABF_VY = micropython.const(3)
+
+## @brief Index of the ball contact flag in the abfShare share
+#
+ABF_Z = micropython.const(4)
+
+## @brief Number of readings in a row without contact after which the ball is lost
+#
+LOST_COUNT = micropython.const(10)
+
+class BallTracker:
+    '''!@brief Follows the ball contact and feeds the touchpad readings to an estimator.
+        @details Short gaps in contact are bridged by holding the estimate.
+                 Once more than LOST_COUNT readings in a row have no contact
+                 the estimator is reset to the center and the contact flag
+                 is cleared. The first reading with contact after at least
+                 LOST_COUNT readings without contact restarts the estimator
+                 at that reading and sets the contact flag.
+    '''
+
+    def __init__(self, est):
+        '''!@brief Creates a tracker for a panel without contact.
+            @param est An estimator from the estimator module.
+        '''
+        self.est = est
+        ## Number of readings without contact in a row
+        self.count = 0
+        ## Contact flag published at ABF_Z, 1 while the ball is on the panel
+        self.flag = 0
+
+    def update(self, x, y, z, eul=None):
+        '''!@brief Takes one touchpad reading.
+            @param x Position in mm along x.
+            @param y Position in mm along y.
+            @param z 1 if the panel is touched, 0 otherwise.
+            @param eul Euler angles passed to the estimator, or None.
+        '''
+        if z:
+            if self.count != 0:
+                if self.count >= LOST_COUNT:
+                    self.est.reset(x, y)
+                    self.flag = 1
+                self.count = 0
+            self.est.update(x, y, eul)
+        else:
+            # Hold the estimate through short gaps in contact
+            self.count += 1
+            if self.count > LOST_COUNT:
+                self.est.reset(0, 0)
+                self.flag = 0
+
+    def publish(self, abfShare):
+        '''!@brief Writes the estimate and the contact flag to a share.
+            @details The x position and velocity are negated, as the
+                     controllers expect.
+            @param abfShare A shares.ArrayShare indexed by ABF_X, ABF_VX,
+                            ABF_Y, ABF_VY and ABF_Z.
+        '''
+        xyv = self.est.state
+        abf = abfShare.begin_write()
+        abf[ABF_X] = -xyv[EST_X]
+        abf[ABF_VX] = -xyv[EST_VX]
+        abf[ABF_Y] = xyv[EST_Y]
+        abf[ABF_VY] = xyv[EST_VY]
+        abf[ABF_Z] = self.flag
+        abfShare.end_write()
+
+def setCalCoeff(touch, Kxx, Kxy, xo, Kyx, Kyy, yo):
+    '''! @brief Sets the touchpad calibration, in float if fixed point cannot hold it.
+         @details A fixed point touchpad refuses gains too large for
+                  fixedpoint.affine2(). The touchpad then computes its
+                  positions in float, so a large calibration, or a bad saved
+                  one, does not stop the firmware.
+         @param touch An object of the touchpad driver
+         @param Kxx Calibration gain of x on the x reading
+         @param Kxy Calibration gain of x on the y reading
+         @param xo Calibration offset of x
+         @param Kyx Calibration gain of y on the x reading
+         @param Kyy Calibration gain of y on the y reading
+         @param yo Calibration offset of y
+    '''
+    try:
+        touch.set_cal_coeff(Kxx, Kxy, xo, Kyx, Kyy, yo)
+    except ValueError as err:
+        print(err)
+        print('Using float touchpad positions')
+        touch.fixed = False
+        touch.set_cal_coeff(Kxx, Kxy, xo, Kyx, Kyy, yo)
+
+def TouchpadFunction(taskName, period, Pos, touch, alpha, betaf, abfShare, est=None, eulAng=None, handoff=None, tracker=None):
     '''! @brief Touchpad function that passes values for the balls positions and velocities.
          @details This function passes the values of the balls positions and velocities
                   on the touch pad with respect to the center of the pad. 
          @param taskName Names the task so that multiple tasks can be run simultaneously.
          @param period Passes in the period at which the code is run.
-         @param Pos A tuple containing positions of the x,y,z direction.
+         @param Pos A shares.ArrayShare containing positions of the x,y,z direction.
          @param touch An object of the touchpad driver
          @param alpha A value for the alpha variable of the filtering
          @param betaf A value for the betaf variable of the filtering
-         @param abfshare A shared parameter that indicates the position and velocities of the ball for filtering.
+         @param abfShare A shares.ArrayShare holding the filtered position and velocities of the ball,
+                         indexed by ABF_X, ABF_VX, ABF_Y, ABF_VY and ABF_Z.
+         @param est An estimator from the estimator module that filters the readings, or None
+                    for an estimator.AlphaBeta filter with alpha and betaf.
+         @param eulAng A shares.ArrayShare with the Euler angles from the IMU, passed to the
+                       estimator, or None if the estimator does not use them.
+         @param handoff A shared parameter set True once the calibration is done, or None.
+                        When given, the task stops reading the touchpad after the
+                        calibration and leaves it to a fastloop.FastLoop.
+         @param tracker A BallTracker to feed, or None to make one around est. Passing
+                        the tracker of a fastloop.FastLoop carries the contact state
+                        over when the touchpad is handed off.
     '''
     
     ## @brief creates a variable called state
@@ -101,29 +266,37 @@ def TouchpadFunction(taskName, period, Pos, touch, alpha, betaf, abfShare):
     
     filename = "Touchpad_cal_coeffs.txt"
     
-    filestring = ''
-    
-    n = 0
+    if tracker is None:
+        if est is None:
+            est = AlphaBeta(alpha, betaf, period)
+        tracker = BallTracker(est)
     
-    vxk = 0
+    c = CAL_CENTER
     
-    vyk = 0
+    ## @brief Step of the calibration of the current point
+    #  @details One of CAL_WAIT_TOUCH, CAL_SAMPLE and CAL_WAIT_RELEASE
+    #
+    step = CAL_WAIT_TOUCH
     
-    zc = 0
+    ## @brief Buffer receiving each touchpad reading during calibration
+    #
+    calBuf = array('f', 3*[0])
     
-    zf = 0
+    ## @brief Readings of the current calibration point as x, y pairs
+    #
+    calSamples = array('f', 2*CAL_SAMPLES*[0])
     
-    xk = 0
-    yk = 0
+    n = 0
     
-    #share
-    alpha = alpha
+    ## @brief Averaged x, y reading of each calibration point
+    #
+    calPts = array('f', 2*(CAL_BOTTOM_RIGHT + 1)*[0])
     
-    betaf = betaf
+    prompts = CAL_INFO + GET_READY
     
-    c = CAL_CENTER
+    p = 0
     
-    t = 0
+    promptTime = 0
      
     while True:
     
@@ -147,55 +320,19 @@ def TouchpadFunction(taskName, period, Pos, touch, alpha, betaf, abfShare):
                     print('To calibrate the touch panel, touch the panel'
                           'in the specified locations with something pointy (like' 
                           'a pencil).  There will be 5 locations in total.')
-                    print('First touch the panel in the center.')
-                    state = S2_CALIB
+                    # Readings are fitted without any previous calibration
+                    touch.set_cal_coeff(1, 0, 0, 0, 1, 0)
+                    p = 0
+                    promptTime = ticks_ms()
+                    state = S6_PROMPT
                                 
                 
             elif state == S1_RUN:
-                abfShare.write((-xk,-vxk,yk,vyk,zf))
-                Ts = ticks_diff(current_time, t)*(1E-6)
-                t = ticks_us()
-                Pos.write(touch.XYZ_Scan())
+                tracker.publish(abfShare)
+                touch.scan_into(Pos.begin_write())
+                Pos.end_write()
                 x, y, z = Pos.read()
-                if z == 0:
-                    xk += 0
-                    yk += 0
-                    vxk += 0
-                    vyk += 0
-                    zc+=1
-                    zf += 0
-                    if zc > 10:
-                        xk = 0
-                        yk = 0
-                        vxk = 0
-                        vyk = 0
-                        zf = 0
-                    #print(f'xk: {xk}, vxk: {vxk}, yk: {yk}, vyk: {vyk}, 0')
-                #computation loop
-                elif z == 1:
-                    
-                    if zc != 0:
-                        if zc >= 10:
-                            xk = x
-                            yk = y
-                            zf = 1
-                        zc = 0
-                        
-                    xk1 = xk + alpha*(x-xk)+Ts*vxk
-                    vxk1 = vxk + (betaf/Ts)*(x-xk)
-                    
-                    yk1 = yk + alpha*(y-yk)+Ts*vyk
-                    vyk1 = vyk + (betaf/Ts)*(y-yk)
-                    #after computing, update for next iteration
-                    xk = xk1
-                    vxk = vxk1
-                    
-                    yk = yk1
-                    vyk = vyk1
-                    #print(f'xk: {xk}, vxk: {vxk}, yk: {yk}, vyk: {vyk}')
-                
-                    
-            
+                tracker.update(x, y, z, eulAng.read() if eulAng is not None else None)
                 
                 #print('x: ' + str(x), 'y: ' + str(y), 'z: ' + str(z))
                 
@@ -209,52 +346,41 @@ def TouchpadFunction(taskName, period, Pos, touch, alpha, betaf, abfShare):
                 
                     
             elif state == S2_CALIB:
-                
-                if c == CAL_CENTER:
-                    xC,yC,zC = touch.XYZ_Scan()
-                    if zC == 1:
-                        xd,yd,zF = touch.XYZ_Scan()
-                        if zF == 0:
-                            print('Touch the panel in the top left corner')
-                            c = CAL_TOP_LEFT
-                            
-                        
-                elif c == CAL_TOP_LEFT:
-                    xTL, yTL, zTL = touch.XYZ_Scan()
-                    if zTL == 1:
-                        xd,yd,zF = touch.XYZ_Scan()
-                        if zF == 0:
-                            print('Touch the panel in the top right corner')
-                            c = CAL_TOP_RIGHT
-                            
-                        
-                elif c == CAL_TOP_RIGHT:
-                    xTR, yTR, zTR = touch.XYZ_Scan()
-                    if zTR == 1:
-                        xd,yd,zF = touch.XYZ_Scan()
-                        if zF == 0:                            
-                            print('Touch the panel in the bottom left corner')
-                            c = CAL_BOTTOM_LEFT
-                        
-                elif c == CAL_BOTTOM_LEFT:
-                    xBL, yBL, zBL = touch.XYZ_Scan()
-                    if zBL == 1:
-                        xd,yd,zF = touch.XYZ_Scan()
-                        if zF == 0:                            
-                            print('Touch the panel in the bottom right corner')
-                            c = CAL_BOTTOM_RIGHT
-                        
-                elif c == CAL_BOTTOM_RIGHT:
-                    xBR, yBR, zBR = touch.XYZ_Scan()
-                    if zBR == 1:
-                        xd,yd,zF = touch.XYZ_Scan()
-                        if zF == 0:
+                # One reading per period so the other tasks keep running
+                pos = touch.scan_into(calBuf)
+                if step == CAL_WAIT_RELEASE:
+                    if not pos[2]:
+                        c += 1
+                        if c > CAL_BOTTOM_RIGHT:
                             print('Computing calibration coefficients')
                             c = CAL_CENTER
                             state = S3_SAVE_CAL_COEFFS
+                        else:
+                            print(CAL_PROMPTS[c])
+                            step = CAL_WAIT_TOUCH
+                elif not pos[2]:
+                    # Released too early, the point is taken again
+                    n = 0
+                    step = CAL_WAIT_TOUCH
+                else:
+                    calSamples[2*n] = pos[0]
+                    calSamples[2*n + 1] = pos[1]
+                    n += 1
+                    step = CAL_SAMPLE
+                    if n == CAL_SAMPLES:
+                        x = 0
+                        y = 0
+                        for k in range(CAL_SAMPLES):
+                            x += calSamples[2*k]
+                            y += calSamples[2*k + 1]
+                        calPts[2*c] = x/CAL_SAMPLES
+                        calPts[2*c + 1] = y/CAL_SAMPLES
+                        n = 0
+                        print('Release the panel')
+                        step = CAL_WAIT_RELEASE
                     
             elif state == S3_SAVE_CAL_COEFFS:
-                X = np.array([[xC, yC, 1], [xTL, yTL, 1], [xTR, yTR, 1], [xBL, yBL, 1], [xBR, yBR, 1]])
+                X = np.array([[calPts[2*k], calPts[2*k + 1], 1] for k in range(CAL_BOTTOM_RIGHT + 1)])
                 print(X)
                 X_t = X.transpose()
                 Y = np.array([[0, 0], [-80, 40], [80, 40], [-80, -40], [80, -40]])
@@ -277,25 +403,15 @@ def TouchpadFunction(taskName, period, Pos, touch, alpha, betaf, abfShare):
                 yo = beta[2][1]
                 
                 #set the calibration coefficients
-                touch.set_cal_coeff(Kxx, Kxy, xo, Kyx, Kyy, yo)
+                setCalCoeff(touch, Kxx, Kxy, xo, Kyx, Kyy, yo)
                 
-                with open(filename, 'w') as f:
-                    # Perform manual calibration
-                    buf = [Kxx, Kxy, xo, Kyx, Kyy, yo]
-                    gc.collect()
-                    
-                    for element in buf:
-                        filestring += str(element)
-                        filestring += ','
-                        n += 1
-                                                   
-                    if n == 6:
-                        print(filestring)
-                        print('writing to file')
-                        filestring = filestring[:-1]
-                        f.write(filestring)
-                        state = S1_RUN
-                        t = ticks_us()
+                # Seven decimals keep offsets up to 107 mm in fixed point
+                gc.collect()
+                log = LogWriter(filename, 'w', 512)
+                print(str(log.write_row((Kxx, Kxy, xo, Kyx, Kyy, yo), 7, ''), 'utf-8'))
+                print('writing to file')
+                log.close()
+                state = S1_RUN if handoff is None else S5_HANDOFF
                         
             elif state == S4_WRITE_CAL_COEFFS:
                     
@@ -315,9 +431,26 @@ def TouchpadFunction(taskName, period, Pos, touch, alpha, betaf, abfShare):
                     Kyy = cal_values[4]
                     yo = cal_values[5]
                     
-                    touch.set_cal_coeff(Kxx, Kxy, xo, Kyx, Kyy, yo)
-                state = S1_RUN
-                t = ticks_us()
+                    setCalCoeff(touch, Kxx, Kxy, xo, Kyx, Kyy, yo)
+                state = S1_RUN if handoff is None else S5_HANDOFF
+                
+            elif state == S6_PROMPT:
+                # One line per second without holding up the other tasks
+                if ticks_diff(ticks_ms(), promptTime) > 1000:
+                    print(prompts[p])
+                    p += 1
+                    promptTime = ticks_ms()
+                    if p == len(prompts):
+                        print(CAL_PROMPTS[CAL_CENTER])
+                        c = CAL_CENTER
+                        step = CAL_WAIT_TOUCH
+                        n = 0
+                        state = S2_CALIB
+                
+            elif state == S5_HANDOFF:
+                # The sensor is read by the fast loop from now on
+                if not handoff.read():
+                    handoff.write(True)
                 
             else:
                 pass
@@ -329,49 +462,3 @@ def TouchpadFunction(taskName, period, Pos, touch, alpha, betaf, abfShare):
         else:
             
             yield None
-            
-def calInfo():
-    '''
-    @brief Prints IMU calibration instructions
-    @details Prints three strings in a 3 second interval in order to inform the user
-
-    '''
-    start_time = ticks_ms()
-    cdn = 4 # countdown number
-    while cdn >= 0:
-        round_time = ticks_ms()
-        if ((ticks_diff(round_time,start_time)) > 1000):
-            if cdn == 4:
-                print('Instructions: ')
-            elif cdn == 3:
-                print(' - Touch the panel as instructed on screen')
-            elif cdn == 2:
-                print(' - 5 locations in total')
-            elif cdn == 1:
-                print(' - Repeat touches may be necessary')
-            elif cdn == 0:
-                print('\n')
-            start_time = ticks_ms()
-            cdn -= 1
-
-def getReady():
-    '''
-    @brief Gives three ready statements as a buffer before calibration
-    @details Prints three strings in a 3 second interval in order to inform the user
-
-    '''
-    start_time = ticks_ms()
-    cdn = 3 # countdown number
-    while cdn >= 0:
-        round_time = ticks_ms()
-        if ((ticks_diff(round_time,start_time)) > 1000):
-            if cdn == 3:
-                print('Get ready')
-            elif cdn == 2:
-                print('Get set')
-            elif cdn == 1:
-                print('Calibrate')
-            elif cdn == 0:
-                print('\n')
-            start_time = ticks_ms()
-            cdn -= 1
\ No newline at end of file
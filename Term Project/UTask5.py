@@ -18,6 +18,8 @@ from time import ticks_us, ticks_ms, ticks_add, ticks_diff
 import micropython
 import array
 import gc
+import profiler
+import logwriter
 
 ## @brief Creates a state called S0_INIT
 #  @details Variable will be the state 0 for starting the program
@@ -91,15 +93,15 @@ yPress = micropython.const(11)
 #
 YPRESS = micropython.const(12)
 
-def taskUserFCN(taskName, period, eulAng, gyrVel, duty1, duty2, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, wFlag, dFlag, DFlag, abfShare, yShare, YSHARE, yFlag):
+def taskUserFCN(taskName, period, eulAng, gyrVel, duty1, duty2, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, wFlag, dFlag, DFlag, abfShare, yShare, YSHARE, yFlag, taskStats=None, streamFlag=None, recFlag=None, dataLog=None, ser=None):
     
     '''! @brief Creates the user interface.
          @details Creates the many functionalities required.  Motor can be controlled and data
                   can be collected.  User is prompted as to what inputs are valid.
          @param taskName Names the task so that multiple tasks can be run simultaneously.
          @param period Passes in the period at which the code is run.
-         @param eulAng A tuple containing Euler angles head, pitch, and roll.
-         @param gyrVel A tuple containing angular velocity about X,Y, and Z.
+         @param eulAng A shares.ArrayShare containing Euler angles head, pitch, and roll.
+         @param gyrVel A shares.ArrayShare containing angular velocity about X,Y, and Z.
          @param duty1 A shared parameter that passes in the value for the duty cycle of motor 1.
          @param duty2 A shared parameter that passes in the value for the duty cycle of motor 2.
          @param Kpshare A shared parameter that passes in the value for the gain of Kp.
@@ -115,6 +117,18 @@ def taskUserFCN(taskName, period, eulAng, gyrVel, duty1, duty2, KpShare, KdShare
          @param yShare A shared parameter that passes in the value set motor angle 1.
          @param YSHARE A shared parameter that passes in the value set motor angle 2.
          @param yFlag A shared parameter that indicates if the set motor angle control keys have been pressed.
+         @param taskStats A list of profiler.TaskProfiler objects holding the timing of each task.
+         @param streamFlag A shared parameter that switches the telemetry stream task on
+                           while it is True. When given, "b" makes data collection
+                           stream binary frames instead of printing Data.csv rows.
+         @param recFlag A shared parameter that makes the flight recorder task save
+                        its recording when set to True by "f".
+         @param dataLog A logwriter.LogWriter for Data.csv written by a logwriter
+                        task. When left as None the user task opens Data.csv
+                        and writes it itself.
+         @param ser Object with the any() and read() methods of USB_VCP that the
+                    keyboard input is read from, such as an aiotasks.StreamPort.
+                    A USB_VCP is used when left as None.
     '''
     
     ## @brief creates a variable called state
@@ -136,7 +150,8 @@ def taskUserFCN(taskName, period, eulAng, gyrVel, duty1, duty2, KpShare, KdShare
     ## @brief creates a variable called ser
     #  @details Variable will be used for recognzing the keyboard input
     #
-    ser = USB_VCP()
+    if ser is None:
+        ser = USB_VCP()
     
     uart = UART(2, 115200)
     repl_uart(None)
@@ -167,6 +182,14 @@ def taskUserFCN(taskName, period, eulAng, gyrVel, duty1, duty2, KpShare, KdShare
     omxArray = array.array('f', thxArray)
     omyArray = array.array('f', thxArray)
     
+    ## @brief creates the copies of the shares read by S2_COLLECT
+    #  @details The shares are copied with snapshot(), since a fast loop
+    #           can write them in the middle of a read.
+    #
+    abfCopy = array.array('f', abfShare.read())
+    eulCopy = array.array('f', eulAng.read())
+    gyrCopy = array.array('f', gyrVel.read())
+    
     gc.collect()
     
     
@@ -185,9 +208,22 @@ def taskUserFCN(taskName, period, eulAng, gyrVel, duty1, duty2, KpShare, KdShare
     #           to integers once the user hits "Enter".
     buf = ''
     
-    filestring = ''
+    ## @brief creates a variable called ownLog
+    #  @details True when no logger task writes Data.csv for this task
+    #
+    ownLog = dataLog is None
     
-    nFile = 0
+    if ownLog:
+        dataLog = logwriter.LogWriter('Data.csv')
+    
+    ## @brief creates the list holding one row of Data.csv
+    #
+    data = 9*[0]
+    
+    ## @brief creates a variable called binary
+    #  @details True when data collection streams telemetry frames
+    #
+    binary = False
     
     while True:
         
@@ -232,8 +268,42 @@ def taskUserFCN(taskName, period, eulAng, gyrVel, duty1, duty2, KpShare, KdShare
                         gyr_x,gyr_y,gyr_z = gyrVel.read()
                         print(f'Ang Vel X,Y,Z: {gyr_x:.2f} [rad/s], {gyr_y:.2f} [rad/s], {gyr_z:.2f} [rad/s]')
                     
+                    elif charIn == 't':
+                        if taskStats:
+                            profiler.print_stats(taskStats)
+                        else:
+                            print('Task timing is not being recorded')
+                            
+                    elif charIn == 'T':
+                        if taskStats:
+                            profiler.dump_csv(taskStats, 'Stats.csv')
+                            print('Task timing written to Stats.csv')
+                        else:
+                            print('Task timing is not being recorded')
+                    
+                    elif charIn == 'b':
+                        if streamFlag is None:
+                            print('Telemetry streaming is not available')
+                        elif binary:
+                            print('Data collection prints Data.csv rows')
+                            binary = False
+                        else:
+                            print('Data collection streams binary telemetry')
+                            binary = True
+                    
+                    elif charIn == 'f':
+                        if recFlag is None:
+                            print('The flight recorder is not running')
+                        else:
+                            print('Saving the flight recorder to Flight.csv...')
+                            recFlag.write(True)
+                    
                     elif charIn in ['c', 'C']:
-                        print('Collecting data...')
+                        if binary:
+                            print('Streaming data...')
+                            streamFlag.write(True)
+                        else:
+                            print('Collecting data...')
                         state = S2_COLLECT
                         numItems = 0    
                         numPrint = 0
@@ -282,12 +352,26 @@ def taskUserFCN(taskName, period, eulAng, gyrVel, duty1, duty2, KpShare, KdShare
                     else: 
                         print('Invalid character entered. Please try again.  Press "h" to review the available inputs.')
                     
+            elif state == S2_COLLECT and binary:
+                # The stream task sends the frames, stop it after the same
+                # 15 seconds or when 's' is pressed
+                numItems += 1
+                if ser.any() and ser.read(1).decode() == 's':
+                    print('Ending Data Streaming Early')
+                    numItems = maxItems
+                if numItems >= maxItems:
+                    streamFlag.write(False)
+                    print('Streaming stopped')
+                    state = S1_CMD
+                        
             elif state == S2_COLLECT:        
-                if numItems < maxItems:
+                # A sample is only kept if every share was copied consistently
+                if (numItems < maxItems and abfShare.snapshot(abfCopy) >= 0
+                        and eulAng.snapshot(eulCopy) >= 0 and gyrVel.snapshot(gyrCopy) >= 0):
                     timeArray[numItems] = ticks_ms()
-                    xArray[numItems], vxArray[numItems], yArray[numItems], vyArray[numItems], zDummy = abfShare.read()
-                    thzDummy, thyArray[numItems], thxArray[numItems] = eulAng.read()
-                    omxArray[numItems], omyArray[numItems], omzDummy = gyrVel.read()
+                    xArray[numItems], vxArray[numItems], yArray[numItems], vyArray[numItems], zDummy = abfCopy
+                    thzDummy, thyArray[numItems], thxArray[numItems] = eulCopy
+                    omxArray[numItems], omyArray[numItems], omzDummy = gyrCopy
 #                    xArray[numItems], vxArray[numItems], yArray[numItems], vyDummy, zDummy = abfShare.read()
                     numItems += 1
                     if ser.any():
@@ -299,31 +383,28 @@ def taskUserFCN(taskName, period, eulAng, gyrVel, duty1, duty2, KpShare, KdShare
                         state = S3_PRINT_DATA
                         
             elif state == S3_PRINT_DATA:
-                with open('Data.csv', 'a+') as f:
-                    if numPrint < numItems:
-                        aC = round((timeArray[numPrint]-timeArray[0])/1000, 2)
-                        bC = -round(xArray[numPrint], 2)
-                        cC = -round(vxArray[numPrint], 2)
-                        dC = round(yArray[numPrint], 2)
-                        eC = round(vyArray[numPrint], 2)
-                        fC = round(thxArray[numPrint], 2)
-                        gC = round(omxArray[numPrint], 2)
-                        hC = round(thyArray[numPrint], 2)
-                        iC = round(omyArray[numPrint], 2)
-                        data = [aC, bC, cC, dC, eC, fC, gC, hC, iC]
-                        for x in data:
-                            filestring += str(x)
-                            filestring += ','
-                            nFile += 1
-                        if nFile == 9:
-                            print(filestring)
-                            f.write(filestring)
-                            f.write('\n')
-                            numPrint += 1
-                            filestring = ''
-                            nFile = 0
-                    elif numPrint == numItems:
-                        state = S1_CMD
+                # Queue up to ten rows per period in the log buffer, they
+                # wait for the next period when it is full
+                for k in range(10):
+                    if numPrint == numItems:
+                        break
+                    data[0] = (timeArray[numPrint]-timeArray[0])/1000
+                    data[1] = -xArray[numPrint]
+                    data[2] = -vxArray[numPrint]
+                    data[3] = yArray[numPrint]
+                    data[4] = vyArray[numPrint]
+                    data[5] = thxArray[numPrint]
+                    data[6] = omxArray[numPrint]
+                    data[7] = thyArray[numPrint]
+                    data[8] = omyArray[numPrint]
+                    line = dataLog.write_row(data)
+                    if line is None:
+                        break
+                    print(str(line, 'utf-8'), end='')
+                    numPrint += 1
+                if numPrint == numItems:
+                    dataLog.flush()
+                    state = S1_CMD
             
             elif state == S4_DIGI_IN:
                 if ser.any():
@@ -417,6 +498,9 @@ def taskUserFCN(taskName, period, eulAng, gyrVel, duty1, duty2, KpShare, KdShare
             else:
                 raise ValueError(f'Invalid State in {taskName}')
             
+            if ownLog:
+                dataLog.service()
+            
             next_time = ticks_add(next_time, period)
             
             yield state
@@ -441,6 +525,10 @@ def printHelp():
     print('| 4. "v" or "V": Print Angular Velocities                   |')
     print('| 5. "c" or "C": Collect platform data for 15 seconds       |')
     print('| 6. "s" or "S": End platform data collection prematurely   |')
+    print('| 7. "t": Print task timing statistics                      |')
+    print('| 8. "T": Save task timing statistics to Stats.csv          |')
+    print('| 9. "b": Toggle binary telemetry streaming for "c"         |')
+    print('| 10. "f": Save the flight recorder to Flight.csv           |')
     print('|                                                           |')
     print('| Closed-Loop Commands:                                     |')
     print('| 1. "w": Enable/disable closed-loop control for Motor 1    |')
@@ -0,0 +1,201 @@
+"""!
+@file adcfilter.py
+@brief Adaptive oversampling filters for the touchpad ADC readings.
+@details An ADCFilter reduces a burst of ADC samples to one reading with a
+         mean, a median or a trimmed mean. A single outlier moves the mean
+         but not the median or the trimmed mean. The filter also picks how
+         many samples the next burst should take from the recent variance of
+         its output: when the ball is settled the variance is small and few
+         samples are taken, which shortens the scan, and when the ball moves
+         the full burst is taken for better noise rejection.
+
+         The sample kernels are compiled with the viper emitter on the board.
+         On a PC the pure Python versions below them are used instead.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import sys
+import micropython
+from array import array
+
+## @brief Filter mode taking the mean of the samples
+#
+MEAN = micropython.const(0)
+
+## @brief Filter mode taking the median of the samples
+#
+MEDIAN = micropython.const(1)
+
+## @brief Filter mode taking the mean after dropping the smallest and largest samples
+#
+TRIMMED = micropython.const(2)
+
+if sys.implementation.name == 'micropython':
+
+    @micropython.viper
+    def _sums(buf, n: int, out):
+        '''!@brief Stores the sum and the sum of squares of n samples in out.
+        '''
+        p = ptr16(buf)
+        o = ptr32(out)
+        s = 0
+        q = 0
+        i = 0
+        while i < n:
+            v = p[i]
+            s += v
+            q += v*v
+            i += 1
+        o[0] = s
+        o[1] = q
+
+    @micropython.viper
+    def _sort(buf, n: int):
+        '''!@brief Sorts the first n samples in place with an insertion sort.
+        '''
+        p = ptr16(buf)
+        i = 1
+        while i < n:
+            v = p[i]
+            j = i - 1
+            while j >= 0 and p[j] > v:
+                p[j + 1] = p[j]
+                j -= 1
+            p[j + 1] = v
+            i += 1
+
+    @micropython.viper
+    def _sum_range(buf, start: int, stop: int) -> int:
+        '''!@brief Returns the sum of the samples from start up to stop.
+        '''
+        p = ptr16(buf)
+        s = 0
+        i = start
+        while i < stop:
+            s += p[i]
+            i += 1
+        return s
+
+else:
+
+    def _sums(buf, n, out):
+        '''!@brief Stores the sum and the sum of squares of n samples in out.
+        '''
+        s = 0
+        q = 0
+        for i in range(n):
+            v = buf[i]
+            s += v
+            q += v*v
+        out[0] = s
+        out[1] = q
+
+    def _sort(buf, n):
+        '''!@brief Sorts the first n samples in place with an insertion sort.
+        '''
+        for i in range(1, n):
+            v = buf[i]
+            j = i - 1
+            while j >= 0 and buf[j] > v:
+                buf[j + 1] = buf[j]
+                j -= 1
+            buf[j + 1] = v
+
+    def _sum_range(buf, start, stop):
+        '''!@brief Returns the sum of the samples from start up to stop.
+        '''
+        s = 0
+        for i in range(start, stop):
+            s += buf[i]
+        return s
+
+class ADCFilter:
+    '''!@brief Reduces a burst of ADC samples to one filtered reading.
+    '''
+
+    def __init__(self, mode=MEAN, nmin=25, nmax=25, trim=2, varLow=4, varHigh=400, gain=0.2):
+        '''!@brief Creates a filter with a preallocated sample buffer.
+            @param mode MEAN, MEDIAN or TRIMMED.
+            @param nmin Number of samples taken while the reading is settled.
+            @param nmax Number of samples taken while the reading is moving.
+            @param trim Number of samples dropped from each end for TRIMMED.
+            @param varLow Output variance in counts squared at or below which
+                          nmin samples are taken.
+            @param varHigh Output variance in counts squared at or above which
+                           nmax samples are taken.
+            @param gain Weight of the newest reading in the running variance.
+        '''
+        if mode == TRIMMED and nmin <= 2*trim:
+            raise ValueError('nmin must be larger than twice trim')
+        self.mode = mode
+        self.nmin = nmin
+        self.nmax = nmax
+        self.trim = trim
+        self.varLow = varLow
+        self.varHigh = varHigh
+        self.gain = gain
+        ## Sample buffer filled by the ADC
+        self.buf = array('h', nmax*[0])
+        # One view per sample count so that choosing a count does not allocate
+        self._views = [memoryview(self.buf)[:n] for n in range(nmax + 1)]
+        self._sums = array('i', 2*[0])
+        ## Running variance of the filtered readings in counts squared
+        self.var = varHigh
+        ## Sample variance within the last burst in counts squared
+        self.noise = 0
+        self._last = None
+
+    def samples(self):
+        '''!@brief Picks the number of samples for the next burst.
+            @return Number of samples, between nmin and nmax.
+        '''
+        if self.var <= self.varLow:
+            return self.nmin
+        if self.var >= self.varHigh:
+            return self.nmax
+        return self.nmin + int((self.nmax - self.nmin)*(self.var - self.varLow)
+                               /(self.varHigh - self.varLow))
+
+    def buffer(self):
+        '''!@brief Returns a view of the sample buffer sized for the next burst.
+            @details Pass the view to ADC.read_timed() and then call apply()
+                     with its length.
+        '''
+        return self._views[self.samples()]
+
+    def apply(self, n):
+        '''!@brief Filters the first n samples of the buffer.
+            @param n Number of samples in the buffer.
+            @return The filtered reading in ADC counts.
+        '''
+        buf = self.buf
+        _sums(buf, n, self._sums)
+        total = self._sums[0]
+        self.noise = (self._sums[1] - total*total/n)/n
+        if self.mode == MEAN:
+            value = total/n
+        elif self.mode == MEDIAN:
+            _sort(buf, n)
+            half = n >> 1
+            if n & 1:
+                value = buf[half]
+            else:
+                value = (buf[half - 1] + buf[half])/2
+        else:
+            _sort(buf, n)
+            value = _sum_range(buf, self.trim, n - self.trim)/(n - 2*self.trim)
+        if self._last is not None:
+            step = value - self._last
+            self.var += self.gain*(step*step - self.var)
+        self._last = value
+        return value
+
+    def reset(self):
+        '''!@brief Forgets the running variance, for example after the ball is lifted.
+        '''
+        self.var = self.varHigh
+        self._last = None
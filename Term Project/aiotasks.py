@@ -0,0 +1,146 @@
+"""!
+@file aiotasks.py
+@brief Runs the generator tasks as uasyncio coroutines.
+@details An alternative to scheduler.Scheduler. Each scheduler.Task is
+         driven by its own coroutine, which sleeps with asyncio.sleep_ms()
+         until the task is due and then resumes the generator once. The
+         generators keep their own period logic unchanged, so the same task
+         list runs under either runtime. The asyncio loop idles the CPU while
+         every coroutine sleeps.
+
+         Keyboard input for the user task comes from a StreamReader over the
+         USB_VCP. StreamPort buffers what the reader receives and offers the
+         any() and read() methods the user task already calls on the port.
+
+         On a PC the standard asyncio module is used instead of uasyncio.
+         sim.aioloop provides an event loop running on the simulated clock.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import time
+import shares
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+## @brief Delay in milliseconds before resuming a generator again if it
+#         yielded None because it was not due
+#
+RETRY_MS = 1
+
+if hasattr(asyncio, 'sleep_ms'):
+    sleep_ms = asyncio.sleep_ms
+else:
+    def sleep_ms(ms):
+        '''!@brief Sleeps for ms milliseconds, like uasyncio.sleep_ms().
+        '''
+        return asyncio.sleep(ms/1000)
+
+async def periodic(task, clock=None):
+    '''!@brief Resumes the generator of a task once every period.
+        @details Keeps a deadline in lockstep with the generator like
+                 scheduler.Scheduler does. The sleep is rounded up to whole
+                 milliseconds, the resolution of the uasyncio queue.
+        @param task A scheduler.Task whose generator has not been started.
+        @param clock Object providing ticks_us(), ticks_add() and ticks_diff(),
+                     the time module when left as None.
+    '''
+    if clock is None:
+        clock = time
+    gen = task.gen
+    next(gen)
+    deadline = clock.ticks_add(clock.ticks_us(), task.period)
+    while True:
+        wait = clock.ticks_diff(deadline, clock.ticks_us())
+        if wait > 0:
+            await sleep_ms((wait + 999)//1000)
+        if next(gen) is None:
+            task.early += 1
+            await sleep_ms(RETRY_MS)
+        else:
+            task.runs += 1
+            deadline = clock.ticks_add(deadline, task.period)
+
+class StreamPort:
+    '''!@brief Serial port of the user task fed from a StreamReader.
+    '''
+
+    def __init__(self, size=64):
+        '''!@brief Creates an empty port.
+            @param size Number of received bytes that can be held. Bytes
+                        arriving while the port is full are dropped.
+        '''
+        self._queue = shares.RingQueue(size, 'B')
+
+    @property
+    def dropped(self):
+        '''!@brief Number of bytes dropped because the port was full.
+        '''
+        return self._queue.dropped
+
+    def any(self):
+        '''!@brief Returns the number of bytes waiting to be read.
+        '''
+        return self._queue.num_in()
+
+    def read(self, n=1):
+        '''!@brief Removes up to n bytes from the port.
+            @return The bytes read, or None if there were none, like USB_VCP.read().
+        '''
+        count = self._queue.num_in()
+        if count == 0:
+            return None
+        out = bytearray(n if n < count else count)
+        self._queue.get_into(out)
+        return bytes(out)
+
+    def feed(self, data):
+        '''!@brief Appends received bytes to the port.
+        '''
+        self._queue.put_many(data)
+
+    async def pump(self, reader):
+        '''!@brief Feeds the port from a stream until the stream ends.
+            @param reader An asyncio.StreamReader.
+        '''
+        while True:
+            data = await reader.read(16)
+            if not data:
+                return
+            self.feed(data)
+
+async def main(tasks, reader=None, port=None, duration=None, clock=None):
+    '''!@brief Starts a coroutine for every task and runs them.
+        @details The coroutines are started in order of decreasing priority,
+                 so tasks due at the same time run in the order the
+                 scheduler would run them.
+        @param tasks A list of scheduler.Task objects.
+        @param reader An asyncio.StreamReader feeding port, or None.
+        @param port A StreamPort passed to the user task, or None.
+        @param duration Time to run for in milliseconds. Runs forever when
+                        left as None.
+        @param clock Clock passed to periodic().
+    '''
+    if reader is not None:
+        asyncio.create_task(port.pump(reader))
+    for task in sorted(tasks, key=lambda task: -task.priority):
+        asyncio.create_task(periodic(task, clock))
+    if duration is None:
+        while True:
+            await sleep_ms(60_000)
+    await sleep_ms(duration)
+
+def run(tasks, stream=None, port=None):
+    '''!@brief Runs the tasks until interrupted.
+        @param tasks A list of scheduler.Task objects.
+        @param stream Stream read into port through a uasyncio StreamReader,
+                      such as a USB_VCP, or None.
+        @param port A StreamPort passed to the user task, or None.
+    '''
+    reader = None if stream is None else asyncio.StreamReader(stream)
+    asyncio.run(main(tasks, reader, port))
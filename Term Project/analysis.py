@@ -0,0 +1,217 @@
+"""!
+@file analysis.py
+@brief Loads Data.csv logs into NumPy arrays and computes step metrics.
+@details Runs on the PC, it is not copied to the Nucleo. A log is read in
+         one call into a two-dimensional array. Data.csv has no header and
+         every row ends with a comma, the CSV files from teledecode.py start
+         with a header line and .npy files from teledecode.py are memory
+         mapped.
+
+         UTask5 appends every data collection to Data.csv, so one file holds
+         several runs, each starting at time 0. In every run the ball is
+         put down at some point and the controller brings it back to the
+         center. The runs of all the files are padded into one array and
+         the metrics of every run and axis are computed together:
+
+         - rise time, from 10% to 90% of the way from the first position
+           to the center,
+         - settling time after the ball was put down, from which the ball
+           stays within a band around the center,
+         - overshoot past the center, in mm and in percent of the first
+           position,
+         - RMS distance of the ball from the center.
+
+         Print the metrics of some logs and save them with
+             python analysis.py Data.csv run2.csv --band 5 --csv Summary.csv
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import argparse
+import numpy as np
+
+## @brief Names of the Data.csv columns written by UTask5
+#
+COLUMNS = ('t', 'x', 'vx', 'y', 'vy', 'thx', 'omx', 'thy', 'omy')
+
+## @brief Names of the metrics returned by step_metrics(), in table order
+#
+METRICS = ('start', 'initial', 'rise', 'settle', 'overshoot', 'overshoot_pct', 'rms')
+
+def load(filename):
+    '''!@brief Reads a whole log into an array.
+        @details Lines starting with # are skipped, as is a header line of
+                 column names, which then names the columns. Empty columns
+                 left by trailing commas are dropped.
+        @param filename Name of a CSV or .npy file.
+        @return Tuple of the column names and a two-dimensional float array
+                with one row per sample.
+    '''
+    if filename.endswith('.npy'):
+        data = np.load(filename, mmap_mode='r')
+        names = COLUMNS[:1] + ('x', 'vx', 'y', 'vy', 'thx', 'omx', 'thy', 'omy', 'duty1', 'duty2')
+        return names[:data.shape[1]], data
+    names = None
+    skip = 0
+    with open(filename) as f:
+        for line in f:
+            if line.startswith('#'):
+                skip += 1
+                continue
+            first = line.split(',')[0].strip()
+            try:
+                float(first)
+            except ValueError:
+                names = tuple(name.strip() for name in line.strip().rstrip(',').split(','))
+                skip += 1
+            break
+        else:
+            return (names or COLUMNS), np.empty((0, len(names or COLUMNS)))
+        ncols = len(line.strip().rstrip(',').split(',')) if names is None else len(names)
+    data = np.loadtxt(filename, delimiter=',', comments='#', skiprows=skip,
+                      usecols=range(ncols), ndmin=2)
+    if names is None:
+        names = COLUMNS[:ncols] if ncols <= len(COLUMNS) else tuple(f'c{k}' for k in range(ncols))
+    return names, data
+
+def split_runs(t):
+    '''!@brief Finds where each run of a log starts.
+        @param t Time column of the log.
+        @return Array of the first sample of each run, followed by the
+                number of samples.
+    '''
+    starts = np.flatnonzero(np.diff(t) < 0) + 1
+    return np.concatenate(([0], starts, [len(t)]))
+
+def stack(logs, columns=('t', 'x', 'y')):
+    '''!@brief Pads the runs of several logs into one array per column.
+        @param logs List of (names, data) tuples from load().
+        @param columns Names of the columns to stack.
+        @return Tuple of a dictionary of (runs, samples) arrays keyed by
+                column name, padded with NaN, and a list of (log index, run
+                index) pairs naming the rows.
+    '''
+    pieces = []
+    labels = []
+    for i, (names, data) in enumerate(logs):
+        index = [names.index(name) for name in columns]
+        bounds = split_runs(data[:, names.index('t')])
+        for k in range(len(bounds) - 1):
+            pieces.append(data[bounds[k]:bounds[k + 1]][:, index])
+            labels.append((i, k))
+    n = max((len(p) for p in pieces), default=0)
+    out = np.full((len(pieces), n, len(columns)), np.nan)
+    for r, piece in enumerate(pieces):
+        out[r, :len(piece)] = piece
+    return {name: out[:, :, c] for c, name in enumerate(columns)}, labels
+
+def _first(mask, t):
+    '''!@brief Time of the first True of each row, NaN if there is none.
+    '''
+    hit = mask.any(axis=1)
+    k = mask.argmax(axis=1)
+    return np.where(hit, t[np.arange(len(t)), k], np.nan)
+
+def step_metrics(t, e, present, band=5.0):
+    '''!@brief Computes the step metrics of many runs at once.
+        @details A run starts at its first sample with the ball present.
+                 The metrics are NaN for runs without a ball, the settling
+                 time is infinite for runs that never settled.
+        @param t Times in s, one row per run, padded with NaN.
+        @param e Positions in mm relative to the center, same shape.
+        @param present True where the ball was on the panel, same shape.
+        @param band Half width in mm of the settling band.
+        @return Dictionary of arrays with one value per run keyed by METRICS.
+    '''
+    rows = np.arange(len(t))
+    present = present & ~np.isnan(e)
+    has = present.any(axis=1)
+    k0 = present.argmax(axis=1)
+    start = np.where(has, t[rows, k0], np.nan)
+    e0 = np.where(has, e[rows, k0], np.nan)
+    after = np.arange(t.shape[1])[None, :] >= k0[:, None]
+    valid = after & present
+    # Positions as a fraction of the way from the first position to the center
+    sign = np.where(e0 < 0, -1.0, 1.0)
+    mag = np.abs(e0)[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        left = np.where(valid, sign[:, None]*e/mag, np.nan)
+        t10 = _first(valid & (left <= 0.9), t)
+        t90 = _first(valid & (left <= 0.1), t)
+        outside = valid & (np.abs(e) > band)
+        # Settled from the sample after the last one outside the band
+        last = t.shape[1] - 1 - outside[:, ::-1].argmax(axis=1)
+        end = valid.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+        nxt = np.minimum(last + 1, t.shape[1] - 1)
+        settle = np.where(outside.any(axis=1), np.where(last >= end, np.inf, t[rows, nxt] - start), 0.0)
+        over = np.nanmax(np.where(valid, -sign[:, None]*e, np.nan), axis=1, initial=0)
+        over = np.maximum(over, 0)
+        n = valid.sum(axis=1)
+        rms = np.sqrt(np.where(valid, e*e, 0).sum(axis=1)/n)
+        pct = 100*over/np.abs(e0)
+    settle = np.where(has, settle, np.nan)
+    return {'start': start, 'initial': e0, 'rise': t90 - t10, 'settle': settle,
+            'overshoot': np.where(has, over, np.nan), 'overshoot_pct': np.where(has, pct, np.nan),
+            'rms': rms}
+
+def analyze(logs, band=5.0):
+    '''!@brief Computes the step metrics of every run and axis of several logs.
+        @param logs List of (names, data) tuples from load().
+        @param band Half width in mm of the settling band.
+        @return Tuple of the (log index, run index) labels and a dictionary
+                of step_metrics() results keyed by axis: 'x', 'y' and 'r'
+                for the distance from the center, whose RMS is the RMS ball
+                error.
+    '''
+    cols, labels = stack(logs)
+    t = cols['t']
+    x = cols['x']
+    y = cols['y']
+    # The touchpad task reports exactly zero while the panel is empty
+    present = (x != 0) | (y != 0)
+    r = np.hypot(x, y)
+    return labels, {axis: step_metrics(t, e, present, band) for axis, e in (('x', x), ('y', y), ('r', r))}
+
+def table(filenames, labels, results):
+    '''!@brief Arranges the results of analyze() as rows of a summary table.
+        @return List of rows, each holding the file name, the run index, the
+                axis and the METRICS values.
+    '''
+    rows = []
+    for j, (i, k) in enumerate(labels):
+        for axis, metrics in results.items():
+            rows.append([filenames[i], k, axis] + [float(metrics[m][j]) for m in METRICS])
+    return rows
+
+def write_csv(rows, filename):
+    '''!@brief Writes a summary table to a CSV file.
+    '''
+    with open(filename, 'w') as f:
+        f.write('file,run,axis,' + ','.join(METRICS) + '\n')
+        for row in rows:
+            f.write(f'{row[0]},{row[1]},{row[2]},' + ','.join(f'{v:.4g}' for v in row[3:]) + '\n')
+
+def main(argv=None):
+    '''!@brief Command line entry point.
+    '''
+    parser = argparse.ArgumentParser(description='Step metrics of Data.csv runs.')
+    parser.add_argument('logs', nargs='+', help='Data.csv style logs or .npy files from teledecode.py')
+    parser.add_argument('--band', type=float, default=5, help='settling band in mm')
+    parser.add_argument('--csv', help='write the summary table to this file')
+    args = parser.parse_args(argv)
+
+    logs = [load(name) for name in args.logs]
+    labels, results = analyze(logs, args.band)
+    rows = table(args.logs, labels, results)
+    print(f'{"file":20} run axis   start  initial    rise  settle  overshoot      rms')
+    for name, k, axis, start, e0, rise, settle, over, pct, rms in rows:
+        print(f'{name[-20:]:20} {k:3} {axis:>4} {start:7.2f} {e0:8.1f} {rise:7.2f} {settle:7.2f} '
+              f'{over:6.1f} mm {rms:8.1f}')
+    if args.csv:
+        write_csv(rows, args.csv)
+
+if __name__ == '__main__':
+    main()
@@ -18,7 +18,7 @@ class ClosedLoop:
         @details Uses error to compute the gain necessary for closed loop control
 
     '''
-    def __init__ (self, Kp, Kd, Ki, setpoint, sathigh, satlow):
+    def __init__ (self, Kp, Kd, Ki, setpoint, sathigh, satlow, pid=False):
         
         '''!@brief Creates the initial setup for the closed loop driver
             @details Objects of this class should not be instantiated
@@ -31,12 +31,14 @@ class ClosedLoop:
             @param setpoint Placeholder for the reference velocity inputted from yShare
             @param sathigh Placeholder for the maximum saturation value
             @param satlow Placeholder for the minimum saturation value
+            @param pid If True the derivative, integral and anti-windup terms
+                       are added to the actuation. The gains of the platform
+                       were tuned with only the proportional term acting, so
+                       turning this on changes the behavior on the board.
         '''
         
         # Class vars IN_pin are equal to the values of input args PWM_tim.
-        self.Kp = Kp
-        self.Kd = Kd
-        self.Ki = Ki
+        self.set_Gain(Kp, Kd, Ki)
         self.reference = setpoint
         self.sathigh = sathigh
         self.satlow = satlow
@@ -46,8 +48,7 @@ class ClosedLoop:
         self.position_sum = 0
         self.wind_pos = 0
         self.wind_neg = 0
-        self.Ti = 0
-        self.TiTs = 0
+        self.pid = pid
     
     def run(self, position, velocity, ref, loop, zflag):
         
@@ -68,18 +69,14 @@ class ClosedLoop:
         self.position_sum += self.position
         self.vel = velocity
         self.reference = ref
-        if self.Ki != 0:
-            self.Ti = self.Kp/self.Ki
-        elif self.Ki == 0:
-            self.Ti = 0
-        if self.Ti != 0:
-            self.TsTi = 10/self.Ti
-        elif self.Ti == 0:
-            self.TsTi = 0        
         self.actuation = self.Kp*(self.reference-self.position) 
         - self.Kd*self.vel + ((self.TsTi*self.position_sum) 
                               - (self.wind_pos -self.wind_neg))
         #- self.Ki*self.position_sum/10
+        if self.pid:
+            # The line continuation above leaves only the proportional term
+            self.actuation += (- self.Kd*self.vel + self.TsTi*self.position_sum
+                               - (self.wind_pos - self.wind_neg))
         if loop == 0:
             self.wind_pos = self.actuation
         elif loop == 1:
@@ -99,13 +96,24 @@ class ClosedLoop:
     def set_Gain (self, Kp, Kd, Ki):        
         '''!@brief Set the gain for the motor.
             @details This method sets the gain to be sent
-                     to the motor with the value for Kp or Ki. 
+                     to the motor with the value for Kp or Ki. The integral
+                     time Ti and the coefficient TsTi used by run() are
+                     worked out here, so run() does not divide every tick.
             @param Kp gain value for proportional control
             @param Kd gain value for derivative control
+            @param Ki gain value for integral control
         '''
         self.Kp = Kp
         self.Kd = Kd
         self.Ki = Ki
+        if Ki != 0:
+            self.Ti = Kp/Ki
+        else:
+            self.Ti = 0
+        if self.Ti != 0:
+            self.TsTi = 10/self.Ti
+        else:
+            self.TsTi = 0
 
     def get_Kp (self):        
         '''!@brief Return the value of Kp
@@ -133,4 +141,4 @@ class ClosedLoop:
             @return Gives the actuation value calculated.
         
         '''
-        return self.actuation
\ No newline at end of file
+        return self.actuation
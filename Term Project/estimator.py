@@ -0,0 +1,188 @@
+"""!
+@file estimator.py
+@brief Ball position and velocity estimators for the touchpad task.
+@details An estimator keeps the filtered position and velocity of the ball
+         along x and y in an array laid out as EST_X, EST_VX, EST_Y, EST_VY.
+         TTask calls reset() when the ball is put down and update() with
+         every touchpad reading, and publishes the array.
+
+         AlphaBeta is the filter TTask has always used. SteadyKalman also
+         uses the platform tilt measured by the IMU: the ball rolls down the
+         tilted platform with a known acceleration, so the velocity no
+         longer has to be worked out from position changes alone and does
+         not lag behind the ball. Both filters use the same gains every
+         tick, worked out once for the task period when they are made.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import math
+import micropython
+from array import array
+from IMUTask import EUL_X, EUL_Y
+
+## @brief Index of the x position in the estimator state
+#
+EST_X = micropython.const(0)
+
+## @brief Index of the x velocity in the estimator state
+#
+EST_VX = micropython.const(1)
+
+## @brief Index of the y position in the estimator state
+#
+EST_Y = micropython.const(2)
+
+## @brief Index of the y velocity in the estimator state
+#
+EST_VY = micropython.const(3)
+
+## @brief Acceleration of the rolling ball per degree of tilt in mm/s^2
+#  @details 5/7 g for a solid ball rolling without slipping, with the sine
+#           of the tilt taken as the tilt in radians.
+#
+ROLL_GAIN = 5/7*9810*math.pi/180
+
+def steady_gain(Ts, q, r, n=500):
+    '''!@brief Works out the steady state Kalman gains of a rolling ball.
+        @details Iterates the Riccati equation of a position and velocity
+                 model driven by a random acceleration until the gains settle.
+        @param Ts Sample time in seconds.
+        @param q Variance of the unknown acceleration in (mm/s^2)^2.
+        @param r Variance of the measured position in mm^2.
+        @param n Largest number of iterations.
+        @return Tuple of the position and velocity gains.
+    '''
+    q11 = q*Ts**4/4
+    q12 = q*Ts**3/2
+    q22 = q*Ts**2
+    p11 = p12 = p22 = 0
+    k1 = k2 = 0
+    for i in range(n):
+        # Predict
+        m11 = p11 + 2*Ts*p12 + Ts*Ts*p22 + q11
+        m12 = p12 + Ts*p22 + q12
+        m22 = p22 + q22
+        # Correct with the position measurement
+        s = m11 + r
+        g1 = m11/s
+        g2 = m12/s
+        p11 = (1 - g1)*m11
+        p12 = (1 - g1)*m12
+        p22 = m22 - g2*m12
+        if abs(g1 - k1) < 1e-9 and abs(g2 - k2) < 1e-9:
+            break
+        k1 = g1
+        k2 = g2
+    return g1, g2
+
+class AlphaBeta:
+    '''!@brief Fixed gain alpha-beta filter on the touchpad readings.
+    '''
+
+    def __init__(self, alpha, betaf, period):
+        '''!@brief Sets the filter gains.
+            @param alpha Position gain.
+            @param betaf Velocity gain, divided by the sample time.
+            @param period Task period in microseconds.
+        '''
+        ## Filtered state, indexed by EST_X, EST_VX, EST_Y and EST_VY
+        self.state = array('f', 4*[0])
+        self.alpha = alpha
+        self.Ts = period*1e-6
+        self._beta = betaf/self.Ts
+
+    def reset(self, x, y):
+        '''!@brief Sets the position and zeroes the velocity.
+        '''
+        s = self.state
+        s[EST_X] = x
+        s[EST_VX] = 0
+        s[EST_Y] = y
+        s[EST_VY] = 0
+
+    def update(self, x, y, eul=None):
+        '''!@brief Filters one touchpad reading.
+            @param x Measured x position in mm.
+            @param y Measured y position in mm.
+            @param eul Euler angles from the IMU, not used.
+        '''
+        s = self.state
+        a = self.alpha
+        b = self._beta
+        Ts = self.Ts
+        ex = x - s[EST_X]
+        ey = y - s[EST_Y]
+        s[EST_X] += a*ex + Ts*s[EST_VX]
+        s[EST_VX] += b*ex
+        s[EST_Y] += a*ey + Ts*s[EST_VY]
+        s[EST_VY] += b*ey
+
+class SteadyKalman:
+    '''!@brief Steady state Kalman filter using the platform tilt.
+        @details The x and y axes are filtered separately with the same
+                 gains. The ball along x is accelerated by the tilt read at
+                 IMUTask.EUL_Y, the ball along y by the tilt read at
+                 IMUTask.EUL_X. The default signs of gainX and gainY match
+                 sim.plant and are still to be confirmed on the platform.
+    '''
+
+    def __init__(self, period, q=1e4, r=0.25, gainX=ROLL_GAIN, gainY=-ROLL_GAIN):
+        '''!@brief Works out the gains for the task period.
+            @param period Task period in microseconds.
+            @param q Variance of the acceleration not explained by the tilt
+                     in (mm/s^2)^2, from the motors moving the platform,
+                     the ball slipping and IMU offsets.
+            @param r Variance of the touchpad reading in mm^2.
+            @param gainX Acceleration along x per degree at IMUTask.EUL_Y.
+            @param gainY Acceleration along y per degree at IMUTask.EUL_X.
+        '''
+        ## Filtered state, indexed by EST_X, EST_VX, EST_Y and EST_VY
+        self.state = array('f', 4*[0])
+        Ts = period*1e-6
+        self.Ts = Ts
+        ## Position and velocity gains
+        self.k1, self.k2 = steady_gain(Ts, q, r)
+        # Position and velocity change per degree of tilt over one period
+        self._px = gainX*Ts*Ts/2
+        self._vx = gainX*Ts
+        self._py = gainY*Ts*Ts/2
+        self._vy = gainY*Ts
+
+    def reset(self, x, y):
+        '''!@brief Sets the position and zeroes the velocity.
+        '''
+        s = self.state
+        s[EST_X] = x
+        s[EST_VX] = 0
+        s[EST_Y] = y
+        s[EST_VY] = 0
+
+    def update(self, x, y, eul=None):
+        '''!@brief Predicts the ball motion over one period and corrects it
+                   with one touchpad reading.
+            @param x Measured x position in mm.
+            @param y Measured y position in mm.
+            @param eul Euler angles from the IMU in degrees, indexed by
+                       IMUTask.EUL_X and IMUTask.EUL_Y, or None to predict
+                       without the tilt.
+        '''
+        s = self.state
+        Ts = self.Ts
+        k1 = self.k1
+        k2 = self.k2
+        tx = eul[EUL_Y] if eul is not None else 0
+        ty = eul[EUL_X] if eul is not None else 0
+        px = s[EST_X] + Ts*s[EST_VX] + self._px*tx
+        vx = s[EST_VX] + self._vx*tx
+        py = s[EST_Y] + Ts*s[EST_VY] + self._py*ty
+        vy = s[EST_VY] + self._vy*ty
+        ex = x - px
+        ey = y - py
+        s[EST_X] = px + k1*ex
+        s[EST_VX] = vx + k2*ex
+        s[EST_Y] = py + k1*ey
+        s[EST_VY] = vy + k2*ey
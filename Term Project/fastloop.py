@@ -0,0 +1,238 @@
+"""!
+@file fastloop.py
+@brief Control step of the platform started by a hardware timer.
+@details In the cooperative mode of main.py the control period stretches
+         whenever another task runs long, for example while the user task
+         prints or a calibration is in progress. A FastLoop instead runs
+         the whole control step from a timer: the touchpad scan, the IMU
+         read, the ball estimate, both cascades and the motor writes.
+
+         The step does float arithmetic, ADC bursts and an I2C transfer,
+         none of which may run inside a hard interrupt on the board, where
+         floats are allocated on the heap. The step is therefore queued
+         with micropython.schedule(), as BNO055.MotionSampler does for its
+         reads, and runs at the next bytecode boundary of whatever task is
+         running, or later during a long call into C such as a print or a
+         flash write. The step ends by converting the duty cycles to
+         integer timer counts. The interrupt handler itself writes the
+         counts of the previous step to the motors before queuing the next
+         step. Only these integer register writes happen in the handler,
+         and they allocate nothing. The motors are thus updated on the
+         timer tick itself, one period after the readings they were
+         computed from, however late the step ran.
+
+         The ball contact logic of TTask.BallTracker and the controllers of
+         CTask5.Cascade are the same objects the cooperative tasks use.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+from array import array
+from time import ticks_us, ticks_add, ticks_diff
+import micropython
+from pyb import Timer
+
+## @brief Creates a state called S0_INIT
+#  @details Variable will be the state 0 for starting the program
+#
+S0_INIT = micropython.const(0)
+
+## @brief Creates a state called S1_WAIT
+#  @details Variable will be the state 1 for waiting for the sensor tasks to calibrate
+#
+S1_WAIT = micropython.const(1)
+
+## @brief Creates a state called S2_RUN
+#  @details Variable will be the state 2 while the timer runs the control step
+#
+S2_RUN = micropython.const(2)
+
+class FastLoop:
+    '''!@brief Runs the touchpad, IMU, estimator, controllers and motors from a timer.
+    '''
+
+    def __init__(self, timer, freq, touch, tracker, bno, cascade, motors, abfShare, eulAng, gyrVel, wFlag):
+        '''!@brief Creates the loop without starting it.
+            @param timer Number of a free hardware timer.
+            @param freq Control rate in Hz.
+            @param touch The touchpad.Touchpad object.
+            @param tracker The TTask.BallTracker fed with the touchpad readings,
+                           shared with the touchpad task so the contact state
+                           carries over when the touchpad is handed over.
+            @param bno The BNO055.BNO055 object.
+            @param cascade The CTask5.Cascade of both axes. Its duty shares
+                           receive the controller output in closed loop and
+                           are written to the motors as they are otherwise.
+            @param motors Tuple of the motor5.Motor objects of axis 1 and 2.
+            @param abfShare A shares.ArrayShare receiving the ball estimate.
+            @param eulAng A shares.ArrayShare receiving the Euler angles.
+            @param gyrVel A shares.ArrayShare receiving the angular velocities.
+            @param wFlag A shared parameter that is True in closed loop.
+        '''
+        self.touch = touch
+        self.tracker = tracker
+        self.bno = bno
+        self.cascade = cascade
+        self.motors = motors
+        self.abfShare = abfShare
+        self.eulAng = eulAng
+        self.gyrVel = gyrVel
+        self.wFlag = wFlag
+        self.period = 1_000_000//freq
+        self._pos = array('f', 3*[0])
+        self._motion = array('f', 6*[0])
+        # Timer counts of each motor, written by the interrupt
+        self._counts = array('i', len(motors)*[0])
+        self._pending = False
+        self._tick = 0
+        self._last = None
+        ## Number of completed control steps
+        self.seq = 0
+        ## Number of timer interrupts skipped because the last step had not run
+        self.overruns = 0
+        ## Longest time in microseconds from the interrupt to the start of a step
+        self.maxLatency = 0
+        ## Largest difference in microseconds between the interval of two steps and the period
+        self.maxJitter = 0
+        ## Time in microseconds taken by the last step
+        self.runTime = 0
+        # Bound methods are made here since the interrupt cannot allocate
+        self._isr_ref = self._isr
+        self._run_ref = self._run
+        self._tim = Timer(timer, freq=freq)
+
+    def start(self):
+        '''!@brief Starts the timer.
+        '''
+        self._last = None
+        self._tim.callback(self._isr_ref)
+
+    def stop(self):
+        '''!@brief Stops the timer.
+        '''
+        self._tim.callback(None)
+
+    def _isr(self, tim):
+        '''!@brief Timer interrupt that writes the motors and queues the next step.
+        '''
+        motors = self.motors
+        counts = self._counts
+        for i in range(len(counts)):
+            motors[i].set_counts(counts[i])
+        if self._pending:
+            self.overruns += 1
+            return
+        self._pending = True
+        self._tick = ticks_us()
+        try:
+            micropython.schedule(self._run_ref, None)
+        except RuntimeError:
+            self._pending = False
+            self.overruns += 1
+
+    def _run(self, arg):
+        '''!@brief Runs one step and records its timing.
+        '''
+        start = ticks_us()
+        late = ticks_diff(start, self._tick)
+        if late > self.maxLatency:
+            self.maxLatency = late
+        if self._last is not None:
+            jitter = ticks_diff(start, self._last) - self.period
+            if jitter < 0:
+                jitter = -jitter
+            if jitter > self.maxJitter:
+                self.maxJitter = jitter
+        self._last = start
+        self.step()
+        self.runTime = ticks_diff(ticks_us(), start)
+        self.seq += 1
+        self._pending = False
+
+    def step(self):
+        '''!@brief Reads the sensors, runs both cascades and converts the duties to counts.
+            @details Follows IMUTask for the IMU shares, TTask for the ball
+                     estimate and CTask5.pipelineFunction() for the
+                     controllers. The ball estimate is used in the same step
+                     it was made in. The counts reach the motors at the next
+                     timer interrupt.
+        '''
+        pos = self.touch.scan_into(self._pos)
+        motion = self.bno.read_motion_into(self._motion)
+        eul = self.eulAng.begin_write()
+        eul[0] = motion[0]
+        eul[1] = motion[1]
+        eul[2] = motion[2]
+        self.eulAng.end_write()
+        gyr = self.gyrVel.begin_write()
+        gyr[0] = motion[3]
+        gyr[1] = motion[4]
+        gyr[2] = motion[5]
+        self.gyrVel.end_write()
+
+        self.tracker.update(pos[0], pos[1], pos[2], eul)
+        self.tracker.publish(self.abfShare)
+
+        if self.wFlag.read():
+            self.cascade.run(self.abfShare.read(), eul, gyr)
+        duties = self.cascade.duties
+        motors = self.motors
+        counts = self._counts
+        for i in range(len(counts)):
+            counts[i] = motors[i].counts(duties[i].read())
+
+def fastFunction(taskName, period, loop, ready, dFlag=None, DFlag=None):
+    '''! @brief Task that starts a FastLoop and does its printing.
+         @details Waits until the touchpad and IMU tasks have finished their
+                  calibration and handed the sensors over, then starts the
+                  timer. Afterwards it prints the duty cycles asked for by
+                  the user, which the step itself never does.
+         @param taskName Names the task so that multiple tasks can be run simultaneously.
+         @param period Passes in the period at which the code is run.
+         @param loop The FastLoop object.
+         @param ready A tuple of shared parameters that each become True
+                      when a sensor task hands its sensor over.
+         @param dFlag A shared parameter that indicates if the value for duty cycle of motor 1 are wanted.
+         @param DFlag A shared parameter that indicates if the value for duty cycle of motor 2 are wanted.
+    '''
+
+    state = S0_INIT
+
+    start_time = ticks_us()
+
+    next_time = ticks_add(start_time, period)
+
+    while True:
+
+        current_time = ticks_us()
+        if ticks_diff(current_time, next_time) >= 0:
+
+            if state == S0_INIT:
+                state = S1_WAIT
+
+            elif state == S1_WAIT:
+                for flag in ready:
+                    if not flag.read():
+                        break
+                else:
+                    loop.start()
+                    state = S2_RUN
+
+            elif state == S2_RUN:
+                if dFlag is not None and dFlag.read():
+                    print(f'{taskName} 1: {loop.cascade.duties[0].read()}')
+                    dFlag.write(False)
+                if DFlag is not None and DFlag.read():
+                    print(f'{taskName} 2: {loop.cascade.duties[1].read()}')
+                    DFlag.write(False)
+
+            next_time = ticks_add(next_time, period)
+
+            yield state
+
+        else:
+
+            yield None
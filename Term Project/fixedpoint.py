@@ -0,0 +1,103 @@
+"""!
+@file fixedpoint.py
+@brief Integer kernel for the touchpad calibration.
+@details The touchpad reading is an affine function of the two ADC sums, so
+         the panel scale, the averaging, the centering and the calibration
+         coefficients are folded by cal_coeffs() into one integer matrix in
+         Q_COEF fixed point whenever the calibration changes. affine2() then
+         computes both positions in Q_POS fixed point with four integer
+         multiplications and no float objects.
+
+         The kernel is compiled with the viper emitter on the board, where
+         its integers are 32-bit machine words that wrap silently on
+         overflow. cal_coeffs() therefore refuses coefficients whose
+         products could overflow. On a PC the pure Python version below it
+         is used instead. Both give exactly the same integers.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import sys
+import micropython
+
+## @brief Fraction bits of the positions returned by affine2()
+#
+Q_POS = micropython.const(8)
+
+## @brief Fraction bits of the coefficients below those of the positions
+#  @details With Q_POS these keep the products of the 25-sample ADC sums
+#           below 2**31 for calibration gains up to about 2. cal_coeffs()
+#           checks the products of each calibration.
+#
+Q_COEF = micropython.const(13)
+
+## @brief Largest reading of the 12-bit ADC
+#
+ADC_MAX = micropython.const(4095)
+
+## @brief Millimeters per count of the positions returned by affine2()
+#
+POS_LSB = 1/(1 << Q_POS)
+
+if sys.implementation.name == 'micropython':
+
+    @micropython.viper
+    def affine2(coef, sx: int, sy: int, out):
+        '''!@brief Applies the folded calibration to two ADC sums.
+            @param coef An array('i') of six coefficients from cal_coeffs().
+            @param sx ADC sum of the x scan.
+            @param sy ADC sum of the y scan.
+            @param out An array('i') that receives x and y in Q_POS fixed point.
+        '''
+        c = ptr32(coef)
+        o = ptr32(out)
+        half = 1 << (Q_COEF - 1)
+        o[0] = (c[0]*sx + c[1]*sy + c[2] + half) >> Q_COEF
+        o[1] = (c[3]*sx + c[4]*sy + c[5] + half) >> Q_COEF
+
+else:
+
+    def affine2(coef, sx, sy, out):
+        '''!@brief Applies the folded calibration to two ADC sums.
+            @param coef An array('i') of six coefficients from cal_coeffs().
+            @param sx ADC sum of the x scan.
+            @param sy ADC sum of the y scan.
+            @param out An array('i') that receives x and y in Q_POS fixed point.
+        '''
+        half = 1 << (Q_COEF - 1)
+        out[0] = (coef[0]*sx + coef[1]*sy + coef[2] + half) >> Q_COEF
+        out[1] = (coef[3]*sx + coef[4]*sy + coef[5] + half) >> Q_COEF
+
+def cal_coeffs(K, xscale, yscale, xc, yc, n, coef):
+    '''!@brief Folds the touchpad scaling and calibration into integers.
+        @details The position computed in float by the touchpad driver is
+                 x = Kxx*(sx*xscale/n - xc) + Kxy*(sy*yscale/n - yc) + xo,
+                 and likewise for y, which is expanded into a coefficient
+                 of each sum and a constant.
+        @param K Calibration coefficients (Kxx, Kxy, xo, Kyx, Kyy, yo).
+        @param xscale Millimeters per ADC count of the x scan.
+        @param yscale Millimeters per ADC count of the y scan.
+        @param xc Offset of the x scan in mm.
+        @param yc Offset of the y scan in mm.
+        @param n Number of samples in each ADC sum.
+        @param coef An array('i') of six values that receives the coefficients.
+        @return coef
+        @exception ValueError The coefficients could overflow 32 bits in
+                              affine2() for ADC sums up to n*ADC_MAX. coef
+                              is left unchanged.
+    '''
+    Kxx, Kxy, xo, Kyx, Kyy, yo = K
+    one = 1 << (Q_POS + Q_COEF)
+    c = (round(Kxx*xscale/n*one), round(Kxy*yscale/n*one), round((xo - Kxx*xc - Kxy*yc)*one),
+         round(Kyx*xscale/n*one), round(Kyy*yscale/n*one), round((yo - Kyx*xc - Kyy*yc)*one))
+    top = n*ADC_MAX
+    half = 1 << (Q_COEF - 1)
+    for i in (0, 3):
+        if (abs(c[i]) + abs(c[i + 1]))*top + abs(c[i + 2]) + half >= 1 << 31:
+            raise ValueError('calibration gains too large for the fixed point touchpad')
+    for i in range(6):
+        coef[i] = c[i]
+    return coef
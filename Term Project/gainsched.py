@@ -0,0 +1,122 @@
+"""!
+@file gainsched.py
+@brief Gain scheduling table for the platform controllers.
+@details A GainTable holds a grid of gain multipliers over the operating
+         region of the platform: the distance of the ball from the center
+         and the tilt of the platform. The multipliers are worked out once,
+         when the table is made. Whenever the base gains entered by the user
+         change, scale() multiplies them into a second grid of gains, so
+         the control task only interpolates between the four grid points
+         around the operating point, which takes the same time anywhere in
+         the region.
+
+         The default profile makes the inner loop stiffer as the ball moves
+         away from the center, softens it near the tilt limit where the
+         motors saturate, and fades the integral term out away from the
+         center so it only removes the steady error once the ball has
+         settled.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+from array import array
+
+## @brief Number of gains per grid point, Kp, Kd and Ki
+#
+NGAINS = 3
+
+def aggressive(r, tilt, kpEdge=1.6, kdEdge=1.2, kpTilt=0.7):
+    '''!@brief Default multiplier profile.
+        @param r Ball distance from the center as a fraction of the largest distance.
+        @param tilt Platform tilt as a fraction of the largest tilt.
+        @param kpEdge Kp multiplier with the ball at the largest distance.
+        @param kdEdge Kd multiplier with the ball at the largest distance.
+        @param kpTilt Kp multiplier at the largest tilt.
+        @return Tuple of the Kp, Kd and Ki multipliers.
+    '''
+    kp = (1 + (kpEdge - 1)*r)*(1 + (kpTilt - 1)*tilt)
+    kd = 1 + (kdEdge - 1)*r
+    ki = 1 - r
+    return kp, kd, ki
+
+class GainTable:
+    '''!@brief Gains on a grid of ball distance and platform tilt.
+    '''
+
+    def __init__(self, rMax=100, tiltMax=12, nr=6, nt=4, profile=aggressive):
+        '''!@brief Fills the multiplier grid from a profile.
+            @param rMax Largest ball distance from the center in mm. Larger
+                        distances use the edge of the grid.
+            @param tiltMax Largest platform tilt in degrees.
+            @param nr Number of grid points along the distance, at least 2.
+            @param nt Number of grid points along the tilt, at least 2.
+            @param profile Function of the distance and tilt fractions
+                           returning the Kp, Kd and Ki multipliers.
+        '''
+        self.nr = nr
+        self.nt = nt
+        self._rScale = (nr - 1)/rMax
+        self._tScale = (nt - 1)/tiltMax
+        ## Multipliers, grid point (i, j) starts at index NGAINS*(i*nt + j)
+        self.factors = array('f', NGAINS*nr*nt*[0])
+        ## Gains, laid out as factors
+        self.gains = array('f', NGAINS*nr*nt*[0])
+        for i in range(nr):
+            for j in range(nt):
+                k = NGAINS*(i*nt + j)
+                for n, factor in enumerate(profile(i/(nr - 1), j/(nt - 1))):
+                    self.factors[k + n] = factor
+        self._Kp = None
+        self._Kd = None
+        self._Ki = None
+
+    def scale(self, Kp, Kd, Ki):
+        '''!@brief Multiplies base gains into the gain grid.
+            @details Does nothing when the base gains have not changed.
+        '''
+        if Kp == self._Kp and Kd == self._Kd and Ki == self._Ki:
+            return
+        self._Kp = Kp
+        self._Kd = Kd
+        self._Ki = Ki
+        factors = self.factors
+        gains = self.gains
+        for k in range(0, len(gains), NGAINS):
+            gains[k] = Kp*factors[k]
+            gains[k + 1] = Kd*factors[k + 1]
+            gains[k + 2] = Ki*factors[k + 2]
+
+    def lookup(self, r, tilt, out):
+        '''!@brief Interpolates the gains at an operating point.
+            @param r Ball distance from the center in mm, either sign.
+            @param tilt Platform tilt in degrees, either sign.
+            @param out Array of at least NGAINS values that receives Kp, Kd and Ki.
+            @return out
+        '''
+        u = (r if r >= 0 else -r)*self._rScale
+        v = (tilt if tilt >= 0 else -tilt)*self._tScale
+        nt = self.nt
+        i = int(u)
+        j = int(v)
+        if i >= self.nr - 1:
+            i = self.nr - 2
+            u = i + 1
+        if j >= nt - 1:
+            j = nt - 2
+            v = j + 1
+        fu = u - i
+        fv = v - j
+        g = self.gains
+        a = NGAINS*(i*nt + j)
+        b = a + NGAINS*nt
+        # Interpolate along the tilt on both distance rows, then between them
+        k = 0
+        while k < NGAINS:
+            lo = g[a + k] + fv*(g[a + NGAINS + k] - g[a + k])
+            hi = g[b + k] + fv*(g[b + NGAINS + k] - g[b + k])
+            out[k] = lo + fu*(hi - lo)
+            k += 1
+        return out
@@ -0,0 +1,283 @@
+"""!
+@file lodplot.py
+@brief Plots long Data.csv style logs with level of detail decimation.
+@details Runs on the PC, it is not copied to the Nucleo. Each column of a
+         log is turned into a pyramid of min/max levels, every level
+         keeping the smallest and largest sample of each group of four
+         buckets of the level below. Drawing a view picks the coarsest
+         level with at least two buckets per pixel column, so any zoom
+         draws a few thousand points however long the log is, and every
+         peak stays visible. Largest-triangle-three-buckets, which keeps the
+         shape of the line with fewer points, can be used instead.
+
+         The pyramids are saved next to the logs in a .lodcache folder and
+         rebuilt only when a log changes, so plotting the same logs again
+         skips reading the CSV files. The logs are read with analysis.load().
+         Runs appended to one Data.csv are placed one after the other.
+
+         Plot the ball position of two logs, zooming with the matplotlib
+         toolbar, with
+             python lodplot.py Data.csv run2.csv --columns x y
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import argparse
+import os
+import numpy as np
+
+import analysis
+
+## @brief Number of buckets of a level merged into one bucket of the next
+#
+FACTOR = 4
+
+## @brief Levels stop once they have fewer buckets than this
+#
+MIN_BUCKETS = 1024
+
+def continuous_time(t):
+    '''!@brief Places the runs of a log one after the other.
+        @details Each run after the first is shifted to start one sample
+                 period after the end of the run before it.
+        @param t Time column of the log.
+        @return Array of increasing times.
+    '''
+    t = np.asarray(t, dtype=np.float64)
+    bounds = analysis.split_runs(t)
+    out = t.copy()
+    dt = np.median(np.diff(t)) if len(t) > 1 else 0
+    offset = 0
+    for k in range(1, len(bounds) - 1):
+        start = bounds[k]
+        offset = out[start - 1] + dt - t[start]
+        out[start:bounds[k + 1]] += offset
+    return out
+
+def build_pyramid(x, y):
+    '''!@brief Makes the min/max levels of a trace.
+        @param x Increasing x values.
+        @param y Values to decimate.
+        @return List of levels, the finest first. Each level is a tuple of
+                the x and y of the minimum and the x and y of the maximum of
+                every bucket.
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    levels = []
+    xlo = xhi = x
+    ylo = yhi = y
+    while len(ylo) >= MIN_BUCKETS*FACTOR:
+        n = len(ylo) // FACTOR*FACTOR
+        rows = np.arange(n // FACTOR)
+        lo = ylo[:n].reshape(-1, FACTOR).argmin(axis=1)
+        hi = yhi[:n].reshape(-1, FACTOR).argmax(axis=1)
+        xl = xlo[:n].reshape(-1, FACTOR)[rows, lo]
+        yl = ylo[:n].reshape(-1, FACTOR)[rows, lo]
+        xh = xhi[:n].reshape(-1, FACTOR)[rows, hi]
+        yh = yhi[:n].reshape(-1, FACTOR)[rows, hi]
+        if n < len(ylo):
+            # The samples left over make a smaller last bucket
+            k = ylo[n:].argmin()
+            j = yhi[n:].argmax()
+            xl = np.append(xl, xlo[n + k])
+            yl = np.append(yl, ylo[n + k])
+            xh = np.append(xh, xhi[n + j])
+            yh = np.append(yh, yhi[n + j])
+        xlo, ylo, xhi, yhi = xl, yl, xh, yh
+        levels.append((xlo, ylo, xhi, yhi))
+    return levels
+
+def interleave(xlo, ylo, xhi, yhi):
+    '''!@brief Merges the minima and maxima of buckets into one line.
+        @details The two points of each bucket are put in x order.
+        @return Tuple of the x and y arrays.
+    '''
+    first = xlo <= xhi
+    x = np.empty(2*len(xlo))
+    y = np.empty(2*len(xlo))
+    x[0::2] = np.where(first, xlo, xhi)
+    y[0::2] = np.where(first, ylo, yhi)
+    x[1::2] = np.where(first, xhi, xlo)
+    y[1::2] = np.where(first, yhi, ylo)
+    return x, y
+
+def lttb(x, y, n):
+    '''!@brief Largest-triangle-three-buckets downsampling.
+        @details Keeps the first and last points and one point of each of
+                 n - 2 buckets in between, the one making the largest
+                 triangle with the point kept before it and the mean of the
+                 next bucket.
+        @param x Increasing x values.
+        @param y Values to downsample.
+        @param n Number of points to keep.
+        @return Tuple of the x and y arrays of the kept points.
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    m = len(x)
+    if n >= m or n < 3:
+        return x, y
+    edges = np.linspace(1, m - 1, n - 1).astype(np.int64)
+    # Mean of each bucket, used as the third corner of the triangles
+    counts = np.diff(edges)
+    mx = np.add.reduceat(x[1:m - 1], edges[:-1] - 1)/counts
+    my = np.add.reduceat(y[1:m - 1], edges[:-1] - 1)/counts
+    mx = np.append(mx, x[-1])
+    my = np.append(my, y[-1])
+    keep = np.empty(n, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = m - 1
+    a = 0
+    for b in range(n - 2):
+        lo = edges[b]
+        hi = edges[b + 1]
+        area = np.abs((x[a] - mx[b + 1])*(y[lo:hi] - y[a]) - (x[a] - x[lo:hi])*(my[b + 1] - y[a]))
+        a = lo + int(area.argmax())
+        keep[b + 1] = a
+    return x[keep], y[keep]
+
+class LodTrace:
+    '''!@brief One column of a log with its min/max pyramid.
+    '''
+
+    def __init__(self, filename, column, cache=True):
+        '''!@brief Loads the column, from the cache when it is up to date.
+            @param filename Name of a log analysis.load() can read.
+            @param column Name of the column.
+            @param cache True to read and write the .lodcache folder.
+        '''
+        self.filename = filename
+        self.column = column
+        ## Name of the cache file, or None
+        self.cacheFile = None
+        stat = os.stat(filename)
+        key = np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+        if cache:
+            folder = os.path.join(os.path.dirname(os.path.abspath(filename)), '.lodcache')
+            self.cacheFile = os.path.join(folder, f'{os.path.basename(filename)}.{column}.npz')
+            if self._load(key):
+                return
+        names, data = analysis.load(filename)
+        ## x values of the samples, time in s made continuous over the runs
+        self.x = continuous_time(data[:, names.index('t')])
+        ## Values of the samples
+        self.y = np.array(data[:, names.index(column)], dtype=np.float64)
+        ## Levels of build_pyramid()
+        self.levels = build_pyramid(self.x, self.y)
+        if cache:
+            os.makedirs(folder, exist_ok=True)
+            arrays = {'key': key, 'x': self.x, 'y': self.y}
+            for k, level in enumerate(self.levels):
+                for name, values in zip(('xlo', 'ylo', 'xhi', 'yhi'), level):
+                    arrays[f'{name}{k}'] = values
+            np.savez(self.cacheFile, **arrays)
+
+    def _load(self, key):
+        '''!@brief Reads the pyramid from the cache file.
+            @return True if the cache file matched the log.
+        '''
+        if not os.path.exists(self.cacheFile):
+            return False
+        with np.load(self.cacheFile) as cached:
+            if not np.array_equal(cached['key'], key):
+                return False
+            self.x = cached['x']
+            self.y = cached['y']
+            self.levels = []
+            k = 0
+            while f'xlo{k}' in cached:
+                self.levels.append(tuple(cached[f'{name}{k}'] for name in ('xlo', 'ylo', 'xhi', 'yhi')))
+                k += 1
+        return True
+
+    def view(self, x0, x1, width=1000, method='minmax'):
+        '''!@brief Returns the points to draw between x0 and x1.
+            @details Includes one point on each side of the range so the
+                     line reaches the edges of the plot.
+            @param x0 Left end of the view.
+            @param x1 Right end of the view.
+            @param width Width of the plot in pixels.
+            @param method 'minmax' for two points per pixel column, 'lttb'
+                          for largest-triangle-three-buckets with width
+                          points.
+            @return Tuple of the x and y arrays.
+        '''
+        i = max(np.searchsorted(self.x, x0) - 1, 0)
+        j = min(np.searchsorted(self.x, x1, 'right') + 1, len(self.x))
+        x = self.x[i:j]
+        y = self.y[i:j]
+        # Coarsen until there are at most two points per pixel column
+        count = len(x)
+        level = None
+        for xlo, ylo, xhi, yhi in self.levels:
+            if count <= 2*width:
+                break
+            a = max(np.searchsorted(xlo, x0) - 1, 0)
+            b = min(np.searchsorted(xlo, x1, 'right') + 1, len(xlo))
+            count = 2*(b - a)
+            level = (xlo[a:b], ylo[a:b], xhi[a:b], yhi[a:b])
+        if level is not None:
+            x, y = interleave(*level)
+        if method == 'lttb':
+            return lttb(x, y, width)
+        return x, y
+
+class Plotter:
+    '''!@brief A matplotlib figure that redraws its traces when zoomed.
+    '''
+
+    def __init__(self, traces, method='minmax', ylabel=None):
+        '''!@brief Draws the traces over their whole length.
+            @param traces List of LodTrace objects.
+            @param method Decimation method passed to LodTrace.view().
+            @param ylabel Label of the y axis.
+        '''
+        from matplotlib import pyplot
+        self.traces = traces
+        self.method = method
+        self.fig, self.ax = pyplot.subplots()
+        self.lines = []
+        for trace in traces:
+            x, y = trace.view(trace.x[0], trace.x[-1], self._width(), method)
+            line, = self.ax.plot(x, y, label=f'{os.path.basename(trace.filename)} {trace.column}')
+            self.lines.append(line)
+        self.ax.set_xlabel('Time [s]')
+        if ylabel:
+            self.ax.set_ylabel(ylabel)
+        self.ax.legend()
+        self.ax.callbacks.connect('xlim_changed', self._redraw)
+
+    def _width(self):
+        '''!@brief Width of the axes in pixels.
+        '''
+        return max(int(self.ax.get_window_extent().width), 100)
+
+    def _redraw(self, ax):
+        '''!@brief Replaces the points of every line for the new x range.
+        '''
+        x0, x1 = ax.get_xlim()
+        for trace, line in zip(self.traces, self.lines):
+            line.set_data(*trace.view(x0, x1, self._width(), self.method))
+        self.fig.canvas.draw_idle()
+
+def main(argv=None):
+    '''!@brief Command line entry point.
+    '''
+    parser = argparse.ArgumentParser(description='Plot long logs with level of detail decimation.')
+    parser.add_argument('logs', nargs='+', help='Data.csv style logs or .npy files from teledecode.py')
+    parser.add_argument('--columns', nargs='+', default=['x'], help='columns to plot')
+    parser.add_argument('--method', choices=('minmax', 'lttb'), default='minmax')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write .lodcache')
+    args = parser.parse_args(argv)
+
+    from matplotlib import pyplot
+    traces = [LodTrace(name, column, not args.no_cache) for name in args.logs for column in args.columns]
+    Plotter(traces, args.method)
+    pyplot.show()
+
+if __name__ == '__main__':
+    main()
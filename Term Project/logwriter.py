@@ -0,0 +1,290 @@
+"""!
+@file logwriter.py
+@brief Buffered CSV writer for logging to the Nucleo's flash.
+@details A LogWriter keeps its file open for the whole session and formats
+         rows of numbers straight into one preallocated bytearray, without
+         building strings. The buffer is written to the file in page-sized
+         chunks by service(), which stops once the time it has spent would
+         pass a budget, so a task calling it every period never holds up the
+         control tasks for longer than that budget. writerFunction() is such
+         a task.
+
+         Values are written in fixed point with a set number of decimals,
+         for example 1.5 with two decimals is written as 1.50. Values too
+         large for that, inf and nan are written as text with six
+         significant digits.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import sys
+import micropython
+from time import ticks_us, ticks_add, ticks_diff
+
+## @brief Largest number of bytes one value takes in a row
+#  @details A value written with six significant digits and an exponent,
+#           and a separator
+#
+VALUE_SIZE = micropython.const(14)
+
+## @brief Largest scaled value written in fixed point
+#  @details Larger values are written with six significant digits through a
+#           string, which allocates
+#
+FIXED_MAX = micropython.const(0x3FFFFFFF)
+
+## @brief Creates a state called S0_INIT
+#  @details Variable will be the state 0 for starting the program
+#
+S0_INIT = micropython.const(0)
+
+## @brief Creates a state called S1_RUN
+#  @details Variable will be the state 1 for writing buffered data
+#
+S1_RUN = micropython.const(1)
+
+if sys.implementation.name == 'micropython':
+
+    @micropython.viper
+    def _put_fixed(buf, pos: int, n: int, decimals: int) -> int:
+        '''!@brief Writes n/10**decimals as text into buf at pos.
+            @return The position after the last character written.
+        '''
+        p = ptr8(buf)
+        if n < 0:
+            p[pos] = 45
+            pos += 1
+            n = 0 - n
+        length = 1
+        t = n
+        while t >= 10:
+            t = t // 10
+            length += 1
+        if length < decimals + 1:
+            length = decimals + 1
+        end = pos + length
+        if decimals > 0:
+            end += 1
+        i = end - 1
+        k = 0
+        while k < length:
+            if decimals > 0 and k == decimals:
+                p[i] = 46
+                i -= 1
+            p[i] = 48 + n % 10
+            n = n // 10
+            i -= 1
+            k += 1
+        return end
+
+else:
+
+    def _put_fixed(buf, pos, n, decimals):
+        '''!@brief Writes n/10**decimals as text into buf at pos.
+            @return The position after the last character written.
+        '''
+        if n < 0:
+            buf[pos] = 45
+            pos += 1
+            n = -n
+        length = 1
+        t = n
+        while t >= 10:
+            t //= 10
+            length += 1
+        if length < decimals + 1:
+            length = decimals + 1
+        end = pos + length + (1 if decimals > 0 else 0)
+        i = end - 1
+        for k in range(length):
+            if decimals > 0 and k == decimals:
+                buf[i] = 46
+                i -= 1
+            buf[i] = 48 + n % 10
+            n //= 10
+            i -= 1
+        return end
+
+class LogWriter:
+    '''!@brief A file written from a preallocated buffer in page-sized chunks.
+    '''
+
+    def __init__(self, filename, mode='a', size=2048, page=512):
+        '''!@brief Opens the file and allocates the buffer.
+            @param filename Name of the file.
+            @param mode Mode the file is opened in, 'a' to append or 'w' to
+                        replace it. The file is always opened in binary.
+            @param size Size of the buffer in bytes.
+            @param page Number of bytes written to the file at once. The
+                        flash filesystem works in 512 byte blocks.
+        '''
+        self.buf = bytearray(size)
+        self._mv = memoryview(self.buf)
+        self.size = size
+        self.page = page
+        ## Time in microseconds taken by the last page written
+        self.pageTime = 0
+        self._start = 0
+        self._end = 0
+        self._flush = False
+        self._f = open(filename, mode + 'b')
+
+    def pending(self):
+        '''!@brief Returns the number of bytes not yet written to the file.
+        '''
+        return self._end - self._start
+
+    def _room(self, n):
+        '''!@brief Makes room for n bytes at the end of the buffer.
+            @details Moves the pending bytes to the front of the buffer when
+                     they do not overlap their new place.
+            @return True if there is room.
+        '''
+        if self._end + n <= self.size:
+            return True
+        m = self._end - self._start
+        if m + n > self.size or m > self._start:
+            return False
+        self._mv[0:m] = self._mv[self._start:self._end]
+        self._start = 0
+        self._end = m
+        return True
+
+    def write(self, data):
+        '''!@brief Adds bytes to the buffer.
+            @param data Bytes or str to add.
+            @return True if the data was added, False if the buffer is full.
+        '''
+        if isinstance(data, str):
+            data = data.encode()
+        n = len(data)
+        if not self._room(n):
+            return False
+        self._mv[self._end:self._end + n] = data
+        self._end += n
+        return True
+
+    def write_row(self, values, decimals=2, end=',\n'):
+        '''!@brief Formats a row of numbers into the buffer.
+            @details The values are separated by commas and followed by end.
+                     Data.csv rows end with a comma as they always have.
+            @param values Sequence of numbers.
+            @param decimals Number of decimals written for each value.
+            @param end Text written after the last value.
+            @return A memoryview of the row in the buffer, valid until the
+                    next call, or None if the buffer has no room for it.
+        '''
+        if not self._room(VALUE_SIZE*len(values) + len(end)):
+            return None
+        buf = self.buf
+        start = self._end
+        pos = start
+        scale = 10**decimals
+        first = True
+        for v in values:
+            if not first:
+                buf[pos] = 44
+                pos += 1
+            first = False
+            n = v*scale
+            # Checked as a float first, int() raises for inf and nan
+            if n == n and -FIXED_MAX < n < FIXED_MAX:
+                n = int(n + 0.5) if n >= 0 else int(n - 0.5)
+                pos = _put_fixed(buf, pos, n, decimals)
+            else:
+                text = '{:.6g}'.format(v)
+                self._mv[pos:pos + len(text)] = text.encode()
+                pos += len(text)
+        for c in end:
+            buf[pos] = ord(c)
+            pos += 1
+        self._end = pos
+        return self._mv[start:pos]
+
+    def flush(self):
+        '''!@brief Asks service() to also write the last part of a page.
+            @details The file is flushed to flash once everything has been
+                     written.
+        '''
+        self._flush = True
+
+    def service(self, budget=2000):
+        '''!@brief Writes pages of the buffer to the file within a time budget.
+            @details Writes at least one page per call when one is ready.
+                     Another page is only started when the time spent so far
+                     plus the time the last page took fits the budget.
+            @param budget Time in microseconds the call may take.
+            @return The number of bytes still pending.
+        '''
+        t0 = ticks_us()
+        wrote = False
+        while True:
+            m = self._end - self._start
+            if m >= self.page:
+                n = self.page
+            elif m > 0 and self._flush:
+                n = m
+            else:
+                break
+            if wrote and ticks_diff(ticks_us(), t0) + self.pageTime > budget:
+                break
+            t = ticks_us()
+            self._f.write(self._mv[self._start:self._start + n])
+            self.pageTime = ticks_diff(ticks_us(), t)
+            self._start += n
+            wrote = True
+            if self._start == self._end:
+                self._start = 0
+                self._end = 0
+        if self._flush and self._end == self._start:
+            self._f.flush()
+            self._flush = False
+        return self._end - self._start
+
+    def close(self):
+        '''!@brief Writes everything still pending and closes the file.
+        '''
+        if self._end > self._start:
+            self._f.write(self._mv[self._start:self._end])
+        self._start = 0
+        self._end = 0
+        self._f.close()
+
+def writerFunction(taskName, period, logs, budget=2000):
+    '''! @brief Task that writes buffered logs to their files.
+         @details Calls LogWriter.service() on each log every period, sharing
+                  the budget between them.
+         @param taskName Names the task so that multiple tasks can be run simultaneously.
+         @param period Passes in the period at which the code is run.
+         @param logs A list of LogWriter objects.
+         @param budget Time in microseconds the task may spend writing each period.
+    '''
+
+    state = S0_INIT
+
+    start_time = ticks_us()
+
+    next_time = ticks_add(start_time, period)
+
+    while True:
+
+        current_time = ticks_us()
+        if ticks_diff(current_time, next_time) >= 0:
+
+            if state == S0_INIT:
+                state = S1_RUN
+
+            elif state == S1_RUN:
+                for log in logs:
+                    log.service(budget//len(logs))
+
+            next_time = ticks_add(next_time, period)
+
+            yield state
+
+        else:
+
+            yield None
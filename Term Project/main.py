@@ -23,7 +23,34 @@ import BNO055
 import closedloop5
 import TTask
 import touchpad
-from pyb import Pin
+import scheduler
+import profiler
+import telemetry
+import recorder
+import logwriter
+import estimator
+import fastloop
+import aiotasks
+from pyb import Pin, USB_VCP
+import micropython
+
+# Room for tracebacks raised inside the IMU timer interrupt
+micropython.alloc_emergency_exception_buf(100)
+
+## @brief Selects how the control step is run.
+#  @details False runs the sensors, controllers and motors as cooperative
+#           tasks. True runs them together from a timer interrupt with a
+#           fastloop.FastLoop once the sensors are calibrated, so the
+#           control period no longer depends on how long the other tasks take.
+#
+FAST_LOOP = False
+
+## @brief Selects the runtime of the tasks.
+#  @details False runs the tasks on scheduler.Scheduler. True runs each task
+#           as a uasyncio coroutine with aiotasks, and the user task reads
+#           the keyboard through a StreamReader over the USB_VCP.
+#
+ASYNC_TASKS = False
 
 # @brief Share variable for motor 1 duty cycle.
 # @details The variable allows a value duty1 to read and write when filled
@@ -43,14 +70,16 @@ duty2 = shares.Share(0)
 calStat = shares.Share((0,0,0,0))
 
 # @brief Share variable for euler angles.
-# @details The tuple contains the values for the angles in the x,y,z directions.
+# @details The array contains the angles about the z,y,x axes, indexed by
+#          IMUTask.EUL_Z, IMUTask.EUL_Y and IMUTask.EUL_X.
 #
-eulAng = shares.Share((0,0,0))
+eulAng = shares.ArrayShare(3)
 
 # @brief Share variable for angular velocities.
-# @details The tuple contains the values for the angular velocities in the x,y,z directions.
+# @details The array contains the angular velocities about the x,y,z axes, indexed
+#          by IMUTask.GYR_X, IMUTask.GYR_Y and IMUTask.GYR_Z.
 #
-gyrVel = shares.Share((0,0,0))
+gyrVel = shares.ArrayShare(3)
 
 ## @brief Share variable for Kp for inner loop
 #  @details Shares user input Kp values to inner loop control
@@ -114,15 +143,26 @@ dFlag = shares.Share(False)
 #
 DFlag = shares.Share(False)
 
+## @brief Share variable for telemetry streaming
+#  @details True while the telemetry task streams binary frames over USB
+#
+streamFlag = shares.Share(False)
+
+## @brief Share variable for the flight recorder
+#  @details Set by the user task to make the flight recorder save its recording
+#
+recFlag = shares.Share(False)
+
 # @brief Share variable for position.
-# @details The tuple contains the values for the x,y,z positions of the touch pad.
+# @details The array contains the values for the x,y,z positions of the touch pad.
 #
-Pos = shares.Share((0,0,0))
+Pos = shares.ArrayShare(3)
 
 # @brief Share variable for abfiltering.
-# @details The tuple contains the values for the positions and velocities of the ball.
+# @details The array contains the values for the positions and velocities of the ball,
+#          indexed by TTask.ABF_X, TTask.ABF_VX, TTask.ABF_Y, TTask.ABF_VY and TTask.ABF_Z.
 #
-abfShare = shares.Share((0,0,0,0,0))
+abfShare = shares.ArrayShare(5)
 
 # @brief Object for the motor method of the DRV8847 class that instantiates the pins and channels.
 # @details This object pulls in the pins and channels defined in the motor method 
@@ -142,7 +182,14 @@ motor_2 = motor5.Motor(3, Pin.cpu.B0, Pin.cpu.B1, 3, 4)
 bno_obj = BNO055.BNO055()
 
 # @brief Object for the Touchpad class of the touchpad module.
-# @details This object instatiates values for the pins and dimensions of the touchpad
+# @details This object instatiates values for the pins and dimensions of the touchpad.
+#          Readings keep the plain mean of 25 samples. Adding
+#          touch.set_filter(adcfilter.TRIMMED, nmin=8, nmax=25, trim=2), with
+#          import adcfilter, takes a trimmed mean of 8 samples while the ball
+#          is settled, rising to 25 samples while it moves. It stays off until
+#          it has been checked on the panel. Positions are computed in float.
+#          Passing fixed=True computes them with the fixedpoint viper kernels
+#          instead, which stays off until it has been timed on the Nucleo.
 #
 touch = touchpad.Touchpad(Pin.cpu.A7, Pin.cpu.A1, Pin.cpu.A6, Pin.cpu.A0, 176, 100)
 
@@ -166,33 +213,149 @@ CLC_I1 = closedloop5.ClosedLoop(0, 0, 0, yShare, 45, -45)
 #
 CLC_I2 = closedloop5.ClosedLoop(0, 0, 0, yShare, 45, -45)
 
+# @brief Object for the FlightRecorder class of the recorder module.
+# @details Holds the last 3 seconds of the platform state at 10 ms, 2 seconds
+#          before a trigger and 1 second after it, in 15.6 kB.
+#
+flightRec = recorder.FlightRecorder(300, 100)
+
+# @brief Object for the LogWriter class of the logwriter module.
+# @details Keeps Data.csv open for the whole session. The user task formats
+#          rows into its buffer and the logger task writes them to flash.
+#
+dataLog = logwriter.LogWriter('Data.csv')
+
+# @brief Gain schedule of the inner loops, None to keep the gains fixed.
+# @details gainsched.GainTable(88, 12) schedules the inner loop gains over
+#          the ball distance along each axis, up to the 88 mm half length of
+#          the panel, and the platform tilt, with the gains entered by the
+#          user as the gains at the center. It stays off until it is shown
+#          to hold the ball better than fixed gains.
+#
+gainTable = None
+
+# @brief Object for the AlphaBeta class of the estimator module.
+# @details Filters the touchpad readings with the gains the touchpad task
+#          has always used. estimator.SteadyKalman(10_000) also uses the
+#          platform tilt from the IMU, but the sign of the tilt it uses, EUL_Y
+#          pushing the ball towards +x and EUL_X towards -y, is taken from
+#          the simulated platform and has not been checked on the hardware.
+#
+ballEst = estimator.AlphaBeta(0.85, 0.005, 10_000)
+
+if FAST_LOOP:
+    ## @brief Shared parameter set by the IMU task once the IMU is calibrated.
+    #
+    imuReady = shares.Share(False)
+    
+    ## @brief Shared parameter set by the touchpad task once the touchpad is calibrated.
+    #
+    touchReady = shares.Share(False)
+    
+    # @brief Object for the BallTracker class of the TTask module.
+    # @details Shared by the touchpad task and the fast loop, so the ball
+    #          contact state carries over when the touchpad is handed over.
+    #
+    ballTrack = TTask.BallTracker(ballEst)
+    
+    # @brief Object for the FastLoop class of the fastloop module.
+    # @details Runs the control step at 100 Hz from timer 5. Timer 3 drives
+    #          the motors.
+    #
+    fastLoop = fastloop.FastLoop(5, 100, touch, ballTrack, bno_obj,
+                                 CTask5.Cascade((CLC_O1, CLC_I1, CLC_O2, CLC_I2),
+                                                (KpShare, KdShare, KiShare, KpOut, KdOut, KiOut),
+                                                (yShare, YSHARE), yFlag, (duty1, duty2), gainTable),
+                                 (motor_1, motor_2), abfShare, eulAng, gyrVel, wFlag)
+else:
+    # @brief Timer-driven sampler for the BNO055 object.
+    # @details Timer 4 schedules a burst read of the IMU every 10 ms into a double
+    #          buffer, so the IMU task only publishes the latest reading.
+    #
+    imuSampler = BNO055.MotionSampler(bno_obj, 4, 100)
+
+## @brief List of the timing profilers of all tasks.
+#  @details Filled in by profiled() and passed to the user task so that the
+#           statistics can be printed or saved from the user interface.
+#
+taskStats = []
+
+def profiled(name, period, priority, gen):
+    '''! @brief Wraps a task generator in a profiler and a scheduler task.
+         @param name Name of the task.
+         @param period Period of the task in microseconds.
+         @param priority Priority of the task in the scheduler.
+         @param gen The task generator.
+         @return A scheduler.Task running the profiled generator.
+    '''
+    prof = profiler.TaskProfiler(name, period)
+    taskStats.append(prof)
+    return scheduler.Task(name, period, priority, prof.wrap(gen))
+
 if __name__ == '__main__':
     
+    ## @brief Keyboard input of the user task when ASYNC_TASKS is True.
+    #  @details None makes the user task read the USB_VCP itself.
+    #
+    uiPort = aiotasks.StreamPort() if ASYNC_TASKS else None
+    
     ## @brief Creates a list of tasks to be computed simultaneously.
     #  @details Contains the tasks that are used to run the User Interface.
-    #           The tasks run in a cooperative fashion.       
+    #           The tasks run in a cooperative fashion. Each entry gives the
+    #           task name, period in microseconds and priority. When several
+    #           tasks are due together the sensor tasks run first, then the
+    #           controllers, then the motors and finally the user interface.
+    #           Every task is wrapped in a profiler that records its timing.
     #
-    taskList = [UTask5.taskUserFCN ('Task User', 50_000, eulAng, gyrVel, duty1, duty2, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, wFlag, dFlag, DFlag, abfShare, yShare, YSHARE, yFlag),
+    taskList = [profiled('Task User', 50_000, 0, UTask5.taskUserFCN ('Task User', 50_000, eulAng, gyrVel, duty1, duty2, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, wFlag, dFlag, DFlag, abfShare, yShare, YSHARE, yFlag, taskStats, streamFlag, recFlag, dataLog, uiPort)),
                 #ETask5.updateFunction ('Task Encoder', 10_000, zFlag, encData, ENC1, deltaTime, CLC),
-                MTask5.motorFunction ('Task Motor 1', 10_000, motor_1, duty1),
-                MTask5.motorFunction ('Task Motor 2', 10_000, motor_2, duty2),
                 #STask4.safetyFunction('Task Safety', 10_000, motor_drv, cFlag, eFlag),
-                CTask5.loopFunction('Task Motor Control 1', 10_000, CLC_O1, CLC_I1, eulAng, wFlag, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, duty1, gyrVel, 1, 1, dFlag, DFlag, abfShare, 0, 1, yShare, yFlag),
-                CTask5.loopFunction('Task Motor Control 2', 10_000, CLC_O2, CLC_I2, eulAng, wFlag, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, duty2, gyrVel, 2, 0, dFlag, DFlag, abfShare, 2, 3, YSHARE, yFlag),
-#                CTask5.loopFunction('Task Inner Loop 1', 10_000, kFlag, CLC, eulAng, wFlag, KpShare, KdShare, KiShare, yShare, duty1, gyrVel, 1, 1, dFlag),
-#                CTask5.loopFunction('Task Inner Loop 2', 10_000, kFlag, CLC, eulAng, wFlag, KpShare, KdShare, KiShare, yShare, duty2, gyrVel, 2, 0, dFlag),
-
-                IMUTask.bnoFunction('Task IMU', 10_000, calStat, bno_obj, eulAng, gyrVel),
-                TTask.TouchpadFunction('Task Touchpad', 10_000, Pos, touch, 0.85, 0.005, abfShare)]
+                profiled('Task Telemetry', 10_000, 0, telemetry.streamFunction('Task Telemetry', 10_000, USB_VCP(), streamFlag, abfShare, eulAng, gyrVel, duty1, duty2)),
+                profiled('Task Recorder', 10_000, 1, recorder.recorderFunction('Task Recorder', 10_000, flightRec, abfShare, eulAng, gyrVel, duty1, duty2, recFlag)),
+                profiled('Task Logger', 10_000, 0, logwriter.writerFunction('Task Logger', 10_000, [dataLog], 2000))]
+    
+    if FAST_LOOP:
+        # The sensor tasks only calibrate and hand the sensors to the fast loop
+        taskList += [profiled('Task IMU', 10_000, 3, IMUTask.bnoFunction('Task IMU', 10_000, calStat, bno_obj, eulAng, gyrVel, None, imuReady)),
+                     profiled('Task Touchpad', 10_000, 3, TTask.TouchpadFunction('Task Touchpad', 10_000, Pos, touch, 0.85, 0.005, abfShare, ballEst, eulAng, touchReady, ballTrack)),
+                     profiled('Task Fast Loop', 10_000, 2, fastloop.fastFunction('Task Fast Loop', 10_000, fastLoop, (imuReady, touchReady), dFlag, DFlag))]
+    else:
+        taskList += [profiled('Task Motors', 10_000, 1, MTask5.motorsFunction ('Task Motors', 10_000, (motor_1, motor_2), (duty1, duty2))),
+#                    profiled('Task Motor 1', 10_000, 1, MTask5.motorFunction ('Task Motor 1', 10_000, motor_1, duty1)),
+#                    profiled('Task Motor 2', 10_000, 1, MTask5.motorFunction ('Task Motor 2', 10_000, motor_2, duty2)),
+                     profiled('Task Motor Control', 10_000, 2, CTask5.pipelineFunction('Task Motor Control', 10_000, CLC_O1, CLC_I1, CLC_O2, CLC_I2, eulAng, gyrVel, abfShare, wFlag, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, duty1, duty2, yShare, YSHARE, yFlag, dFlag, DFlag, gainTable)),
+#                    profiled('Task Motor Control 1', 10_000, 2, CTask5.loopFunction('Task Motor Control 1', 10_000, CLC_O1, CLC_I1, eulAng, wFlag, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, duty1, gyrVel, IMUTask.EUL_Y, IMUTask.GYR_Y, dFlag, DFlag, abfShare, TTask.ABF_X, TTask.ABF_VX, yShare, yFlag)),
+#                    profiled('Task Motor Control 2', 10_000, 2, CTask5.loopFunction('Task Motor Control 2', 10_000, CLC_O2, CLC_I2, eulAng, wFlag, KpShare, KdShare, KiShare, KpOut, KdOut, KiOut, duty2, gyrVel, IMUTask.EUL_X, IMUTask.GYR_X, dFlag, DFlag, abfShare, TTask.ABF_Y, TTask.ABF_VY, YSHARE, yFlag)),
+#                    CTask5.loopFunction('Task Inner Loop 1', 10_000, kFlag, CLC, eulAng, wFlag, KpShare, KdShare, KiShare, yShare, duty1, gyrVel, 1, 1, dFlag),
+#                    CTask5.loopFunction('Task Inner Loop 2', 10_000, kFlag, CLC, eulAng, wFlag, KpShare, KdShare, KiShare, yShare, duty2, gyrVel, 2, 0, dFlag),
+                     profiled('Task IMU', 10_000, 3, IMUTask.bnoFunction('Task IMU', 10_000, calStat, bno_obj, eulAng, gyrVel, imuSampler)),
+                     profiled('Task Touchpad', 10_000, 3, TTask.TouchpadFunction('Task Touchpad', 10_000, Pos, touch, 0.85, 0.005, abfShare, ballEst, eulAng))]
     
-    while True:
+    if ASYNC_TASKS:
         try:
-            for task in taskList:
-                next(task)
+            aiotasks.run(taskList, USB_VCP(), uiPort)
         except KeyboardInterrupt:
-            KpShare.write(0)
-            KdShare.write(0)
-            duty1.write(0)
-            duty2.write(0)
-            break
+            pass
+    else:
+        ## @brief Scheduler that resumes each task only when it is due.
+        #  @details Idles the CPU while no task is due instead of polling.
+        #
+        sched = scheduler.Scheduler()
+        for task in taskList:
+            sched.add(task)
+        
+        while True:
+            try:
+                sched.run()
+            except KeyboardInterrupt:
+                break
+    if FAST_LOOP:
+        fastLoop.stop()
+    KpShare.write(0)
+    KdShare.write(0)
+    duty1.write(0)
+    duty2.write(0)
+    motor_1.set_duty(0)
+    motor_2.set_duty(0)
+    dataLog.close()
     print('Stopping Motor')
\ No newline at end of file
@@ -51,20 +51,66 @@ class Motor:
         
         self.PWM_tim_CH_X = self.PWM_tim.channel(CH_X, Timer.PWM_INVERTED, pin=self.IN1_pin)
         self.PWM_tim_CH_Y = self.PWM_tim.channel(CH_Y, Timer.PWM_INVERTED, pin=self.IN2_pin)
+        
+        ## Compare value of a 100% duty cycle
+        self.top = self.PWM_tim.period() + 1
+        ## Timer counts per percent of duty cycle
+        self.scale = self.top/100
+        
+        # Last duty and compare values written, -1 until the first write
+        self._duty = None
+        self._cx = -1
+        self._cy = -1
     
     def set_duty (self, duty):        
         '''!@brief Set the PWM duty cycle for the motor channel.
             @details This method sets the duty cycle to be sent
                      to the motor to the given level. Positive values
                      cause effort in one direction, negative values
-                     in the opposite direction.
+                     in the opposite direction. Nothing is done when the
+                     duty is the same as the last one, and the duty is
+                     turned into compare values with the precomputed scale.
             @param duty A signed number holding the duty
                         27 cycle of the PWM signal sent to the motor
         '''
         
-        if duty >= 0:
-            self.PWM_tim_CH_X.pulse_width_percent(0)
-            self.PWM_tim_CH_Y.pulse_width_percent(duty)
-        elif duty < 0:
-            self.PWM_tim_CH_X.pulse_width_percent(-duty)
-            self.PWM_tim_CH_Y.pulse_width_percent(0)
\ No newline at end of file
+        if duty == self._duty:
+            return
+        self._duty = duty
+        self._write(self.counts(duty))
+    
+    def counts (self, duty):
+        '''!@brief Converts a duty cycle to the timer counts of set_counts().
+            @param duty A signed duty cycle in percent, limited to 100.
+            @return The signed number of timer counts.
+        '''
+        if duty > 100:
+            duty = 100
+        elif duty < -100:
+            duty = -100
+        return int(duty*self.scale)
+    
+    def set_counts (self, counts):
+        '''!@brief Set the PWM compare values for the motor channel in timer counts.
+            @details Positive values cause effort in the same direction as a
+                     positive duty in set_duty().
+            @param counts A signed number of timer counts, up to top.
+        '''
+        self._duty = None
+        self._write(counts)
+    
+    def _write (self, counts):
+        '''!@brief Writes the compare registers whose value changes.
+        '''
+        if counts >= 0:
+            cx = 0
+            cy = counts if counts < self.top else self.top
+        else:
+            cx = -counts if -counts < self.top else self.top
+            cy = 0
+        if cx != self._cx:
+            self.PWM_tim_CH_X.pulse_width(cx)
+            self._cx = cx
+        if cy != self._cy:
+            self.PWM_tim_CH_Y.pulse_width(cy)
+            self._cy = cy
@@ -0,0 +1,145 @@
+"""!
+@file profiler.py
+@brief Timing instrumentation for the generator tasks.
+@details A TaskProfiler wraps a task generator and records how late each run
+         started and how long its body took. Both are kept in fixed-size
+         histograms together with counters for missed deadlines and
+         overruns, so the statistics can be collected for a whole session
+         without allocating memory.
+
+         Lateness is measured against a release time that starts one period
+         after the task generator is first resumed and then advances by one
+         period per run, just like next_time inside the tasks.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+from array import array
+import scheduler
+
+class TaskProfiler:
+    '''!@brief Records the timing of one task.
+    '''
+
+    def __init__(self, name, period, nbins=20, clock=None):
+        '''!@brief Creates an empty profiler.
+            @param name Name of the profiled task.
+            @param period Period of the task in microseconds.
+            @param nbins Number of histogram bins. Each bin is period/nbins
+                         wide and the last bin also counts every value of one
+                         period or more.
+            @param clock Clock object, scheduler.TicksClock() when left as None.
+        '''
+        if clock is None:
+            clock = scheduler.TicksClock()
+        self.clock = clock
+        self.name = name
+        self.period = period
+        self.nbins = nbins
+        self.binWidth = period//nbins
+        ## Histogram of the lateness of each run
+        self.lateHist = array('L', nbins*[0])
+        ## Histogram of the run time of each run
+        self.execHist = array('L', nbins*[0])
+        self.reset()
+
+    def reset(self):
+        '''!@brief Clears all statistics.
+        '''
+        for n in range(self.nbins):
+            self.lateHist[n] = 0
+            self.execHist[n] = 0
+        self.runs = 0
+        ## Runs that finished after the end of their period
+        self.missed = 0
+        ## Runs whose body took longer than one period
+        self.overruns = 0
+        self.lateMax = 0
+        self.execMax = 0
+        self.lateSum = 0
+        self.execSum = 0
+
+    def wrap(self, gen):
+        '''!@brief Generator that runs a task and records its timing.
+            @details Yields whatever the wrapped task yields, so it can be put
+                     in the task list in place of the task itself.
+                     The first release is one period after the first resume,
+                     when the task sets its own start_time and next_time.
+            @param gen The task generator to profile.
+        '''
+        clock = self.clock
+        self._release = clock.ticks_add(clock.ticks_us(), self.period)
+        while True:
+            start = clock.ticks_us()
+            state = next(gen)
+            if state is not None:
+                stop = clock.ticks_us()
+                self.record(clock.ticks_diff(start, self._release),
+                            clock.ticks_diff(stop, start))
+                self._release = clock.ticks_add(self._release, self.period)
+            yield state
+
+    def record(self, late, exe):
+        '''!@brief Adds one run to the statistics.
+            @param late Time in microseconds between the release and the start
+                        of the run.
+            @param exe Run time of the task body in microseconds.
+        '''
+        if late < 0:
+            late = 0
+        self.runs += 1
+        self.lateSum += late
+        self.execSum += exe
+        if late > self.lateMax:
+            self.lateMax = late
+        if exe > self.execMax:
+            self.execMax = exe
+        if exe > self.period:
+            self.overruns += 1
+        if late + exe > self.period:
+            self.missed += 1
+        self.lateHist[min(late//self.binWidth, self.nbins - 1)] += 1
+        self.execHist[min(exe//self.binWidth, self.nbins - 1)] += 1
+
+    def print_stats(self):
+        '''!@brief Prints a summary of the statistics.
+        '''
+        runs = self.runs if self.runs else 1
+        print(f'{self.name}: {self.runs} runs, {self.missed} missed, '
+              f'{self.overruns} overruns')
+        print(f'    lateness mean {self.lateSum/runs:.0f} us, max {self.lateMax} us')
+        print(f'    run time mean {self.execSum/runs:.0f} us, max {self.execMax} us')
+
+def print_stats(profilers):
+    '''!@brief Prints the statistics of several profilers.
+        @param profilers List of TaskProfiler objects.
+    '''
+    for prof in profilers:
+        prof.print_stats()
+
+def dump_csv(profilers, filename='Stats.csv'):
+    '''!@brief Writes the statistics of several profilers to a CSV file.
+        @details Writes a header row and a data row for each task, since the
+                 bin edges depend on the period of the task. The histogram
+                 columns are labelled with the lower edge of each bin in
+                 microseconds.
+        @param profilers List of TaskProfiler objects.
+        @param filename Name of the CSV file to write.
+    '''
+    with open(filename, 'w') as f:
+        for prof in profilers:
+            f.write('task,period,runs,missed,overruns,late_max,exec_max,late_sum,exec_sum')
+            for kind in ('late', 'exec'):
+                for n in range(prof.nbins):
+                    f.write(f',{kind}_{n*prof.binWidth}')
+            f.write('\n')
+            f.write(f'{prof.name},{prof.period},{prof.runs},{prof.missed},'
+                    f'{prof.overruns},{prof.lateMax},{prof.execMax},'
+                    f'{prof.lateSum},{prof.execSum}')
+            for hist in (prof.lateHist, prof.execHist):
+                for count in hist:
+                    f.write(f',{count}')
+            f.write('\n')
@@ -0,0 +1,293 @@
+"""!
+@file recorder.py
+@brief Always-on flight recorder for the platform state.
+@details A FlightRecorder keeps the most recent records of the platform
+         state in one preallocated circular array, so the memory it uses is
+         fixed when it is created. When a trigger fires, the recorder keeps
+         recording for a set number of records and then freezes, holding
+         the records from before and after the trigger. The recorder task
+         then writes them to a CSV file a few rows per tick and re-arms.
+
+         The task triggers when the ball is lost, when a motor stays
+         saturated, or when the user presses "f".
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+from time import ticks_us, ticks_add, ticks_diff
+import micropython
+from array import array
+from TTask import ABF_X, ABF_VX, ABF_Y, ABF_VY, ABF_Z
+from IMUTask import EUL_X, EUL_Y, EUL_Z, GYR_X, GYR_Y, GYR_Z
+
+## @brief Names of the fields of one record, in order
+#  @details The time is in milliseconds since the task started. The ball
+#           position and velocity along x are in panel coordinates, as in
+#           Data.csv.
+#
+FIELDS = ('t', 'x', 'vx', 'y', 'vy', 'thz', 'thy', 'thx', 'omx', 'omy', 'omz', 'duty1', 'duty2')
+
+## @brief Trigger reason when the ball leaves the panel
+#
+TRIG_BALL = micropython.const(1)
+
+## @brief Trigger reason when a motor stays saturated
+#
+TRIG_SAT = micropython.const(2)
+
+## @brief Trigger reason when the user asks for a dump
+#
+TRIG_KEY = micropython.const(3)
+
+## @brief Names of the trigger reasons, indexed by reason
+#
+TRIG_NAMES = ('none', 'ball lost', 'saturation', 'keypress')
+
+## @brief Creates a state called ARMED
+#  @details The recorder overwrites its oldest record and waits for a trigger
+#
+ARMED = micropython.const(0)
+
+## @brief Creates a state called TRIGGERED
+#  @details The recorder records the records after the trigger
+#
+TRIGGERED = micropython.const(1)
+
+## @brief Creates a state called FROZEN
+#  @details The recorder holds its records until it is re-armed
+#
+FROZEN = micropython.const(2)
+
+## @brief Creates a state called S0_INIT
+#  @details Variable will be the state 0 for starting the program
+#
+S0_INIT = micropython.const(0)
+
+## @brief Creates a state called S1_RECORD
+#  @details Variable will be the state 1 for recording and checking triggers
+#
+S1_RECORD = micropython.const(1)
+
+## @brief Creates a state called S2_DUMP
+#  @details Variable will be the state 2 for writing a frozen recording to file
+#
+S2_DUMP = micropython.const(2)
+
+class FlightRecorder:
+    '''!@brief Circular buffer of fixed-size records with a trigger.
+    '''
+
+    def __init__(self, records=300, post=100, nfields=len(FIELDS)):
+        '''!@brief Allocates the record buffer.
+            @details Uses 4*records*nfields bytes.
+            @param records Number of records held.
+            @param post Number of records kept after a trigger. The other
+                        records hold the time before the trigger.
+            @param nfields Number of float fields per record.
+        '''
+        if not 0 <= post < records:
+            raise ValueError('post must be smaller than records')
+        self.records = records
+        self.post = post
+        self.nfields = nfields
+        ## Record storage, record i starts at index i*nfields
+        self.buf = array('f', records*nfields*[0])
+        self.rearm()
+
+    def rearm(self):
+        '''!@brief Forgets the recording and starts waiting for a trigger.
+        '''
+        self.state = ARMED
+        ## Index of the record written next
+        self.head = 0
+        ## Number of records held
+        self.count = 0
+        ## Reason of the last trigger
+        self.reason = 0
+        ## Position of the trigger record counted from the oldest record
+        self.trigIndex = 0
+        self._left = 0
+
+    def record(self, values):
+        '''!@brief Stores one record, unless the recorder is frozen.
+            @param values Sequence of nfields numbers.
+        '''
+        if self.state == FROZEN:
+            return
+        n = self.nfields
+        start = self.head*n
+        buf = self.buf
+        for i in range(n):
+            buf[start + i] = values[i]
+        self.head += 1
+        if self.head == self.records:
+            self.head = 0
+        if self.count < self.records:
+            self.count += 1
+        if self.state == TRIGGERED:
+            self._left -= 1
+            if self._left <= 0:
+                self.state = FROZEN
+                self.trigIndex = self.count - 1 - self.post
+
+    def trigger(self, reason):
+        '''!@brief Fires the trigger if the recorder is armed.
+            @details The recording freezes after post more records. The
+                     trigger is ignored while a recording is being held.
+            @param reason TRIG_BALL, TRIG_SAT or TRIG_KEY.
+            @return True if the trigger was accepted.
+        '''
+        if self.state != ARMED:
+            return False
+        self.reason = reason
+        if self.post == 0:
+            self.state = FROZEN
+            self.trigIndex = self.count - 1
+        else:
+            self.state = TRIGGERED
+            self._left = self.post
+        return True
+
+    def frozen(self):
+        '''!@brief Checks if a recording is being held.
+        '''
+        return self.state == FROZEN
+
+    def get(self, k, field):
+        '''!@brief Returns one field of a held record.
+            @param k Position of the record counted from the oldest record.
+            @param field Index of the field.
+        '''
+        row = self.head - self.count + k
+        if row < 0:
+            row += self.records
+        return self.buf[row*self.nfields + field]
+
+    def write_rows(self, f, start, n):
+        '''!@brief Writes held records as CSV rows.
+            @param f An open file.
+            @param start Position of the first record counted from the oldest record.
+            @param n Maximum number of records to write.
+            @return The position after the last record written.
+        '''
+        stop = min(start + n, self.count)
+        for k in range(start, stop):
+            f.write(','.join([str(self.get(k, i)) for i in range(self.nfields)]))
+            f.write('\n')
+        return stop
+
+def recorderFunction(taskName, period, rec, abfShare, eulAng, gyrVel, duty1, duty2, recFlag, satLimit=45, satTicks=20, filename='Flight.csv', rowsPerTick=10):
+    '''! @brief Task that records the platform state and dumps it on a trigger.
+         @details Records one FIELDS record per period. A trigger fires when
+                  the ball contact flag drops, when either duty stays at
+                  satLimit or beyond for satTicks periods, or when recFlag is
+                  set. Once the recorder freezes, the records are written to
+                  filename, rowsPerTick rows per period, after a comment line
+                  naming the trigger and a header line. Each dump replaces
+                  the file. The recorder is re-armed when the file is closed.
+         @param taskName Names the task so that multiple tasks can be run simultaneously.
+         @param period Passes in the period at which the code is run.
+         @param rec The FlightRecorder object.
+         @param abfShare A shares.ArrayShare holding the filtered ball position and velocities.
+         @param eulAng A shares.ArrayShare containing the euler angles.
+         @param gyrVel A shares.ArrayShare containing the angular velocities.
+         @param duty1 A shared parameter holding the duty cycle of motor 1.
+         @param duty2 A shared parameter holding the duty cycle of motor 2.
+         @param recFlag A shared parameter set to True to trigger a dump, cleared by this task.
+         @param satLimit Duty in percent counted as saturated.
+         @param satTicks Number of saturated periods in a row that trigger a dump.
+         @param filename Name of the CSV file written.
+         @param rowsPerTick Number of rows written per period while dumping.
+    '''
+
+    state = S0_INIT
+
+    start_time = ticks_us()
+
+    next_time = ticks_add(start_time, period)
+
+    row = array('f', len(FIELDS)*[0])
+
+    # Copies of the shares, which a fast loop may write between two reads
+    abf = array('f', abfShare.read())
+
+    eul = array('f', eulAng.read())
+
+    gyr = array('f', gyrVel.read())
+
+    contact = 0
+
+    sat = 0
+
+    k = 0
+
+    f = None
+
+    while True:
+
+        current_time = ticks_us()
+        if ticks_diff(current_time, next_time) >= 0:
+
+            if state == S0_INIT:
+                state = S1_RECORD
+
+            # A period without a consistent copy of every share is skipped
+            elif (state == S1_RECORD and abfShare.snapshot(abf) >= 0
+                  and eulAng.snapshot(eul) >= 0 and gyrVel.snapshot(gyr) >= 0):
+                d1 = duty1.read()
+                d2 = duty2.read()
+                row[0] = ticks_diff(current_time, start_time)/1000
+                row[1] = -abf[ABF_X]
+                row[2] = -abf[ABF_VX]
+                row[3] = abf[ABF_Y]
+                row[4] = abf[ABF_VY]
+                row[5] = eul[EUL_Z]
+                row[6] = eul[EUL_Y]
+                row[7] = eul[EUL_X]
+                row[8] = gyr[GYR_X]
+                row[9] = gyr[GYR_Y]
+                row[10] = gyr[GYR_Z]
+                row[11] = d1
+                row[12] = d2
+                rec.record(row)
+
+                if contact and not abf[ABF_Z]:
+                    rec.trigger(TRIG_BALL)
+                contact = abf[ABF_Z]
+                if d1 >= satLimit or d1 <= -satLimit or d2 >= satLimit or d2 <= -satLimit:
+                    sat += 1
+                    if sat == satTicks:
+                        rec.trigger(TRIG_SAT)
+                else:
+                    sat = 0
+                if recFlag.read():
+                    recFlag.write(False)
+                    rec.trigger(TRIG_KEY)
+
+                if rec.frozen():
+                    f = open(filename, 'w')
+                    f.write(f'# trigger: {TRIG_NAMES[rec.reason]} at record {rec.trigIndex} of {rec.count}\n')
+                    f.write(','.join(FIELDS))
+                    f.write('\n')
+                    k = 0
+                    state = S2_DUMP
+
+            elif state == S2_DUMP:
+                k = rec.write_rows(f, k, rowsPerTick)
+                if k >= rec.count:
+                    f.close()
+                    f = None
+                    print(f'Flight recorder: {TRIG_NAMES[rec.reason]}, {rec.count} records written to {filename}')
+                    rec.rearm()
+                    state = S1_RECORD
+
+            next_time = ticks_add(next_time, period)
+
+            yield state
+
+        else:
+
+            yield None
@@ -0,0 +1,241 @@
+"""!
+@file scheduler.py
+@brief Deadline-aware cooperative scheduler for the generator tasks.
+@details Replaces the busy-poll round robin in main.py. Each task is held in a
+         queue ordered by its next deadline and is only resumed once that
+         deadline has passed. When several tasks are due at once the task
+         with the highest priority runs first. Tasks due within one retry
+         delay of each other count as due at once, so tasks of the same
+         period added one after the other run in priority order every
+         period rather than in the order they were added. Priorities do not
+         preempt: a task due later waits for the earlier ones even if its
+         priority is higher. When nothing is due the scheduler idles the
+         CPU until the earliest deadline.
+
+         The clock is injectable so the scheduler also runs on CPython. A
+         clock object must provide ticks_us(), ticks_add(), ticks_diff() and
+         idle(wait) where wait is the time in microseconds until the next
+         deadline. TicksClock is the clock used on the Nucleo, sim.clock.SimClock
+         is the clock used for host benchmarks.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+class TicksClock:
+    '''!@brief Clock backed by the MicroPython ticks functions.
+        @details Idles with pyb.wfi(), which sleeps until the next interrupt.
+                 The SysTick interrupt wakes the CPU every millisecond, so
+                 waits shorter than that are spent spinning instead.
+    '''
+
+    def __init__(self):
+        '''!@brief Binds the ticks functions of the board.
+            @details The imports are done here so that this module can be
+                     imported on a PC together with a simulated clock.
+        '''
+        from time import ticks_us, ticks_add, ticks_diff
+        from pyb import wfi
+        self.ticks_us = ticks_us
+        self.ticks_add = ticks_add
+        self.ticks_diff = ticks_diff
+        self._wfi = wfi
+
+    def idle(self, wait):
+        '''!@brief Idles the CPU while no task is due.
+            @param wait Time in microseconds until the next deadline.
+        '''
+        if wait >= 1000:
+            self._wfi()
+
+class Task:
+    '''!@brief A generator task managed by the Scheduler.
+        @details The generator keeps its own period logic exactly as in the
+                 round robin. The scheduler keeps a deadline in lockstep with
+                 the generator so that the generator is only resumed when it
+                 is due.
+    '''
+
+    def __init__(self, name, period, priority, gen):
+        '''!@brief Creates a task entry.
+            @param name Name of the task, used for printing.
+            @param period Period of the task in microseconds.
+            @param priority Tasks with larger priorities run first when
+                            several tasks are due at the same time.
+            @param gen The generator object that runs the task.
+        '''
+        self.name = name
+        self.period = period
+        self.priority = priority
+        self.gen = gen
+        self.deadline = 0
+        ## Number of times the generator returned a state
+        self.runs = 0
+        ## Number of times the generator was resumed before it was due
+        self.early = 0
+
+class Scheduler:
+    '''!@brief Runs Task objects in deadline and priority order.
+        @details Tasks wait in a heap ordered by deadline. Tasks that are due
+                 are moved to a second heap ordered by priority, from which
+                 one task is resumed per step. Both heaps are preallocated
+                 when tasks are added so that stepping does not allocate.
+    '''
+
+    def __init__(self, clock=None, retry=100):
+        '''!@brief Creates an empty scheduler.
+            @param clock Clock object, TicksClock() when left as None.
+            @param retry Delay in microseconds before resuming a generator
+                         again if it yielded None because it was not due.
+                         Tasks due within this time of each other are also
+                         released together.
+        '''
+        if clock is None:
+            clock = TicksClock()
+        self.clock = clock
+        self.retry = retry
+        self.tasks = []
+        self._wait = []
+        self._nwait = 0
+        self._ready = []
+        self._nready = 0
+
+    def add(self, task):
+        '''!@brief Adds a task to the scheduler.
+            @details The generator is resumed once to set its start time. The
+                     first deadline is one period after that.
+            @param task The Task object to add.
+        '''
+        self.tasks.append(task)
+        self._wait.append(None)
+        self._ready.append(None)
+        next(task.gen)
+        task.deadline = self.clock.ticks_add(self.clock.ticks_us(), task.period)
+        self._push_wait(task)
+
+    def step(self):
+        '''!@brief Releases due tasks and resumes the most urgent one.
+            @details Idles the clock when no task is due. Once a task is due,
+                     the tasks due within one retry delay after now are
+                     released with it, and the task with the highest
+                     priority among them runs first, after waiting for its
+                     own deadline if needed.
+            @return The Task that was resumed, or None if the scheduler idled.
+            @exception RuntimeError No task has been added.
+        '''
+        if self._nwait == 0 and self._nready == 0:
+            raise RuntimeError('no tasks added to the scheduler')
+        clock = self.clock
+        now = clock.ticks_us()
+        if self._nwait and clock.ticks_diff(now, self._wait[0].deadline) >= 0:
+            horizon = clock.ticks_add(now, self.retry)
+            while self._nwait and clock.ticks_diff(horizon, self._wait[0].deadline) >= 0:
+                self._push_ready(self._pop_wait())
+
+        if self._nready == 0:
+            clock.idle(clock.ticks_diff(self._wait[0].deadline, now))
+            return None
+
+        task = self._pop_ready()
+        wait = clock.ticks_diff(task.deadline, now)
+        while wait > 0:
+            clock.idle(wait)
+            wait = clock.ticks_diff(task.deadline, clock.ticks_us())
+        if next(task.gen) is None:
+            task.early += 1
+            task.deadline = clock.ticks_add(clock.ticks_us(), self.retry)
+        else:
+            task.runs += 1
+            task.deadline = clock.ticks_add(task.deadline, task.period)
+        self._push_wait(task)
+        return task
+
+    def run(self, duration=None):
+        '''!@brief Runs the tasks.
+            @param duration Time to run for in microseconds. Runs forever when
+                            left as None.
+        '''
+        if duration is None:
+            while True:
+                self.step()
+        clock = self.clock
+        stop = clock.ticks_add(clock.ticks_us(), duration)
+        while clock.ticks_diff(stop, clock.ticks_us()) > 0:
+            self.step()
+
+    def _earlier(self, a, b):
+        '''!@brief Orders tasks by deadline, then by priority.
+        '''
+        d = self.clock.ticks_diff(a.deadline, b.deadline)
+        if d == 0:
+            return a.priority > b.priority
+        return d < 0
+
+    def _urgent(self, a, b):
+        '''!@brief Orders tasks by priority, then by deadline.
+        '''
+        if a.priority == b.priority:
+            return self.clock.ticks_diff(a.deadline, b.deadline) < 0
+        return a.priority > b.priority
+
+    def _push_wait(self, task):
+        self._nwait = _push(self._wait, self._nwait, task, self._earlier)
+
+    def _pop_wait(self):
+        self._nwait, task = _pop(self._wait, self._nwait, self._earlier)
+        return task
+
+    def _push_ready(self, task):
+        self._nready = _push(self._ready, self._nready, task, self._urgent)
+
+    def _pop_ready(self):
+        self._nready, task = _pop(self._ready, self._nready, self._urgent)
+        return task
+
+def _push(heap, n, item, before):
+    '''!@brief Inserts an item into a binary heap stored in a fixed list.
+        @param heap List holding the heap.
+        @param n Number of items in the heap.
+        @param item Item to insert.
+        @param before Function returning True if its first argument belongs
+                      above its second argument.
+        @return The new number of items in the heap.
+    '''
+    i = n
+    while i > 0:
+        parent = (i - 1) >> 1
+        if not before(item, heap[parent]):
+            break
+        heap[i] = heap[parent]
+        i = parent
+    heap[i] = item
+    return n + 1
+
+def _pop(heap, n, before):
+    '''!@brief Removes the top item of a binary heap stored in a fixed list.
+        @param heap List holding the heap.
+        @param n Number of items in the heap.
+        @param before Function returning True if its first argument belongs
+                      above its second argument.
+        @return The new number of items and the removed item.
+    '''
+    top = heap[0]
+    n -= 1
+    item = heap[n]
+    heap[n] = None
+    i = 0
+    while True:
+        child = 2*i + 1
+        if child >= n:
+            break
+        if child + 1 < n and before(heap[child + 1], heap[child]):
+            child += 1
+        if not before(heap[child], item):
+            break
+        heap[i] = heap[child]
+        i = child
+    if n > 0:
+        heap[i] = item
+    return n, top
@@ -4,6 +4,8 @@
                 multiple tasks.
 '''
 
+from array import array
+
 class Share:
     '''!@brief      A standard shared variable.
         @details    Values can be accessed with read() or changed with write()
@@ -27,6 +29,81 @@ class Share:
         '''
         return self._buffer
 
+class ArrayShare:
+    '''!@brief      A shared group of numbers updated in place.
+        @details    Stores several related values, such as the ball position
+                    and velocity, in one array that is allocated once. Writers
+                    fill the array in place between begin_write() and
+                    end_write() instead of building a new tuple each time.
+                    Each write advances a sequence counter, which is odd while
+                    a write is in progress, so a reader can tell whether a
+                    snapshot is consistent and whether it is newer than the
+                    last one it saw. Field indices are named by constants in
+                    the task that writes the share.
+    '''
+    def __init__(self, size, typecode='f'):
+        '''!@brief      Constructs a shared array of zeros
+            @param size The number of values in the share.
+            @param typecode The array typecode of the values, 'f' for floats.
+        '''
+        self._buffer = array(typecode, size*[0])
+        self._seq = 0
+
+    def begin_write(self):
+        '''!@brief      Starts an in-place update of the shared values
+            @details    Call end_write() once every value has been written.
+            @return     The array holding the shared values
+        '''
+        self._seq = (self._seq + 1) & 0x3FFFFFFF
+        return self._buffer
+
+    def end_write(self):
+        '''!@brief      Finishes an in-place update of the shared values
+        '''
+        self._seq = (self._seq + 1) & 0x3FFFFFFF
+
+    def write(self, values):
+        '''!@brief      Copies new values into the share
+            @param values A sequence holding one value per field.
+        '''
+        buf = self.begin_write()
+        for i in range(len(buf)):
+            buf[i] = values[i]
+        self.end_write()
+
+    def read(self):
+        '''!@brief      Access the shared values without copying them
+            @details    The array returned is updated in place by later writes.
+            @return     The array holding the shared values
+        '''
+        return self._buffer
+
+    def seq(self):
+        '''!@brief      Access the sequence counter
+            @return     An even number that changes with every completed
+                        write, or an odd number while a write is in progress
+        '''
+        return self._seq
+
+    def snapshot(self, buf, tries=3):
+        '''!@brief      Copies the shared values into a caller-provided buffer
+            @details    Retries if a write happened during the copy, which can
+                        only occur when the writer runs in an interrupt.
+            @param buf  A preallocated buffer with one entry per field.
+            @param tries The number of copies to attempt.
+            @return     The sequence counter of the copied values, or -1 if
+                        no consistent copy could be made
+        '''
+        for n in range(tries):
+            seq = self._seq
+            if seq & 1:
+                continue
+            for i in range(len(buf)):
+                buf[i] = self._buffer[i]
+            if seq == self._seq:
+                return seq
+        return -1
+
 class Queue:
     '''!@brief      A queue of shared data.
         @details    Values can be accessed with placed into queue with put() or
@@ -54,4 +131,113 @@ class Queue:
         '''!@brief      Find the number of items in the queue. Call before get().
             @return     The number of items in the queue
         '''
-        return len(self._buffer)
\ No newline at end of file
+        return len(self._buffer)
+
+class RingQueue:
+    '''!@brief      A fixed-capacity queue of numbers in a circular buffer.
+        @details    Stores its items in an array that is allocated once when
+                    the queue is created, so put() and get() run in constant
+                    time and never allocate. When the queue is full, put()
+                    either rejects the new item or overwrites the oldest one.
+    '''
+    def __init__(self, size, typecode='f', overwrite=False):
+        '''!@brief              Constructs an empty circular queue
+            @param size         The maximum number of items in the queue.
+            @param typecode     The array typecode of the items, 'f' for floats.
+            @param overwrite    True to overwrite the oldest item when full,
+                                False to reject new items when full.
+        '''
+        self._buffer = array(typecode, size*[0])
+        self._size = size
+        self._head = 0
+        self._count = 0
+        self.overwrite = overwrite
+        ## @brief   The number of items rejected or overwritten while full
+        self.dropped = 0
+
+    def put(self, item):
+        '''!@brief      Adds an item to the end of the queue.
+            @param item The new item to append to the queue.
+            @return     False if the queue was full and the item was rejected.
+        '''
+        if self._count == self._size:
+            self.dropped += 1
+            if not self.overwrite:
+                return False
+            self._head += 1
+            if self._head == self._size:
+                self._head = 0
+            self._count -= 1
+        tail = self._head + self._count
+        if tail >= self._size:
+            tail -= self._size
+        self._buffer[tail] = item
+        self._count += 1
+        return True
+
+    def get(self):
+        '''!@brief      Remove the first item from the front of the queue
+            @return     The value of the item removed
+        '''
+        if self._count == 0:
+            raise IndexError('get from empty RingQueue')
+        item = self._buffer[self._head]
+        self._head += 1
+        if self._head == self._size:
+            self._head = 0
+        self._count -= 1
+        return item
+
+    def put_many(self, items, n=None):
+        '''!@brief      Adds several items to the end of the queue.
+            @param items A sequence of items, such as an array.
+            @param n    The number of items to add from the start of items,
+                        all of them when left as None.
+            @return     The number of items that were added.
+        '''
+        if n is None:
+            n = len(items)
+        added = 0
+        for i in range(n):
+            if self.put(items[i]):
+                added += 1
+        return added
+
+    def get_into(self, buf, n=None):
+        '''!@brief      Removes items from the front of the queue into a buffer.
+            @param buf  A preallocated buffer, such as an array, to fill.
+            @param n    The maximum number of items to remove, len(buf) when
+                        left as None.
+            @return     The number of items copied into buf.
+        '''
+        if n is None:
+            n = len(buf)
+        if n > self._count:
+            n = self._count
+        head = self._head
+        for i in range(n):
+            buf[i] = self._buffer[head]
+            head += 1
+            if head == self._size:
+                head = 0
+        self._head = head
+        self._count -= n
+        return n
+
+    def clear(self):
+        '''!@brief      Removes all items from the queue.
+        '''
+        self._head = 0
+        self._count = 0
+
+    def full(self):
+        '''!@brief      Check if the queue has reached its capacity.
+            @return     True if the queue is full.
+        '''
+        return self._count == self._size
+
+    def num_in(self):
+        '''!@brief      Find the number of items in the queue. Call before get().
+            @return     The number of items in the queue
+        '''
+        return self._count
\ No newline at end of file
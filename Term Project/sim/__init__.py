@@ -0,0 +1,54 @@
+"""!
+@file sim/__init__.py
+@brief Host-side stand-ins for running the Term Project code on a PC.
+@details This package is not copied to the Nucleo. It holds simulated
+         versions of the board hardware together with benchmarks that time
+         the firmware modules under CPython. Run the benchmarks from the
+         Term Project folder with python -m sim.bench. sim.plant models the
+         ball balancing platform and sim.rig runs the firmware tasks on it.
+         sim.aioloop runs the aiotasks coroutines on the simulated clock.
+
+         Call install() before importing any firmware module. It registers
+         the stand-in pyb and micropython modules and adds the ticks
+         functions of a simulated clock to the time module. When numpy is
+         installed it also stands in for ulab.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import sys
+import time
+
+# SimClock of the simulated board, None until install() is called
+_clock = None
+
+def install():
+    '''!@brief Installs the simulated board modules.
+        @details Safe to call more than once, later calls return the clock
+                 that is already installed.
+        @return The SimClock used by the simulated board.
+    '''
+    global _clock
+    if _clock is None:
+        from sim.clock import SimClock
+        from sim import pyb, micropython
+        clock = SimClock()
+        _clock = clock
+        pyb.clock = clock
+        clock.service = micropython.run_scheduled
+        sys.modules['pyb'] = pyb
+        sys.modules['micropython'] = micropython
+        try:
+            from sim import ulab
+            sys.modules['ulab'] = ulab
+        except ImportError:
+            pass
+        time.ticks_us = clock.ticks_us
+        time.ticks_ms = clock.ticks_ms
+        time.ticks_add = clock.ticks_add
+        time.ticks_diff = clock.ticks_diff
+        sys.modules['utime'] = time
+    return _clock
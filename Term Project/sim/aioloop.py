@@ -0,0 +1,93 @@
+"""!
+@file sim/aioloop.py
+@brief asyncio event loop running on the simulated clock.
+@details Lets the coroutines of aiotasks run under CPython asyncio on the
+         simulated board. The loop reads its time from a SimClock, and
+         instead of blocking in select() while every coroutine sleeps it
+         idles the clock until the next timer is due, the way the uasyncio
+         loop idles the CPU on the board. Sockets and pipes registered with
+         the loop are still polled, without waiting.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import asyncio
+import math
+import selectors
+
+class SimSelector(selectors.BaseSelector):
+    '''!@brief Selector that idles a SimClock instead of waiting.
+    '''
+
+    def __init__(self, clock):
+        '''!@brief Creates the selector.
+            @param clock SimClock to idle.
+        '''
+        self.clock = clock
+        self._real = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._real.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._real.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._real.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._real.get_map()
+
+    def close(self):
+        self._real.close()
+
+    def select(self, timeout=None):
+        '''!@brief Polls the registered files and idles the clock for timeout.
+            @exception RuntimeError Nothing is due and there is no timeout,
+                                    so the simulation would never move on.
+        '''
+        ready = self._real.select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            raise RuntimeError('simulated event loop has nothing to wait for')
+        self.clock.idle(math.ceil(timeout*1e6))
+        return []
+
+class SimEventLoop(asyncio.SelectorEventLoop):
+    '''!@brief Event loop whose time is the time of a SimClock.
+    '''
+
+    def __init__(self, clock):
+        '''!@brief Creates the loop.
+            @param clock SimClock giving the time and idled while waiting.
+        '''
+        self.clock = clock
+        super().__init__(SimSelector(clock))
+
+    def time(self):
+        '''!@brief Returns the unwrapped time of the clock in seconds.
+        '''
+        return self.clock.now*1e-6
+
+def run(coro, clock):
+    '''!@brief Runs a coroutine to completion on a SimEventLoop.
+        @details Tasks the coroutine started and left running are cancelled
+                 afterwards, as asyncio.run() does.
+        @param coro The coroutine.
+        @param clock SimClock the loop runs on.
+        @return The result of the coroutine.
+    '''
+    loop = SimEventLoop(clock)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
@@ -0,0 +1,1167 @@
+"""!
+@file sim/bench.py
+@brief Host benchmarks for the Term Project firmware modules.
+@details Run from the Term Project folder with
+         python -m sim.bench [name ...]
+         Every benchmark is run when no name is given.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import sys
+import time
+from array import array
+
+import sim
+from sim.clock import SimClock
+import scheduler
+
+## @brief Modeled time in microseconds for resuming a task that is not due
+#
+POLL_US = 20
+
+## @brief Tasks of main.py as (name, period, priority, modeled run time in us)
+#
+MAIN_TASKS = (('Task User', 50_000, 0, 400),
+              ('Task Motor 1', 10_000, 1, 120),
+              ('Task Motor 2', 10_000, 1, 120),
+              ('Task Motor Control 1', 10_000, 2, 600),
+              ('Task Motor Control 2', 10_000, 2, 600),
+              ('Task IMU', 10_000, 3, 1_200),
+              ('Task Touchpad', 10_000, 3, 2_500))
+
+def _modelTask(clock, period, cost, late):
+    '''!@brief Generator with the same period logic as the firmware tasks.
+        @param clock SimClock shared by all tasks.
+        @param period Period of the task in microseconds.
+        @param cost Modeled run time of the task body in microseconds.
+        @param late List that collects the lateness of every run.
+    '''
+    next_time = clock.ticks_add(clock.ticks_us(), period)
+    while True:
+        current_time = clock.ticks_us()
+        if clock.ticks_diff(current_time, next_time) >= 0:
+            late.append(clock.ticks_diff(current_time, next_time))
+            clock.advance(cost)
+            next_time = clock.ticks_add(next_time, period)
+            yield 1
+        else:
+            clock.advance(POLL_US)
+            yield None
+
+def _summary(label, lates, resumes, busy, duration, wall):
+    '''!@brief Prints lateness statistics for one runtime.
+    '''
+    print(f'{label}: {resumes} resumes, {100*busy/duration:.1f}% CPU busy, '
+          f'{resumes/wall:,.0f} resumes per host second')
+    for name, late in lates:
+        mean = sum(late)/len(late)
+        jitter = (sum((x - mean)**2 for x in late)/len(late))**0.5
+        print(f'    {name:22s} runs {len(late):5d}  lateness mean {mean:7.1f} us'
+              f'  max {max(late):6d} us  jitter {jitter:7.1f} us')
+
+def _modelRun(runtime, duration):
+    '''!@brief Runs the modeled tasks of MAIN_TASKS on one runtime.
+        @param runtime 'round robin', 'scheduler' or 'asyncio'.
+        @param duration Simulated run time in microseconds.
+        @return Tuple of the lateness lists, the number of resumes, the busy
+                time and the total time in microseconds and the host time in s.
+    '''
+    clock = SimClock(start=(1 << 30) - 2_000_000)
+    lates = [(name, []) for name, period, priority, cost in MAIN_TASKS]
+    tasks = [scheduler.Task(name, period, priority, _modelTask(clock, period, cost, late))
+             for (name, period, priority, cost), (n, late) in zip(MAIN_TASKS, lates)]
+    start = clock.now
+    wall = time.perf_counter()
+    if runtime == 'round robin':
+        resumes = 0
+        while clock.now - start < duration:
+            for task in tasks:
+                next(task.gen)
+                resumes += 1
+    elif runtime == 'scheduler':
+        sched = scheduler.Scheduler(clock)
+        for task in tasks:
+            sched.add(task)
+        sched.run(duration)
+    else:
+        import aiotasks
+        from sim import aioloop
+        aioloop.run(aiotasks.main(tasks, duration=duration//1000, clock=clock), clock)
+    wall = time.perf_counter() - wall
+    if runtime != 'round robin':
+        resumes = sum(task.runs + task.early for task in tasks)
+    total = clock.now - start
+    return lates, resumes, total - clock.idle_time, total, wall
+
+def bench_scheduler(duration=10_000_000):
+    '''!@brief Compares the round robin of main.py against scheduler.Scheduler.
+        @details Both runtimes drive the same modeled tasks on a SimClock.
+                 Resuming a task that is not due costs POLL_US of CPU time.
+        @param duration Simulated run time in microseconds.
+    '''
+    _summary('Round robin', *_modelRun('round robin', duration))
+    _summary('Scheduler', *_modelRun('scheduler', duration))
+
+def bench_touchpad(n=2000):
+    '''!@brief Compares Touchpad.XYZ_Scan() against the Touchpad.scan_into() fast path.
+        @details Runs both scans on the simulated pins and panel. The host
+                 time shows the Python overhead of each scan, the simulated
+                 time adds up the modeled ADC conversion time.
+        @param n Number of scans to time for each case.
+    '''
+    clock = sim.install()
+    from sim.panel import TouchPanel
+    import touchpad
+    pins = ('A7', 'A1', 'A6', 'A0')
+    panel = TouchPanel(*pins, 176, 100, noise=4, seed=1)
+    touch = touchpad.Touchpad(*pins, 176, 100)
+    buf = array('f', 3*[0])
+    for label, contact in (('ball at (30, -12)', (30.0, -12.0)), ('no contact', None)):
+        panel.contact = contact
+        for name, scan in (('XYZ_Scan', touch.XYZ_Scan),
+                           ('scan_into', lambda: touch.scan_into(buf))):
+            start = clock.now
+            wall = time.perf_counter()
+            for i in range(n):
+                result = scan()
+            wall = time.perf_counter() - wall
+            print(f'{label:18s} {name:9s} host {1e6*wall/n:6.1f} us/scan, '
+                  f'ADC {(clock.now - start)/n:5.0f} us/scan, '
+                  f'result ({result[0]:.1f}, {result[1]:.1f}, {result[2]:.0f})')
+
+def bench_adcfilter(n=500):
+    '''!@brief Compares the touchpad ADC filters on a settled and a moving ball.
+        @details The panel readings have Gaussian noise and occasional
+                 full-scale glitches. Reports the RMS position error, the
+                 average number of samples per axis and the modeled ADC time.
+        @param n Number of 10 ms scans for each case.
+    '''
+    import math
+    clock = sim.install()
+    from sim.panel import TouchPanel
+    import touchpad
+    import adcfilter
+    pins = ('A7', 'A1', 'A6', 'A0')
+    configs = (('fixed mean', None, 25, 25),
+               ('mean 8-25', adcfilter.MEAN, 8, 25),
+               ('median 8-25', adcfilter.MEDIAN, 8, 25),
+               ('trimmed 8-25', adcfilter.TRIMMED, 8, 25))
+    buf = array('f', 3*[0])
+    for label, mode, nmin, nmax in configs:
+        for case in ('settled', 'moving'):
+            panel = TouchPanel(*pins, 176, 100, noise=6, spike=0.01, seed=2)
+            touch = touchpad.Touchpad(*pins, 176, 100)
+            touch.set_filter(mode, nmin, nmax)
+            err = 0
+            samples = 0
+            adc = 0
+            for k in range(n):
+                if case == 'settled':
+                    panel.contact = (20.0, 10.0)
+                else:
+                    panel.contact = (40*math.cos(2*math.pi*k/100), 30*math.sin(2*math.pi*k/100))
+                start = clock.now
+                touch.scan_into(buf)
+                adc += clock.now - start
+                err += (buf[0] - panel.contact[0])**2 + (buf[1] - panel.contact[1])**2
+                samples += 25 if mode is None else (len(touch.xfilt.buffer()) + len(touch.yfilt.buffer()))/2
+            print(f'{label:13s} {case:8s} RMS error {math.sqrt(err/n):5.2f} mm, '
+                  f'{samples/n:4.1f} samples per axis, ADC {adc/n:4.0f} us/scan')
+
+def bench_bno(n=2000):
+    '''!@brief Compares separate Euler and gyro reads against BNO055.read_motion_into().
+        @details Runs on the simulated I2C bus. Bus time is modeled at
+                 400 kHz, host time shows the Python decode overhead.
+        @param n Number of IMU ticks to time for each method.
+    '''
+    clock = sim.install()
+    from sim.bno055 import FakeBNO055
+    import BNO055
+    fake = FakeBNO055().attach()
+    fake.set_motion(12.5, -3.25, 7.0, 0.5, -41.0, 2.0)
+    bno = BNO055.BNO055()
+    motion = array('f', 6*[0])
+    def separate():
+        return bno.get_euler() + bno.get_omega()
+    def burst():
+        return bno.read_motion_into(motion)
+    for name, read in (('get_euler+get_omega', separate), ('read_motion_into', burst)):
+        start = clock.now
+        transactions = bno.i2c.transactions
+        wall = time.perf_counter()
+        for i in range(n):
+            result = read()
+        wall = time.perf_counter() - wall
+        print(f'{name:20s} {(bno.i2c.transactions - transactions)/n:.0f} transfers, '
+              f'bus {(clock.now - start)/n:4.0f} us/tick, host {1e6*wall/n:5.2f} us/tick')
+    if tuple(motion) != separate():
+        raise AssertionError(f'burst read {tuple(motion)} differs from {separate()}')
+    print(f'readings agree: {tuple(motion)}')
+
+def bench_imu(duration=5_000_000):
+    '''!@brief Compares polled IMU reads against timer-driven sampling.
+        @details Runs IMUTask with a modeled 600 us control task on the
+                 scheduler. Reports the run time of the IMU task and the
+                 lateness of the control task for both acquisition modes.
+        @param duration Simulated run time in microseconds.
+    '''
+    import os
+    import tempfile
+    clock = sim.install()
+    from sim import pyb
+    from sim.bno055 import FakeBNO055
+    import BNO055
+    import IMUTask
+    import profiler
+    import shares
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        with open('IMU_cal_coeffs.txt', 'w') as f:
+            f.write(','.join(22*['0']))
+        try:
+            for mode in ('polled', 'timer'):
+                pyb.reset()
+                FakeBNO055().attach().set_motion(10, 2, -3, 0.5, 1.5, 0)
+                bno = BNO055.BNO055()
+                sampler = BNO055.MotionSampler(bno, 4) if mode == 'timer' else None
+                sched = scheduler.Scheduler(clock)
+                stats = []
+                for name, gen in (('Task IMU', IMUTask.bnoFunction('Task IMU', 10_000, shares.Share(), bno,
+                                                                   shares.ArrayShare(3), shares.ArrayShare(3), sampler)),
+                                  ('Task Control', _modelTask(clock, 10_000, 600, []))):
+                    prof = profiler.TaskProfiler(name, 10_000, clock=clock)
+                    stats.append(prof)
+                    sched.add(scheduler.Task(name, 10_000, 2, prof.wrap(gen)))
+                sched.run(duration)
+                if sampler is not None:
+                    sampler.stop()
+                imu, ctl = stats
+                print(f'{mode:6s} IMU task run time mean {imu.execSum/imu.runs:5.0f} us, '
+                      f'control lateness mean {ctl.lateSum/ctl.runs:5.0f} us max {ctl.lateMax:4d} us, '
+                      f'I2C reads {bno.i2c.transactions}')
+        finally:
+            os.chdir(cwd)
+
+def bench_control(ticks=2000):
+    '''!@brief Compares two alternating loopFunction() tasks against pipelineFunction().
+        @details Runs the controllers on the scheduler with fixed sensor
+                 shares. Reports how often each outer and inner loop ran, the
+                 number of task resumes and the host time per 10 ms tick.
+        @param ticks Number of 10 ms ticks to run.
+    '''
+    clock = sim.install()
+    import closedloop5
+    import CTask5
+    import IMUTask
+    import TTask
+    import shares
+
+    class Counted(closedloop5.ClosedLoop):
+        '''!@brief ClosedLoop that counts its runs.
+        '''
+        runs = 0
+        def run(self, *args):
+            self.runs += 1
+            return super().run(*args)
+
+    for mode in ('two tasks', 'fused'):
+        eulAng = shares.ArrayShare(3)
+        gyrVel = shares.ArrayShare(3)
+        abfShare = shares.ArrayShare(5)
+        eulAng.write((0, 1.5, -2.0))
+        gyrVel.write((0.3, -0.2, 0))
+        abfShare.write((12.0, 40.0, -8.0, -25.0, 1))
+        gains = [shares.Share(g) for g in (2.0, 0.05, 0.0, 0.2, 0.01, 0.0)]
+        flags = [shares.Share(v) for v in (True, False, False, False)]
+        wFlag, yFlag, dFlag, DFlag = flags
+        refs = [shares.Share(0), shares.Share(0)]
+        duties = [shares.Share(0), shares.Share(0)]
+        loops = [Counted(0, 0, 0, 0, 10, -10), Counted(0, 0, 0, 0, 60, -60),
+                 Counted(0, 0, 0, 0, 10, -10), Counted(0, 0, 0, 0, 60, -60)]
+        O1, I1, O2, I2 = loops
+        if mode == 'fused':
+            gens = [CTask5.pipelineFunction('Task Motor Control', 10_000, O1, I1, O2, I2, eulAng, gyrVel,
+                                            abfShare, wFlag, *gains, *duties, *refs, yFlag, dFlag, DFlag)]
+        else:
+            gens = [CTask5.loopFunction('Task Motor Control 1', 10_000, O1, I1, eulAng, wFlag, *gains, duties[0],
+                                        gyrVel, IMUTask.EUL_Y, IMUTask.GYR_Y, dFlag, DFlag, abfShare,
+                                        TTask.ABF_X, TTask.ABF_VX, refs[0], yFlag),
+                    CTask5.loopFunction('Task Motor Control 2', 10_000, O2, I2, eulAng, wFlag, *gains, duties[1],
+                                        gyrVel, IMUTask.EUL_X, IMUTask.GYR_X, dFlag, DFlag, abfShare,
+                                        TTask.ABF_Y, TTask.ABF_VY, refs[1], yFlag)]
+        sched = scheduler.Scheduler(clock)
+        for gen in gens:
+            sched.add(scheduler.Task(mode, 10_000, 2, gen))
+        wall = time.perf_counter()
+        sched.run(ticks*10_000)
+        wall = time.perf_counter() - wall
+        resumes = sum(task.runs + task.early for task in sched.tasks)
+        print(f'{mode:9s} outer loop {O1.runs/ticks*100:5.1f} Hz, inner loop {I1.runs/ticks*100:5.1f} Hz, '
+              f'{resumes/ticks:.1f} resumes per tick, host {1e6*wall/ticks:5.1f} us/tick, '
+              f'duty ({duties[0].read():.2f}, {duties[1].read():.2f})')
+
+def bench_closedloop(n=20_000, repeat=5):
+    '''!@brief Times ClosedLoop.run() on the four loops of main.py.
+        @details Times run() alone, and set_Gain() followed by run() as
+                 CTask5.Cascade calls them every tick, with the control law
+                 main.py runs and with the full PID law. The fastest of
+                 several repeats is reported.
+        @param n Number of control ticks in each repeat.
+        @param repeat Number of repeats of each case.
+    '''
+    import closedloop5
+    limits = ((12, -12, 0), (12, -12, 0), (45, -45, 1), (45, -45, 1))
+    inputs = ((12.0, 40.0, 0.0), (-8.0, -25.0, 0.0), (1.5, -0.2, 0.4), (-2.0, 0.3, -0.3))
+    gains = ((0.2, 0.01, 0.001), (0.2, 0.01, 0.001), (2.0, 0.05, 0.02), (2.0, 0.05, 0.02))
+
+    def run_only(loops):
+        for k in range(n):
+            for clc, (pos, vel, ref), l in zip(loops, inputs, limits):
+                clc.run(pos, vel, ref, l[2], 1)
+
+    def gain_and_run(loops):
+        for k in range(n):
+            for clc, (pos, vel, ref), g, l in zip(loops, inputs, gains, limits):
+                clc.set_Gain(g[0], g[1], g[2])
+                clc.run(pos, vel, ref, l[2], 1)
+
+    for pid in (False, True):
+        loops = [closedloop5.ClosedLoop(kp, kd, ki, 0, hi, lo, pid)
+                 for (kp, kd, ki), (hi, lo, l) in zip(gains, limits)]
+        best = []
+        for case in (run_only, gain_and_run):
+            times = []
+            for r in range(repeat):
+                wall = time.perf_counter()
+                case(loops)
+                times.append(time.perf_counter() - wall)
+            best.append(1e6*min(times)/n)
+        label = 'full PID law' if pid else 'main.py law '
+        print(f'{label}: 4x run() {best[0]:5.2f} us/tick, '
+              f'4x set_Gain() and run() {best[1]:5.2f} us/tick on the host')
+
+def bench_plant(duration=10_000_000):
+    '''!@brief Times the firmware tasks running on the simulated platform.
+        @details Drops the ball at (30, -20) mm and runs sim.rig.Rig with
+                 the default gains. Reports how much faster than real time
+                 the simulation runs and where the ball ended up.
+        @param duration Simulated run time in microseconds.
+    '''
+    from sim.rig import Rig
+    for sampler in (True, False):
+        rig = Rig(seed=1, sampler=sampler)
+        wall = time.perf_counter()
+        rig.run(duration)
+        wall = time.perf_counter() - wall
+        plant = rig.plant
+        state = (f'ball at ({plant.pos[0]:.1f}, {plant.pos[1]:.1f}) mm' if plant.onPlate
+                 else f'ball fell off at t = {rig.fallTime:.2f} s')
+        print(f'{"timer" if sampler else "polled"} IMU: {duration*1e-6:.0f} s simulated in {wall:.2f} s, '
+              f'{duration*1e-6/wall:.0f}x real time, {state}, cost {rig.cost(1):.1f}')
+        rig.close()
+
+def bench_telemetry(n=2000):
+    '''!@brief Compares the Data.csv print path of UTask5 against telemetry frames.
+        @details Times one row of the S3_PRINT_DATA state, which opens the
+                 file, rounds and joins nine values and prints them, against
+                 packing one telemetry frame. Then streams one simulated
+                 second from telemetry.streamFunction() with text between the
+                 frames and a corrupted frame, and checks the decoded values.
+        @param n Number of rows to time for each path.
+    '''
+    import contextlib
+    import io
+    import os
+    import struct
+    import tempfile
+    clock = sim.install()
+    import shares
+    import telemetry
+    import teledecode
+    row = (0.05, -12.345678, 40.5, 8.25, -3.5, 1.125, -0.75, 2.5, 0.3)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()) as out:
+        os.chdir(tmp)
+        try:
+            wall = time.perf_counter()
+            for k in range(n):
+                with open('Data.csv', 'a+') as f:
+                    filestring = ''
+                    for x in row:
+                        filestring += str(round(x, 2))
+                        filestring += ','
+                    print(filestring)
+                    f.write(filestring)
+                    f.write('\n')
+            t_csv = time.perf_counter() - wall
+            size_csv = os.path.getsize('Data.csv')/n + len(out.getvalue())/n
+        finally:
+            os.chdir(cwd)
+    frame = telemetry.Frame(len(telemetry.FIELDS))
+    values = row + (12.5,)
+    wall = time.perf_counter()
+    for k in range(n):
+        frame.pack(k, 10_000*k, values)
+    t_bin = time.perf_counter() - wall
+    print(f'Data.csv row: host {1e6*t_csv/n:6.1f} us/row, {size_csv:.0f} bytes to file and terminal')
+    print(f'telemetry   : host {1e6*t_bin/n:6.1f} us/row, {frame.size} bytes to USB')
+
+    class Port:
+        '''!@brief Collects what is written to the simulated USB port.
+        '''
+        def __init__(self):
+            self.data = bytearray()
+        def write(self, data):
+            self.data += data
+            if len(self.data) < 400:
+                self.data += b'Streaming data...\r\n'
+    abf = shares.ArrayShare(5)
+    eul = shares.ArrayShare(3)
+    gyr = shares.ArrayShare(3)
+    abf.write((1.5, -2.25, 3.0, 4.5, 1))
+    eul.write((0, 0.5, -0.25))
+    gyr.write((6.0, -7.0, 0))
+    port = Port()
+    flag = shares.Share(True)
+    sched = scheduler.Scheduler(clock)
+    sched.add(scheduler.Task('Task Telemetry', 10_000, 0, telemetry.streamFunction(
+        'Task Telemetry', 10_000, port, flag, abf, eul, gyr, shares.Share(-8.0), shares.Share(9.5))))
+    sched.run(1_000_000)
+    data = bytearray(port.data)
+    data[5*frame.size + 30] ^= 0x01
+    frames, decoder = teledecode.decode(bytes(data))
+    expect = struct.unpack('<10f', struct.pack('<10f', -1.5, 2.25, 3.0, 4.5, -0.25, 6.0, 0.5, -7.0, -8.0, 9.5))
+    for seq, t, vals in frames:
+        if vals != expect:
+            raise AssertionError(f'frame {seq} decoded as {vals}, expected {expect}')
+    print(f'streamed {len(port.data)} bytes in 1 s: {len(frames)} frames decoded, '
+          f'{decoder.lost} lost, {decoder.bad} bad checksums, values agree')
+
+## @brief Benchmarks by name
+#
+def bench_recorder(duration=6_000_000):
+    '''!@brief Checks that the flight recorder keeps the moments before a fall.
+        @details Runs sim.rig.Rig with the outer loop gain negated, so the
+                 ball is pushed off the panel, with the recorder task of
+                 main.py added. Reads back Flight.csv and compares the
+                 recorded ball positions with the plant trace before the
+                 fall. Then times FlightRecorder.record() on the host.
+        @param duration Simulated run time in microseconds.
+    '''
+    import math
+    import os
+    from sim.rig import Rig
+    rig = Rig(outer=(-0.1, 0, 0), seed=1, dropTime=3_000_000)
+    import recorder
+    import scheduler
+    import shares
+    rec = recorder.FlightRecorder(300, 100)
+    recFlag = shares.Share(False)
+    rig.sched.add(scheduler.Task('Task Recorder', 10_000, 1,
+                                 recorder.recorderFunction('Task Recorder', 10_000, rec, rig.abfShare, rig.eulAng,
+                                                           rig.gyrVel, rig.duty1, rig.duty2, recFlag)))
+    rig.run(duration)
+    with open(os.path.join(rig._dir.name, 'Flight.csv')) as f:
+        comment = f.readline().strip()
+        names = f.readline().strip().split(',')
+        rows = [[float(v) for v in line.split(',')] for line in f]
+    rig.close()
+    print(f'{rec.records} records of {rec.nfields} fields, {len(rec.buf)*4} bytes')
+    print(f'ball fell off the plant at t = {rig.fallTime:.2f} s, Flight.csv: {comment}, {len(rows)} rows')
+    t = [row[names.index('t')]*1e-3 for row in rows]
+    x = [row[names.index('x')] for row in rows]
+    y = [row[names.index('y')] for row in rows]
+    print(f'recording spans {t[0]:.2f} s to {t[-1]:.2f} s')
+    # The recording runs on the same clock as the trace, matched to the nearest trace sample
+    trace = rig.trace
+    err = 0
+    n = 0
+    for tk, xk, yk in zip(t, x, y):
+        k = int(round(tk*1e2))
+        if tk < rig.fallTime and k < len(trace['t']):
+            err = max(err, math.hypot(xk - trace['x'][k], yk - trace['y'][k]))
+            n += 1
+    print(f'{n} rows on the panel, largest distance from the plant position {err:.1f} mm')
+
+    values = [0.5]*rec.nfields
+    rec.rearm()
+    m = 20_000
+    wall = time.perf_counter()
+    for k in range(m):
+        rec.record(values)
+    wall = time.perf_counter() - wall
+    print(f'record(): host {1e6*wall/m:.2f} us/record')
+
+def bench_logwriter(rows=301):
+    '''!@brief Compares the old Data.csv writes of UTask5 with logwriter.LogWriter.
+        @details Writes the same rows with the old path, which opens the
+                 file and writes each row separately, and with a LogWriter,
+                 then checks that both files hold the same values and counts
+                 the file calls. Then writes the rows as UTask5 and the
+                 logger task of main.py do, ten rows per 50 ms, on the
+                 simulated clock with a file whose writes take 300 us plus
+                 2 us per byte, and reports the longest logger call against
+                 its 2 ms budget.
+        @param rows Number of rows, 301 as in one data collection.
+    '''
+    import os
+    import random
+    import tempfile
+    clock = sim.install()
+    import logwriter
+    rand = random.Random(1)
+    data = [[k*0.05] + [rand.uniform(-200, 200) for i in range(8)] for k in range(rows)]
+
+    class Counted:
+        '''!@brief Counts the writes to a file.
+        '''
+        def __init__(self, f, cost=None):
+            self.f = f
+            self.writes = 0
+            self.cost = cost
+        def write(self, b):
+            self.writes += 1
+            if self.cost:
+                clock.advance(self.cost(len(b)))
+            return self.f.write(b)
+        def flush(self):
+            self.f.flush()
+        def close(self):
+            self.f.close()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            wall = time.perf_counter()
+            for row in data:
+                with open('Old.csv', 'a+') as f:
+                    filestring = ''
+                    for x in row:
+                        filestring += str(round(x, 2))
+                        filestring += ','
+                    f.write(filestring)
+                    f.write('\n')
+            t_old = time.perf_counter() - wall
+
+            wall = time.perf_counter()
+            log = logwriter.LogWriter('New.csv')
+            log._f = Counted(log._f)
+            for row in data:
+                if log.write_row(row) is None:
+                    log.service(1 << 20)
+                    log.write_row(row)
+            log.flush()
+            log.service(1 << 20)
+            writes = log._f.writes
+            log.close()
+            t_new = time.perf_counter() - wall
+
+            with open('Old.csv') as f:
+                old = [[float(v) for v in line.split(',')[:-1]] for line in f]
+            with open('New.csv') as f:
+                new = [[float(v) for v in line.split(',')[:-1]] for line in f]
+            size = os.path.getsize('New.csv')
+
+            # Ten rows per user task period, the logger task every 10 ms
+            log = logwriter.LogWriter('Sim.csv')
+            log._f = Counted(log._f, lambda n: 300 + 2*n)
+            k = 0
+            longest = 0
+            start = clock.now
+            while k < rows or log.pending():
+                if (clock.now - start) % 50_000 < 10_000:
+                    for i in range(10):
+                        if k == rows or log.write_row(data[k]) is None:
+                            break
+                        k += 1
+                    if k == rows:
+                        log.flush()
+                t = clock.now
+                log.service(2000)
+                longest = max(longest, clock.now - t)
+                clock.advance(10_000 - (clock.now - t))
+            drain = (clock.now - start)*1e-6
+            log.close()
+        finally:
+            os.chdir(cwd)
+    diff = max(abs(a - b) for r, q in zip(old, new) for a, b in zip(r, q))
+    print(f'old path: host {1e6*t_old/rows:6.1f} us/row, {rows} opens, {2*rows} writes')
+    print(f'LogWriter: host {1e6*t_new/rows:6.1f} us/row, 1 open, {writes} writes of {size} bytes')
+    print(f'{len(new)} rows match the old file to {diff:.3g}')
+    print(f'simulated flash: rows written in {drain:.2f} s, longest logger call {longest} us (budget 2000 us)')
+
+def bench_analysis(runs=200):
+    '''!@brief Compares analysis.py with reading and scoring runs one by one.
+        @details Builds a log of many runs from Data.csv, each with the ball
+                 put down at a different spot, then times the readline loop
+                 used by HW/plotProgram.py against analysis.load() and a
+                 per-run Python loop against analysis.analyze(), and checks
+                 that both give the same metrics.
+        @param runs Number of runs in the log.
+    '''
+    import math
+    import os
+    import tempfile
+    import numpy as np
+    import analysis
+    names, base = analysis.load(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Data.csv'))
+    rand = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'Runs.csv')
+        with open(filename, 'w') as f:
+            for k in range(runs):
+                run = base.copy()
+                run[:, 1:5] *= rand.uniform(0.5, 1.5)
+                run = np.roll(run, int(rand.integers(-20, 20)), axis=0)
+                run[:, 0] = base[:, 0]
+                for row in run:
+                    f.write(','.join(str(round(v, 2)) for v in row) + ',\n')
+
+        wall = time.perf_counter()
+        rows = []
+        with open(filename) as f:
+            while True:
+                line = f.readline()
+                if line == '':
+                    break
+                rows.append([float(v) for v in line.strip().split(',')[:-1]])
+        t_read = time.perf_counter() - wall
+        wall = time.perf_counter()
+        log = analysis.load(filename)
+        t_load = time.perf_counter() - wall
+
+    def reference(t, e, present, band):
+        '''!@brief Metrics of one run computed sample by sample.
+        '''
+        k0 = next((k for k in range(len(t)) if present[k]), None)
+        if k0 is None:
+            return [math.nan]*len(analysis.METRICS)
+        e0 = e[k0]
+        sign = -1 if e0 < 0 else 1
+        t10 = t90 = math.nan
+        over = 0
+        last = None
+        total = 0
+        n = 0
+        end = k0
+        for k in range(k0, len(t)):
+            if not present[k]:
+                continue
+            end = k
+            left = sign*e[k]/abs(e0) if e0 else math.nan
+            if math.isnan(t10) and left <= 0.9:
+                t10 = t[k]
+            if math.isnan(t90) and left <= 0.1:
+                t90 = t[k]
+            over = max(over, -sign*e[k])
+            if abs(e[k]) > band:
+                last = k
+            total += e[k]*e[k]
+            n += 1
+        if last is None:
+            settle = 0.0
+        elif last >= end:
+            settle = math.inf
+        else:
+            settle = t[last + 1] - t[k0]
+        return [t[k0], e0, t90 - t10, settle, over, 100*over/abs(e0) if e0 else math.nan, math.sqrt(total/n)]
+
+    data = np.array(rows)
+    bounds = analysis.split_runs(data[:, 0])
+    wall = time.perf_counter()
+    slow = []
+    for k in range(len(bounds) - 1):
+        run = data[bounds[k]:bounds[k + 1]].tolist()
+        t = [row[0] for row in run]
+        x = [row[1] for row in run]
+        y = [row[3] for row in run]
+        present = [a != 0 or b != 0 for a, b in zip(x, y)]
+        r = [math.hypot(a, b) for a, b in zip(x, y)]
+        slow.append([reference(t, e, present, 5) for e in (x, y, r)])
+    t_loop = time.perf_counter() - wall
+    wall = time.perf_counter()
+    labels, results = analysis.analyze([log], 5)
+    t_vec = time.perf_counter() - wall
+    fast = np.array([[[results[axis][m][j] for m in analysis.METRICS] for axis in ('x', 'y', 'r')]
+                     for j in range(len(labels))])
+    slow = np.array(slow)
+    same = np.allclose(fast, slow, equal_nan=True, rtol=1e-9, atol=1e-9)
+    print(f'{len(labels)} runs of {len(base)} samples, {len(data)} rows')
+    print(f'load    : readline loop {1e3*t_read:7.1f} ms, analysis.load {1e3*t_load:7.1f} ms')
+    print(f'metrics : per-run loop  {1e3*t_loop:7.1f} ms, analysis.analyze {1e3*t_vec:7.1f} ms, same results: {same}')
+
+def bench_lodplot(hours=1):
+    '''!@brief Times lodplot.py on a long log.
+        @details Writes a Data.csv style log of the given length at 100 Hz
+                 with a few short spikes, then times building the pyramid
+                 from the CSV file, loading it again from the cache and
+                 computing views of the whole log and of a zoomed range for
+                 a 1000 pixel wide plot. Checks that every view keeps the
+                 spikes it covers.
+        @param hours Length of the log.
+    '''
+    import os
+    import tempfile
+    import numpy as np
+    import lodplot
+    n = int(hours*3600*100)
+    t = np.arange(n)*0.01
+    rand = np.random.default_rng(1)
+    x = 40*np.sin(t/7) + rand.normal(0, 1, n)
+    spikes = rand.integers(0, n, 5)
+    x[spikes] += 150
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'Long.csv')
+        data = np.zeros((n, 9))
+        data[:, 0] = t
+        data[:, 1] = x
+        np.savetxt(filename, data, fmt='%.2f', delimiter=',', newline=',\n')
+        wall = time.perf_counter()
+        trace = lodplot.LodTrace(filename, 'x')
+        t_build = time.perf_counter() - wall
+        wall = time.perf_counter()
+        trace = lodplot.LodTrace(filename, 'x')
+        t_cache = time.perf_counter() - wall
+    x = np.round(x, 2)
+    print(f'{n} samples, {len(trace.levels)} levels')
+    print(f'first load {t_build:.2f} s, from cache {1e3*t_cache:.1f} ms')
+    t0 = t[spikes[0]]
+    for name, x0, x1 in (('whole log', t[0], t[-1]), ('10 min zoom', t0 - 300, t0 + 300), ('10 s zoom', t0 - 5, t0 + 5)):
+        for method in ('minmax', 'lttb'):
+            wall = time.perf_counter()
+            vx, vy = trace.view(x0, x1, 1000, method)
+            ms = 1e3*(time.perf_counter() - wall)
+            inside = [k for k in spikes if x0 <= t[k] <= x1]
+            kept = sum(1 for k in inside if np.any((vx == t[k]) & (vy == x[k])))
+            print(f'{name:12} {method:6}: {len(vx):5} points in {ms:5.2f} ms, {kept} of {len(inside)} spikes kept')
+
+def bench_gainsched(n=20_000):
+    '''!@brief Checks and times the gain schedule of gainsched.py.
+        @details Compares GainTable.lookup() with the profile it was made
+                 from, on the grid points, where they must match, and between
+                 them, where they also match because the default profile is
+                 bilinear. Times the schedule work
+                 of one control tick, scale() with unchanged gains and two
+                 lookups, against evaluating the profile twice. Then runs
+                 sim.rig.Rig with and without the schedule from the same
+                 drop.
+        @param n Number of timed ticks.
+    '''
+    import math
+    from array import array
+    import gainsched
+    from sim.rig import Rig
+    table = gainsched.GainTable(88, 12)
+    Kp, Kd, Ki = 4, 0.2, 0.1
+    table.scale(Kp, Kd, Ki)
+    out = array('f', 3*[0])
+    grid = 0
+    for i in range(table.nr):
+        for j in range(table.nt):
+            r = 88*i/(table.nr - 1)
+            tilt = 12*j/(table.nt - 1)
+            want = [g*f for g, f in zip((Kp, Kd, Ki), gainsched.aggressive(r/88, tilt/12))]
+            table.lookup(r, -tilt, out)
+            grid = max(grid, max(abs(a - b) for a, b in zip(out, want)))
+    between = 0
+    for k in range(1000):
+        r = 100*((k*0.618) % 1)
+        tilt = 14*((k*0.382) % 1)
+        want = [g*f for g, f in zip((Kp, Kd, Ki), gainsched.aggressive(min(r, 88)/88, min(tilt, 12)/12))]
+        table.lookup(r, tilt, out)
+        between = max(between, max(abs(a - b) for a, b in zip(out, want)))
+    print(f'{table.nr}x{table.nt} grid, {len(table.gains)*4} bytes of gains')
+    print(f'largest error on the grid {grid:.2g}, between grid points {between:.3f} (Kp = {Kp})')
+
+    wall = time.perf_counter()
+    for k in range(n):
+        table.scale(Kp, Kd, Ki)
+        table.lookup(30.0, 2.5, out)
+        table.lookup(-20.0, -1.5, out)
+    t_table = time.perf_counter() - wall
+    wall = time.perf_counter()
+    for k in range(n):
+        for r, tilt in ((30.0, 2.5), (-20.0, -1.5)):
+            kp, kd, ki = gainsched.aggressive(min(abs(r), 88)/88, min(abs(tilt), 12)/12)
+            out[0] = Kp*kp
+            out[1] = Kd*kd
+            out[2] = Ki*ki
+    t_profile = time.perf_counter() - wall
+    print(f'per tick: table {1e6*t_table/n:.2f} us, profile {1e6*t_profile/n:.2f} us on the host')
+
+    for schedule in (None, gainsched.GainTable(88, 12)):
+        rig = Rig(inner=(4, 0.2, 0), outer=(0.05, 0, 0), ball=(60, 30), seed=1, schedule=schedule)
+        rig.run(6_000_000)
+        trace = rig.trace
+        k1 = next((k for k, t in enumerate(trace['t']) if t >= 1), len(trace['t']))
+        k2 = next((k for k, t in enumerate(trace['t']) if t >= (rig.fallTime or math.inf)), len(trace['t']))
+        rms = math.sqrt(sum(trace['x'][k]**2 + trace['y'][k]**2 for k in range(k1, k2))/max(k2 - k1, 1))
+        fall = f'fell off at t = {rig.fallTime:.2f} s' if rig.fallTime else 'stayed on'
+        print(f'{"scheduled" if schedule else "fixed":9} gains: {fall}, RMS distance from 1 s until then {rms:.1f} mm')
+        rig.close()
+
+def bench_estimator(duration=3_000_000, n=20_000):
+    '''!@brief Compares the alpha-beta filter of TTask with the steady state Kalman filter.
+        @details Runs sim.rig.Rig with a small outer loop gain of the wrong
+                 sign, so the ball rolls away without falling off quickly,
+                 and compares the published velocity and position with the
+                 plant every period. Then balances the ball with the same
+                 gains using each estimator, and times update() on the host.
+                 The balancing runs use the complete control law of
+                 closedloop5.ClosedLoop, pid=True, which the gains need.
+        @param duration Simulated run time in microseconds.
+        @param n Number of timed updates.
+    '''
+    import math
+    sim.install()
+    import estimator
+    from sim.rig import Rig
+    makers = (('alpha-beta', lambda: None), ('Kalman', lambda: estimator.SteadyKalman(10_000)))
+    kalman = estimator.SteadyKalman(10_000)
+    print(f'Kalman gains k1 = {kalman.k1:.3f}, k2 = {kalman.k2:.2f} 1/s')
+    for name, make in makers:
+        rig = Rig(inner=(4, 0.2, 0), outer=(-0.05, 0, 0), ball=(20, -10), seed=1, estimator=make())
+        verr = []
+        perr = []
+
+        def sample():
+            plant = rig.plant
+            abf = rig.abfShare.read()
+            if rig._placed and plant.onPlate and abf[4]:
+                verr.append((-abf[1] - plant.vel[0])**2 + (abf[3] - plant.vel[1])**2)
+                perr.append((-abf[0] - plant.pos[0])**2 + (abf[2] - plant.pos[1])**2)
+        event = rig.clock.add_event(10_000, sample)
+        rig.run(duration)
+        rig.clock.remove_event(event)
+        rig.close()
+        print(f'{name:10}: RMS velocity error {math.sqrt(sum(verr)/len(verr)):5.1f} mm/s, '
+              f'RMS position error {math.sqrt(sum(perr)/len(perr)):.2f} mm over {len(verr)} samples')
+    for name, make in makers:
+        rig = Rig(inner=(8, 0.05, 0), outer=(0.2, 0.05, 0), seed=1, estimator=make(), pid=True)
+        rig.run(6_000_000)
+        state = f'fell off at t = {rig.fallTime:.2f} s' if rig.fallTime else f'cost {rig.cost(2):.2f} mm'
+        print(f'{name:10}: balancing from (30, -20) mm, {state}')
+        rig.close()
+    eul = (0.0, 1.5, -2.0)
+    for name, est in (('alpha-beta', estimator.AlphaBeta(0.85, 0.005, 10_000)), ('Kalman', kalman)):
+        est.reset(0, 0)
+        wall = time.perf_counter()
+        for k in range(n):
+            est.update(1.0, -1.0, eul)
+        wall = time.perf_counter() - wall
+        print(f'{name:10}: update() {1e6*wall/n:.2f} us on the host')
+
+def bench_fixedpoint(n=5000):
+    '''!@brief Times the fixed point touchpad of fixedpoint.py against the float code.
+        @details The touchpad is scanned on the simulated panel in both
+                 modes. The host times use the pure Python kernel, on the
+                 board the viper kernel runs instead. tests/test_fixedpoint.py
+                 checks that both modes agree.
+        @param n Number of timed calls.
+    '''
+    sim.install()
+    from sim.panel import TouchPanel
+    import fixedpoint
+    import touchpad
+
+    pins = ('A7', 'A1', 'A6', 'A0')
+    panel = TouchPanel(*pins, 176, 100)
+    touches = (touchpad.Touchpad(*pins, 176, 100), touchpad.Touchpad(*pins, 176, 100, fixed=True))
+    bufs = (array('f', 3*[0]), array('f', 3*[0]))
+    for touch in touches:
+        touch.set_cal_coeff(1.07, -0.04, 2.3, 0.03, 0.96, -1.7)
+    panel.contact = (30.0, -12.0)
+    times = []
+    for touch, buf in zip(touches, bufs):
+        wall = time.perf_counter()
+        for k in range(n):
+            touch.scan_into(buf)
+        times.append(1e6*(time.perf_counter() - wall)/n)
+    print(f'scan_into : float {times[0]:5.2f} us, fixed {times[1]:5.2f} us on the host')
+    coef = touches[1]._coef
+    pos = array('i', 2*[0])
+    wall = time.perf_counter()
+    for k in range(n):
+        fixedpoint.affine2(coef, 51200, 51200, pos)
+    t_affine = 1e6*(time.perf_counter() - wall)/n
+    print(f'kernel    : affine2 {t_affine:.2f} us per call in pure Python')
+
+def bench_motor(n=20_000):
+    '''!@brief Compares the old motor writes with the cached compare values of motor5.Motor.
+        @details Checks that set_duty() sets the same compare values as two
+                 pulse_width_percent() calls over a sweep of duties. Counts
+                 the compare register writes of sim.rig.Rig runs with the
+                 ball balanced by the complete control law and with an
+                 empty panel, and times set_duty()
+                 on the host.
+        @param n Number of timed calls.
+    '''
+    sim.install()
+    from pyb import Pin, Timer
+    import estimator
+    import motor5
+    from sim.rig import Rig
+    motor = motor5.Motor(3, Pin.cpu.B4, Pin.cpu.B5, 1, 2)
+    tim = Timer(3, freq=20_000)
+    chx = tim.channel(1, Timer.PWM_INVERTED, pin=Pin.cpu.B4)
+    chy = tim.channel(2, Timer.PWM_INVERTED, pin=Pin.cpu.B5)
+
+    def old(duty):
+        if duty >= 0:
+            chx.pulse_width_percent(0)
+            chy.pulse_width_percent(duty)
+        else:
+            chx.pulse_width_percent(-duty)
+            chy.pulse_width_percent(0)
+    duty = -120
+    while duty <= 120:
+        old(duty)
+        want = (chx.compare, chy.compare)
+        motor.set_duty(duty)
+        if (motor.PWM_tim_CH_X.compare, motor.PWM_tim_CH_Y.compare) != want:
+            raise AssertionError(f'duty {duty}: compare values differ from pulse_width_percent {want}')
+        duty += 0.37
+    print(f'compare values match pulse_width_percent from -120 to 120 %, top = {motor.top}')
+
+    for label, ball in (('balancing', (30, -20)), ('empty panel', None)):
+        rig = Rig(inner=(8, 0.05, 0), outer=(0.2, 0.05, 0), ball=ball, seed=1,
+                  estimator=estimator.SteadyKalman(10_000), pid=True)
+        channels = [ch for m in rig.motors for ch in (m.PWM_tim_CH_X, m.PWM_tim_CH_Y)]
+        start = sum(ch.writes for ch in channels)
+        rig.run(5_000_000)
+        writes = sum(ch.writes for ch in channels) - start
+        rig.close()
+        print(f'{label:11}: {writes/500:.2f} compare writes per tick, 4 before')
+
+    for name, call, duties in (('old, two pulse_width_percent', old, (12.5, 12.5)),
+                               ('set_duty, duty unchanged', motor.set_duty, (12.5, 12.5)),
+                               ('set_duty, duty changing', motor.set_duty, (12.5, -7.25))):
+        wall = time.perf_counter()
+        for k in range(n):
+            call(duties[k & 1])
+        wall = time.perf_counter() - wall
+        print(f'{name:29}: {1e6*wall/n:.2f} us on the host')
+
+def bench_fastloop(duration=6_000_000, burst=8_000, gap=25_000):
+    '''!@brief Compares the control period of the cooperative tasks with fastloop.FastLoop.
+        @details Runs sim.rig.Rig with the complete control law in both
+                 modes with a low priority task
+                 that every gap microseconds computes for burst
+                 microseconds without yielding, like a long print or a
+                 calibration step. Records when motor 1 is written and
+                 reports how far the intervals between writes stray from
+                 the 10 ms period, whether the ball stays balanced, and the
+                 latency of the fast loop step after its interrupt and its
+                 overruns.
+        @param duration Simulated run time in microseconds.
+        @param burst Length of each burst of the busy task in microseconds.
+        @param gap Period of the busy task in microseconds.
+    '''
+    sim.install()
+    import estimator
+    import scheduler
+    from sim.rig import Rig
+
+    def busy(clock):
+        next_time = clock.ticks_add(clock.ticks_us(), gap)
+        while True:
+            if clock.ticks_diff(clock.ticks_us(), next_time) >= 0:
+                # Interrupts are taken between bytecodes, here every 30 us
+                for k in range(burst//30):
+                    clock.advance(30)
+                next_time = clock.ticks_add(next_time, gap)
+                yield 1
+            else:
+                yield None
+
+    for fast in (False, True):
+        for load in (False, True):
+            rig = Rig(inner=(8, 0.05, 0), outer=(0.2, 0.05, 0), seed=1,
+                      estimator=estimator.SteadyKalman(10_000), fast=fast, pid=True)
+            clock = rig.clock
+            stamps = []
+            motor = rig.motors[0]
+            # The motor task writes duties, the fast loop interrupt counts
+            name = 'set_counts' if fast else 'set_duty'
+            write = getattr(motor, name)
+
+            def stamped(value, write=write):
+                stamps.append(clock.now)
+                write(value)
+            setattr(motor, name, stamped)
+            if load:
+                rig.sched.add(scheduler.Task('Task Busy', gap, 0, busy(clock)))
+            rig.run(duration)
+            rig.close()
+            # Skip the start, before the sensors are handed over
+            dev = [abs(b - a - 10_000) for a, b in zip(stamps[50:], stamps[51:])]
+            dev.sort()
+            state = f'fell off at t = {rig.fallTime:.2f} s' if rig.fallTime else f'cost {rig.cost(2):.2f} mm'
+            print(f'{"fast loop" if fast else "tasks":9} {"busy" if load else "idle":4}: period error '
+                  f'median {dev[len(dev)//2]:5} us, 99% {dev[99*len(dev)//100]:5} us, '
+                  f'max {dev[-1]:5} us over {len(dev)} steps, {state}')
+            if fast:
+                loop = rig.fastLoop
+                print(f'{"":14} step latency max {loop.maxLatency} us, step {loop.runTime} us, '
+                      f'{loop.overruns} overruns in {loop.seq} steps')
+
+def bench_asyncio(duration=10_000_000):
+    '''!@brief Compares scheduler.Scheduler with the aiotasks coroutines.
+        @details Runs the modeled tasks of MAIN_TASKS on both runtimes, then
+                 the firmware tasks of sim.rig.Rig on both, with the
+                 complete control law. For the Rig it
+                 records when the control task writes the duty cycles and
+                 reports how far the intervals stray from the 10 ms period,
+                 the idle time and whether the ball stays balanced.
+        @param duration Simulated run time in microseconds.
+    '''
+    for label, runtime in (('Scheduler', 'scheduler'), ('asyncio', 'asyncio')):
+        lates, resumes, busy, total, wall = _modelRun(runtime, duration)
+        _summary(label, lates, resumes, busy, total, wall)
+        print(f'    CPU idle {100 - 100*busy/total:.1f}%')
+    sim.install()
+    import estimator
+    from sim.rig import Rig
+    for aio in (False, True):
+        rig = Rig(inner=(8, 0.05, 0), outer=(0.2, 0.05, 0), seed=1,
+                  estimator=estimator.SteadyKalman(10_000), aio=aio, pid=True)
+        clock = rig.clock
+        stamps = []
+        write = rig.duty1.write
+
+        def stamped(value):
+            stamps.append(clock.now)
+            write(value)
+        rig.duty1.write = stamped
+        start = clock.now
+        idle = clock.idle_time
+        wall = time.perf_counter()
+        rig.run(duration)
+        wall = time.perf_counter() - wall
+        rig.close()
+        idle = (clock.idle_time - idle)/(clock.now - start)
+        dev = [abs(b - a - 10_000) for a, b in zip(stamps, stamps[1:])]
+        mean = sum(dev)/len(dev)
+        state = f'fell off at t = {rig.fallTime:.2f} s' if rig.fallTime else f'cost {rig.cost(2):.2f} mm'
+        print(f'Rig on {"asyncio" if aio else "scheduler":9}: CPU idle {100*idle:.1f}%, control period error '
+              f'mean {mean:.1f} us max {max(dev)} us over {len(dev)} steps, {state}, '
+              f'{wall:.2f} s on the host')
+
+def bench_calibration(duration=16_000_000, spike=0.02):
+    '''!@brief Runs the IMU and touchpad calibrations next to a control task.
+        @details Starts IMUTask and TTask without calibration files on the
+                 simulated board, with a modeled 10 ms control task. The
+                 IMU reports full calibration after 3 s. Once the prompts
+                 are printed the panel is touched at each calibration point
+                 for 300 ms and released for 200 ms. Reports the lateness of
+                 the control task, when each calibration finished and how
+                 far the fitted touchpad calibration is from the exact one,
+                 which is the identity on the simulated panel.
+        @param duration Simulated run time in microseconds.
+        @param spike Probability of a full-scale glitch in a panel reading.
+    '''
+    import contextlib
+    import io
+    import os
+    import tempfile
+    clock = sim.install()
+    from sim import pyb
+    from sim.bno055 import FakeBNO055
+    from sim.panel import TouchPanel
+    import adcfilter
+    import BNO055
+    import IMUTask
+    import profiler
+    import shares
+    import touchpad
+    import TTask
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            pyb.reset()
+            fake = FakeBNO055().attach()
+            fake.regs[0x35] = 0
+            pins = ('A7', 'A1', 'A6', 'A0')
+            panel = TouchPanel(*pins, 176, 100, noise=4, spike=spike, seed=1)
+            touch = touchpad.Touchpad(*pins, 176, 100, fixed=True)
+            touch.set_filter(adcfilter.TRIMMED, nmin=8, nmax=25, trim=2)
+            sched = scheduler.Scheduler(clock)
+            stats = []
+            done = {}
+            for name, priority, gen in (
+                    ('Task IMU', 3, IMUTask.bnoFunction('Task IMU', 10_000, shares.Share((0, 0, 0, 0)), BNO055.BNO055(),
+                                                        shares.ArrayShare(3), shares.ArrayShare(3))),
+                    ('Task Touchpad', 3, TTask.TouchpadFunction('Task Touchpad', 10_000, shares.ArrayShare(3), touch,
+                                                                0.85, 0.005, shares.ArrayShare(5))),
+                    ('Task Control', 2, _modelTask(clock, 10_000, 600, []))):
+                prof = profiler.TaskProfiler(name, 10_000, clock=clock)
+                stats.append(prof)
+                sched.add(scheduler.Task(name, 10_000, priority, prof.wrap(gen)))
+            start = clock.now
+            points = ((0, 0), (-80, 40), (80, 40), (-80, -40), (80, -40))
+
+            def user():
+                t = clock.now - start
+                if t >= 3_000_000:
+                    fake.regs[0x35] = 0xFF
+                k, phase = divmod(t - 10_000_000, 500_000)
+                if 0 <= k < len(points):
+                    panel.contact = points[k] if phase < 300_000 else None
+                for name in ('IMU_cal_coeffs.txt', 'Touchpad_cal_coeffs.txt'):
+                    if name not in done and name in os.listdir():
+                        done[name] = t
+            event = clock.add_event(1000, user)
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                sched.run(duration)
+            clock.remove_event(event)
+            imu, tp, ctl = stats
+            print(f'control lateness mean {ctl.lateSum/ctl.runs:.0f} us max {ctl.lateMax} us, '
+                  f'{ctl.runs} runs in {(clock.now - start)/10_000:.0f} periods')
+            print(f'task run time max: IMU {imu.execMax} us, touchpad {tp.execMax} us')
+            for name in ('IMU_cal_coeffs.txt', 'Touchpad_cal_coeffs.txt'):
+                when = f'at t = {done[name]/1e6:.2f} s' if name in done else 'not finished'
+                print(f'{name:24}: {when}')
+            if 'Touchpad_cal_coeffs.txt' in done:
+                with open('Touchpad_cal_coeffs.txt') as f:
+                    Kxx, Kxy, xo, Kyx, Kyy, yo = (float(v) for v in f.readline().split(','))
+                err = max(abs(Kxx*x + Kxy*y + xo - x) + abs(Kyx*x + Kyy*y + yo - y) for x, y in points)
+                print(f'touchpad calibration (Kxx, Kxy, xo, Kyx, Kyy, yo) = '
+                      f'({Kxx:.4f}, {Kxy:.4f}, {xo:.3f}, {Kyx:.4f}, {Kyy:.4f}, {yo:.3f}), '
+                      f'largest error {err:.2f} mm at the calibration points')
+            print(f'{len(out.getvalue().splitlines())} lines printed')
+        finally:
+            os.chdir(cwd)
+
+BENCHES = {'scheduler': bench_scheduler,
+           'touchpad': bench_touchpad,
+           'adcfilter': bench_adcfilter,
+           'bno': bench_bno,
+           'imu': bench_imu,
+           'control': bench_control,
+           'closedloop': bench_closedloop,
+           'plant': bench_plant,
+           'telemetry': bench_telemetry,
+           'recorder': bench_recorder,
+           'logwriter': bench_logwriter,
+           'analysis': bench_analysis,
+           'lodplot': bench_lodplot,
+           'gainsched': bench_gainsched,
+           'estimator': bench_estimator,
+           'fixedpoint': bench_fixedpoint,
+           'motor': bench_motor,
+           'fastloop': bench_fastloop,
+           'asyncio': bench_asyncio,
+           'calibration': bench_calibration}
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or BENCHES:
+        print(f'--- {name} ---')
+        BENCHES[name]()
@@ -0,0 +1,49 @@
+"""!
+@file sim/bno055.py
+@brief Simulated BNO055 register map for host runs.
+@details Holds the 256 registers of the IMU and encodes Euler angles and
+         angular velocities into them the same way the chip does, in signed
+         little-endian units of 1/16 degree and 1/16 degree per second.
+         Attach it to the simulated I2C bus with attach().
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import struct
+from sim import pyb
+
+class FakeBNO055:
+    '''!@brief Register-level model of the BNO055.
+    '''
+
+    def __init__(self):
+        '''!@brief Creates a fully calibrated IMU reading zero motion.
+        '''
+        self.regs = bytearray(256)
+        # Calibration status: mag, acc, gyr and sys all at 3
+        self.regs[0x35] = 0xFF
+
+    def attach(self, bus=1, addr=0x28):
+        '''!@brief Attaches the IMU to the simulated I2C bus.
+        '''
+        pyb.attach_i2c(bus, addr, self)
+        return self
+
+    def set_motion(self, heading, roll, pitch, gyr_x, gyr_y, gyr_z):
+        '''!@brief Sets the values read from the Euler and gyro registers.
+            @details The arguments are the raw chip values in degrees and
+                     degrees per second. BNO055.get_euler() negates the
+                     angles when it decodes them.
+        '''
+        struct.pack_into('<6h', self.regs, 0x14,
+                         *(max(-32768, min(32767, round(16*v)))
+                           for v in (gyr_x, gyr_y, gyr_z, heading, roll, pitch)))
+
+    def mem_read(self, nbytes, memaddr):
+        return self.regs[memaddr:memaddr + nbytes]
+
+    def mem_write(self, data, memaddr):
+        self.regs[memaddr:memaddr + len(data)] = data
@@ -0,0 +1,122 @@
+"""!
+@file sim/clock.py
+@brief Simulated microsecond clock with MicroPython ticks semantics.
+@details Time only moves forward when advance() or idle() is called, which
+         lets code that is timed with ticks_us() run much faster than real
+         time on a PC. Tick values wrap at 2**30 the same way they do on the
+         board so that wrap-around bugs show up in host runs.
+
+         Periodic events model hardware timer interrupts. They fire while
+         time advances, in the middle of whatever code is consuming the
+         time, like an interrupt would. The service hook runs after each
+         advance, which is where callbacks queued with micropython.schedule()
+         are run.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+## @brief Ticks wrap at this value, matching MicroPython on the STM32
+#
+TICKS_PERIOD = 1 << 30
+
+_TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALF = TICKS_PERIOD // 2
+
+class SimClock:
+    '''!@brief A simulated clock usable wherever the scheduler expects a clock.
+    '''
+
+    def __init__(self, start=0):
+        '''!@brief Creates a clock.
+            @param start Starting time in microseconds. Starting close to
+                         TICKS_PERIOD exercises tick wrap-around early.
+        '''
+        ## Unwrapped time in microseconds
+        self.now = start
+        ## Total time in microseconds spent in idle()
+        self.idle_time = 0
+        ## Function run after time advances, or None
+        self.service = None
+        self._events = []
+        self._busy = False
+
+    def ticks_us(self):
+        '''!@brief Returns the current time in wrapped microsecond ticks.
+        '''
+        return self.now & _TICKS_MAX
+
+    def ticks_ms(self):
+        '''!@brief Returns the current time in wrapped millisecond ticks.
+        '''
+        return (self.now // 1000) & _TICKS_MAX
+
+    def ticks_add(self, ticks, delta):
+        '''!@brief Offsets a tick value, wrapping like time.ticks_add().
+        '''
+        return (ticks + delta) & _TICKS_MAX
+
+    def ticks_diff(self, ticks1, ticks2):
+        '''!@brief Signed difference of two tick values like time.ticks_diff().
+        '''
+        return ((ticks1 - ticks2 + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+    def add_event(self, period, func, first=None):
+        '''!@brief Calls func every period microseconds, like a timer interrupt.
+            @param period Period of the event in microseconds.
+            @param func Function of no arguments.
+            @param first Delay in microseconds before the first call, one
+                         period when left as None.
+            @return A handle for remove_event().
+        '''
+        event = [self.now + (period if first is None else first), period, func]
+        self._events.append(event)
+        return event
+
+    def remove_event(self, event):
+        '''!@brief Stops an event made with add_event().
+        '''
+        if event in self._events:
+            self._events.remove(event)
+
+    def _run_to(self, target):
+        '''!@brief Moves time to target, firing events on the way.
+        '''
+        while self._events:
+            event = min(self._events, key=lambda e: e[0])
+            if event[0] > target:
+                break
+            if event[0] > self.now:
+                self.now = event[0]
+            event[0] += event[1]
+            event[2]()
+        if target > self.now:
+            self.now = target
+        if self.service is not None and not self._busy:
+            self._busy = True
+            try:
+                self.service()
+            finally:
+                self._busy = False
+
+    def advance(self, us):
+        '''!@brief Moves time forward, used to model time spent computing.
+            @param us Time in microseconds.
+        '''
+        self._run_to(self.now + us)
+
+    def idle(self, wait):
+        '''!@brief Sleeps until the next deadline or the next event.
+            @details Like pyb.wfi(), an event wakes the sleeper early so that
+                     the callbacks it schedules run right away.
+            @param wait Time in microseconds until the next deadline.
+        '''
+        if wait > 0:
+            target = self.now + wait
+            for event in self._events:
+                if event[0] < target:
+                    target = max(event[0], self.now)
+            self.idle_time += target - self.now
+            self._run_to(target)
@@ -0,0 +1,207 @@
+"""!
+@file sim/gainsweep.py
+@brief Runs many gain sets on the simulated platform and ranks them.
+@details Each gain set is run on its own sim.rig.Rig, so the firmware
+         controllers in closedloop5 and CTask5 do the control. The runs are
+         spread over a multiprocessing pool. Every run drops the ball at the
+         same spot and is scored by its settling time, its overshoot and the
+         time the motors spend saturated. Runs where the ball falls off rank
+         last.
+
+         Run from the Term Project folder. Each gain option takes a list of
+         values, which are combined into a grid:
+
+             python -m sim.gainsweep --kp-in 4 6 10 --kp-out 0.03 0.06
+
+         The runs use the control law main.py runs, in which only the
+         proportional gains act, so nonzero Kd and Ki values are rejected.
+         --pid runs the complete law of closedloop5.ClosedLoop instead, with
+         which the derivative and integral gains can be swept too:
+
+             python -m sim.gainsweep --pid --kp-in 4 6 10 --kp-out 0.03 0.06 --kd-out 0.1 0.3
+
+         With --random N, N gain sets are drawn instead, each option giving
+         the low and high end of a log-uniform range, or one fixed value:
+
+             python -m sim.gainsweep --pid --random 200 --kp-in 2 12 --kd-in 0 --kp-out 0.01 0.2 --kd-out 0.05 1
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import argparse
+import itertools
+import math
+import multiprocessing
+import random
+import time
+
+## @brief Names of the gains in the order of a gain set
+#
+GAINS = ('KpShare', 'KdShare', 'KiShare', 'KpOut', 'KdOut', 'KiOut')
+
+## @brief Duty in percent at which the inner loops saturate in main.py
+#
+DUTY_LIMIT = 45
+
+def evaluate(case):
+    '''!@brief Runs one gain set on a new rig and scores it.
+        @param case Tuple of the gain set, the ball drop position, the
+                    simulated run time in seconds, the settling band in mm,
+                    the panel noise seed and the pid flag of the controllers.
+        @return Tuple of the gain set, the settling time in s, the overshoot
+                in mm, the saturated time in s and the fall time in s, which
+                is None if the ball stayed on the panel.
+    '''
+    from sim.rig import Rig
+    gains, ball, duration, band, seed, pid = case
+    rig = Rig(gains[:3], gains[3:], ball=ball, seed=seed, pid=pid)
+    try:
+        rig.run(int(duration*1e6))
+    finally:
+        rig.close()
+    settle, overshoot, saturated = score(rig.trace, ball, rig.dropTime*1e-6, band)
+    if rig.fallTime is not None:
+        settle = math.inf
+    return gains, settle, overshoot, saturated, rig.fallTime
+
+def score(trace, ball, drop, band):
+    '''!@brief Computes the step response metrics of a rig trace.
+        @param trace Trace of a sim.rig.Rig.
+        @param ball Drop position (x, y) of the ball in mm.
+        @param drop Time of the drop in s.
+        @param band Distance from the center in mm within which the ball
+                    counts as settled.
+        @return Tuple of the settling time in s after the drop, the
+                overshoot in mm past the center and the time in s during
+                which either motor was saturated. The settling time is
+                infinite if the ball never settled.
+    '''
+    t = trace['t']
+    x = trace['x']
+    y = trace['y']
+    settle = math.inf
+    overshoot = 0
+    saturated = 0
+    dt = t[1] - t[0] if len(t) > 1 else 0
+    sx = 1 if ball[0] >= 0 else -1
+    sy = 1 if ball[1] >= 0 else -1
+    for k in range(len(t)):
+        if t[k] < drop:
+            continue
+        if x[k]*x[k] + y[k]*y[k] > band*band:
+            settle = math.inf
+        elif settle == math.inf:
+            settle = t[k] - drop
+        overshoot = max(overshoot, -sx*x[k], -sy*y[k])
+        if abs(trace['duty1'][k]) >= DUTY_LIMIT or abs(trace['duty2'][k]) >= DUTY_LIMIT:
+            saturated += dt
+    return settle, overshoot, saturated
+
+def grid(values):
+    '''!@brief Makes every combination of the gain values.
+        @param values List of six lists of values, one per gain.
+        @return List of gain sets.
+    '''
+    return list(itertools.product(*values))
+
+def sample(ranges, n, seed=None):
+    '''!@brief Draws gain sets at random.
+        @details A range with two values is sampled log-uniformly when both
+                 ends are positive and uniformly otherwise. A range with one
+                 value keeps that gain fixed.
+        @param ranges List of six ranges, one per gain.
+        @param n Number of gain sets to draw.
+        @param seed Seed of the random generator.
+        @return List of gain sets.
+    '''
+    rand = random.Random(seed)
+    cases = []
+    for i in range(n):
+        gains = []
+        for r in ranges:
+            if len(r) == 1:
+                gains.append(r[0])
+            elif r[0] > 0 and r[1] > 0:
+                gains.append(math.exp(rand.uniform(math.log(r[0]), math.log(r[1]))))
+            else:
+                gains.append(rand.uniform(r[0], r[1]))
+        cases.append(tuple(gains))
+    return cases
+
+def rank(results):
+    '''!@brief Sorts results from best to worst.
+        @details Runs that kept the ball rank first, ordered by settling
+                 time, then overshoot, then saturated time. Runs that lost
+                 the ball follow, the ones that held it longest first.
+    '''
+    return sorted(results, key=lambda r: (r[4] is not None, -(r[4] or 0), r[1], r[2], r[3]))
+
+def sweep(cases, ball=(30, -20), duration=6, band=5, seed=1, workers=None, chunksize=1, pid=False):
+    '''!@brief Runs gain sets over a process pool.
+        @param cases List of gain sets.
+        @param ball Drop position (x, y) of the ball in mm.
+        @param duration Simulated run time of each gain set in s.
+        @param band Settling band in mm.
+        @param seed Panel noise seed, the same for every run.
+        @param workers Number of processes, one per CPU when left as None.
+        @param chunksize Number of gain sets handed to a process at once.
+        @param pid True to run the complete control law of closedloop5.ClosedLoop.
+        @return Ranked list of results as returned by evaluate().
+    '''
+    jobs = [(tuple(gains), tuple(ball), duration, band, seed, pid) for gains in cases]
+    with multiprocessing.Pool(workers) as pool:
+        results = list(pool.imap_unordered(evaluate, jobs, chunksize))
+    return rank(results)
+
+def write_csv(results, filename):
+    '''!@brief Writes ranked results to a CSV file.
+    '''
+    with open(filename, 'w') as f:
+        f.write(','.join(GAINS) + ',settle_s,overshoot_mm,saturated_s,fall_s\n')
+        for gains, settle, overshoot, saturated, fall in results:
+            f.write(','.join(f'{g:g}' for g in gains)
+                    + f',{settle:.3f},{overshoot:.2f},{saturated:.3f},{"" if fall is None else f"{fall:.2f}"}\n')
+
+def main(argv=None):
+    '''!@brief Command line entry point.
+    '''
+    parser = argparse.ArgumentParser(description='Rank controller gains on the simulated platform.')
+    defaults = ((4,), (0,), (0,), (0.05,), (0,), (0,))
+    for name, default in zip(('kp-in', 'kd-in', 'ki-in', 'kp-out', 'kd-out', 'ki-out'), defaults):
+        parser.add_argument('--' + name, type=float, nargs='+', default=list(default))
+    parser.add_argument('--random', type=int, default=0, help='draw this many gain sets instead of a grid')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--ball', type=float, nargs=2, default=(30, -20))
+    parser.add_argument('--duration', type=float, default=6, help='simulated seconds per run')
+    parser.add_argument('--band', type=float, default=5, help='settling band in mm')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--pid', action='store_true',
+                        help='add the derivative and integral terms to the control law')
+    parser.add_argument('--csv', default=None, help='write every result to this file')
+    args = parser.parse_args(argv)
+
+    values = [args.kp_in, args.kd_in, args.ki_in, args.kp_out, args.kd_out, args.ki_out]
+    if not args.pid:
+        for name, vals in zip(GAINS, values):
+            if name[:2] != 'Kp' and any(vals):
+                parser.error(f'{name} has no effect without --pid, so it would '
+                             'only repeat the same runs')
+    cases = sample(values, args.random, args.seed) if args.random else grid(values)
+    wall = time.perf_counter()
+    results = sweep(cases, args.ball, args.duration, args.band, args.seed, args.workers, pid=args.pid)
+    wall = time.perf_counter() - wall
+    print(f'{len(cases)} runs of {args.duration:g} s in {wall:.1f} s, '
+          f'{len(cases)*args.duration/wall:.0f}x real time')
+    print('   Kp in   Kd in   Ki in  Kp out  Kd out  Ki out   settle  overshoot  saturated')
+    for gains, settle, overshoot, saturated, fall in results[:args.top]:
+        end = f'fell at {fall:.2f} s' if fall is not None else f'{settle:6.2f} s  {overshoot:6.1f} mm  {saturated:6.2f} s'
+        print(''.join(f'{g:8.3g}' for g in gains) + '   ' + end)
+    if args.csv:
+        write_csv(results, args.csv)
+
+if __name__ == '__main__':
+    main()
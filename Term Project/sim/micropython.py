@@ -0,0 +1,53 @@
+"""!
+@file sim/micropython.py
+@brief Stand-in for the micropython module under CPython.
+@details The code emitter decorators return the function unchanged and
+         const() returns its argument. Callbacks passed to schedule() are
+         queued and run by run_scheduled(), which the simulated clock calls
+         each time it advances.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+def const(value):
+    '''!@brief Returns value, like micropython.const().
+    '''
+    return value
+
+def native(func):
+    '''!@brief Returns func unchanged, like the native code emitter.
+    '''
+    return func
+
+def viper(func):
+    '''!@brief Returns func unchanged, like the viper code emitter.
+    '''
+    return func
+
+## @brief Maximum number of queued callbacks, as on the board
+#
+SCHEDULE_DEPTH = 8
+
+_scheduled = []
+
+def schedule(func, arg):
+    '''!@brief Queues func(arg) to run outside the interrupt.
+        @exception RuntimeError The queue is full.
+    '''
+    if len(_scheduled) >= SCHEDULE_DEPTH:
+        raise RuntimeError('schedule queue full')
+    _scheduled.append((func, arg))
+
+def run_scheduled():
+    '''!@brief Runs every queued callback in order.
+    '''
+    while _scheduled:
+        func, arg = _scheduled.pop(0)
+        func(arg)
+
+def alloc_emergency_exception_buf(size):
+    '''!@brief Does nothing on a PC.
+    '''
@@ -0,0 +1,97 @@
+"""!
+@file sim/panel.py
+@brief Model of the four-wire resistive touch panel for host runs.
+@details Attaches analog sources to the panel pins so that the readings of
+         the simulated ADCs depend on how the four pins are driven, the same
+         way the real panel behaves. With one layer driven high on its plus
+         pin and low on its minus pin, the other layer reads the contact
+         position along the driven layer. With the y layer pulled high and
+         the x layer pulled low, the y layer reads high unless the layers
+         touch.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import random
+from sim import pyb
+
+## @brief Reading of the z scan while the ball presses on the panel
+#
+Z_CONTACT = 1800
+
+class TouchPanel:
+    '''!@brief Resistive touch panel attached to four simulated pins.
+    '''
+
+    def __init__(self, xpPin, xmPin, ypPin, ymPin, xwidth, ylength, noise=0, spike=0, seed=None):
+        '''!@brief Creates the panel model and attaches it to the pins.
+            @param xpPin Pin on the positive x terminal.
+            @param xmPin Pin on the negative x terminal.
+            @param ypPin Pin on the positive y terminal.
+            @param ymPin Pin on the negative y terminal.
+            @param xwidth Width of the panel in mm.
+            @param ylength Length of the panel in mm.
+            @param noise Standard deviation of the reading noise in counts.
+            @param spike Probability of a reading being a full-scale glitch.
+            @param seed Seed for the reading noise.
+        '''
+        self.pins = {'xp': pyb.Pin(xpPin).id, 'xm': pyb.Pin(xmPin).id,
+                     'yp': pyb.Pin(ypPin).id, 'ym': pyb.Pin(ymPin).id}
+        self.xwidth = xwidth
+        self.ylength = ylength
+        self.noise = noise
+        self.spike = spike
+        self._rand = random.Random(seed)
+        ## Contact position (x, y) in mm from the panel center, or None
+        self.contact = None
+        for name in ('xp', 'xm', 'yp', 'ym'):
+            pyb.attach_analog(self.pins[name], self._source(name[0]))
+
+    def _state(self, name):
+        return pyb.pin_state[self.pins[name]]
+
+    def _driven(self, layer):
+        '''!@brief Checks if a layer has its plus pin high and minus pin low.
+        '''
+        p = self._state(layer + 'p')
+        m = self._state(layer + 'm')
+        return (p[0] == pyb.Pin.OUT_PP and p[1] == 1 and
+                m[0] == pyb.Pin.OUT_PP and m[1] == 0)
+
+    def _pulled(self, layer, level):
+        '''!@brief Checks if any pin of a layer is driven to a level.
+        '''
+        for end in 'pm':
+            state = self._state(layer + end)
+            if state[0] == pyb.Pin.OUT_PP and state[1] == level:
+                return True
+        return False
+
+    def _source(self, layer):
+        '''!@brief Makes the analog source for a pin on one layer.
+        '''
+        other = 'y' if layer == 'x' else 'x'
+        def read():
+            if self._driven(other):
+                if self.contact is None:
+                    return 4095
+                if other == 'x':
+                    ratio = (self.contact[0] + self.xwidth/2)/self.xwidth
+                else:
+                    ratio = (self.contact[1] + self.ylength/2)/self.ylength
+                value = ratio*4096
+            elif self._pulled(layer, 1):
+                if self.contact is None or not self._pulled(other, 0):
+                    return 4095
+                value = Z_CONTACT
+            else:
+                return 0
+            if self.noise:
+                value += self._rand.gauss(0, self.noise)
+            if self.spike and self._rand.random() < self.spike:
+                value = 4095 if self._rand.random() < 0.5 else 0
+            return min(4095, max(0, int(value)))
+        return read
@@ -0,0 +1,166 @@
+"""!
+@file sim/plant.py
+@brief Model of the ball balancing platform for host runs.
+@details Each axis of the platform is a lever driven by one DC motor. The
+         motor and linkage are lumped into a first-order model of the tilt
+         rate: the duty cycle sets a target tilt rate which the platform
+         approaches with the motor time constant. Hard stops limit the tilt.
+         The ball rolls without slipping, so it accelerates at 5/7 g times
+         the sine of the tilt, with a little rolling drag.
+
+         Axis 1 tilts about y, which the firmware reads as the Euler angle
+         at IMUTask.EUL_Y, and rolls the ball along x. Axis 2 tilts about x,
+         read at IMUTask.EUL_X, and rolls the ball along y. The signs follow
+         the firmware: a positive duty tilts the platform towards negative
+         angles, and TTask reports the x position negated.
+
+         The plant is advanced by a SimClock event, reads the duty cycles
+         from the PWM compare values of the motor5.Motor objects and writes
+         its state to a sim.bno055.FakeBNO055 and a sim.panel.TouchPanel, so
+         the firmware tasks run on it unmodified.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import math
+
+## @brief Rolling ball acceleration per unit sine of tilt in mm/s^2, 5/7 g
+#
+BALL_GAIN = 5/7*9810
+
+class BallPlate:
+    '''!@brief Two-axis ball on platform plant.
+    '''
+
+    def __init__(self, rateMax=150, tau=0.03, tiltMax=15, hold=5, drag=0.5,
+                 xwidth=176, ylength=100):
+        '''!@brief Creates a level platform with the ball at the center.
+            @param rateMax Tilt rate in degrees per second at 100% duty.
+            @param tau Time constant of the motor and linkage in seconds.
+            @param tiltMax Tilt in degrees at which the lever hits its stop.
+            @param hold Negative of the duty in percent that holds the
+                        platform level against the weight of the platform
+                        and linkage. The inner loops add this offset.
+            @param drag Rolling drag of the ball in 1/s.
+            @param xwidth Width of the panel in mm, the ball falls off past
+                          its edges.
+            @param ylength Length of the panel in mm.
+        '''
+        self.rateMax = rateMax
+        self.tau = tau
+        self.tiltMax = tiltMax
+        self.hold = hold
+        self.drag = drag
+        self.xlimit = xwidth/2
+        self.ylimit = ylength/2
+        ## Tilt of each axis in degrees as read by the firmware
+        self.tilt = [0.0, 0.0]
+        ## Tilt rate of each axis in degrees per second
+        self.rate = [0.0, 0.0]
+        ## Duty cycle of each motor in percent
+        self.duty = [0.0, 0.0]
+        ## Ball position (x, y) in mm from the panel center
+        self.pos = [0.0, 0.0]
+        ## Ball velocity in mm/s
+        self.vel = [0.0, 0.0]
+        ## True while the ball is on the panel
+        self.onPlate = True
+        self.motors = None
+        self.bno = None
+        self.panel = None
+        self._event = None
+        self._last = None
+
+    def place(self, x, y, vx=0, vy=0):
+        '''!@brief Puts the ball on the panel.
+            @param x Position along x in mm.
+            @param y Position along y in mm.
+            @param vx Velocity along x in mm/s.
+            @param vy Velocity along y in mm/s.
+        '''
+        self.pos[0] = x
+        self.pos[1] = y
+        self.vel[0] = vx
+        self.vel[1] = vy
+        self.onPlate = True
+        self._publish()
+
+    def lift(self):
+        '''!@brief Takes the ball off the panel.
+        '''
+        self.onPlate = False
+        self._publish()
+
+    def attach(self, clock, motors, bno, panel, dt=1000):
+        '''!@brief Connects the plant to the simulated hardware.
+            @param clock SimClock that advances the plant.
+            @param motors Tuple of the motor5.Motor objects of axis 1 and 2.
+            @param bno sim.bno055.FakeBNO055 that reports the tilt.
+            @param panel sim.panel.TouchPanel that reports the ball.
+            @param dt Integration step in microseconds.
+        '''
+        self.detach()
+        self.clock = clock
+        self.motors = motors
+        self.bno = bno
+        self.panel = panel
+        self._last = clock.now
+        self._event = clock.add_event(dt, self.update)
+        self._publish()
+        return self
+
+    def detach(self):
+        '''!@brief Stops advancing the plant.
+        '''
+        if self._event is not None:
+            self.clock.remove_event(self._event)
+            self._event = None
+
+    def update(self):
+        '''!@brief Reads the motors and advances the plant to the clock time.
+        '''
+        now = self.clock.now
+        dt = (now - self._last)*1e-6
+        self._last = now
+        for i, motor in enumerate(self.motors):
+            self.duty[i] = (motor.PWM_tim_CH_Y.pulse_width_percent()
+                            - motor.PWM_tim_CH_X.pulse_width_percent())
+        if dt > 0:
+            self.step(dt)
+        self._publish()
+
+    def step(self, dt):
+        '''!@brief Advances the plant by one step with semi-implicit Euler.
+            @param dt Step in seconds.
+        '''
+        for i in range(2):
+            target = -self.rateMax*(self.duty[i] + self.hold)/100
+            self.rate[i] += (target - self.rate[i])*min(1, dt/self.tau)
+            tilt = self.tilt[i] + self.rate[i]*dt
+            if tilt > self.tiltMax or tilt < -self.tiltMax:
+                tilt = max(-self.tiltMax, min(self.tiltMax, tilt))
+                self.rate[i] = 0
+            self.tilt[i] = tilt
+        if not self.onPlate:
+            return
+        # Axis 1 rolls the ball towards +x, axis 2 towards -y
+        accel = (BALL_GAIN*math.sin(math.radians(self.tilt[0])),
+                 -BALL_GAIN*math.sin(math.radians(self.tilt[1])))
+        for i in range(2):
+            self.vel[i] += (accel[i] - self.drag*self.vel[i])*dt
+            self.pos[i] += self.vel[i]*dt
+        if abs(self.pos[0]) > self.xlimit or abs(self.pos[1]) > self.ylimit:
+            self.onPlate = False
+
+    def _publish(self):
+        '''!@brief Writes the plant state to the IMU registers and the panel.
+        '''
+        if self.bno is not None:
+            # BNO055.read_motion_into() negates the Euler angles only
+            self.bno.set_motion(0, -self.tilt[0], -self.tilt[1],
+                                self.rate[1], self.rate[0], 0)
+        if self.panel is not None:
+            self.panel.contact = (self.pos[0], self.pos[1]) if self.onPlate else None
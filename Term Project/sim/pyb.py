@@ -0,0 +1,322 @@
+"""!
+@file sim/pyb.py
+@brief Stand-in for the pyb module under CPython.
+@details Pins keep their mode and output value in a table shared by every
+         Pin object made for the same pin, just like the real GPIO registers.
+         ADC readings come from analog sources attached to a pin with
+         attach_analog(), such as the touch panel model in sim.panel.
+         Time comes from the SimClock given to sim.install().
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+## @brief SimClock used for all timing, set by sim.install()
+#
+clock = None
+
+## @brief Mode and output value of every pin, keyed by pin name
+#
+pin_state = {}
+
+## @brief Functions returning the 12-bit ADC reading of a pin, keyed by pin name
+#
+analog = {}
+
+## @brief Simulated I2C devices, keyed by (bus, address)
+#
+i2c_devices = {}
+
+## @brief Modeled time in microseconds for one ADC conversion with read()
+#
+ADC_READ_US = 5
+
+## @brief Modeled driver overhead in microseconds for one I2C transfer
+#
+I2C_SETUP_US = 50
+
+def attach_analog(name, source):
+    '''!@brief Attaches an analog source to a pin.
+        @param name Name of the pin, such as 'A0'.
+        @param source Function of no arguments returning a 12-bit reading.
+    '''
+    analog[name] = source
+
+def attach_i2c(bus, addr, device):
+    '''!@brief Attaches a simulated device to an I2C bus.
+        @param bus Number of the I2C bus.
+        @param addr 7-bit address of the device.
+        @param device Object with mem_read(nbytes, memaddr) returning bytes
+                      and mem_write(data, memaddr).
+    '''
+    i2c_devices[(bus, addr)] = device
+
+def reset():
+    '''!@brief Forgets every pin, analog source and I2C device.
+    '''
+    pin_state.clear()
+    analog.clear()
+    i2c_devices.clear()
+
+class _CpuPins:
+    '''!@brief Gives pin names for Pin.cpu.A0 style pin ids.
+    '''
+    def __getattr__(self, name):
+        return name
+
+class Pin:
+    '''!@brief Simulated GPIO pin.
+    '''
+    IN = 0
+    OUT_PP = 1
+    OUT_OD = 17
+    ALT = 2
+    ALT_OD = 18
+    ANALOG = 3
+    PULL_NONE = 0
+    PULL_UP = 1
+    PULL_DOWN = 2
+    cpu = _CpuPins()
+    board = _CpuPins()
+
+    def __init__(self, id, mode=-1, pull=-1, value=None, alt=-1):
+        '''!@brief Creates a pin object, configuring the pin if mode is given.
+        '''
+        self.id = id.id if isinstance(id, Pin) else id
+        pin_state.setdefault(self.id, [Pin.IN, 0])
+        if mode != -1:
+            self.init(mode, pull, value=value, alt=alt)
+
+    def init(self, mode=IN, pull=-1, value=None, alt=-1):
+        '''!@brief Changes the mode of the pin.
+        '''
+        state = pin_state[self.id]
+        if value is not None:
+            state[1] = 1 if value else 0
+        state[0] = mode
+
+    def mode(self):
+        return pin_state[self.id][0]
+
+    def value(self, value=None):
+        state = pin_state[self.id]
+        if value is None:
+            return state[1]
+        state[1] = 1 if value else 0
+
+    def high(self):
+        pin_state[self.id][1] = 1
+
+    def low(self):
+        pin_state[self.id][1] = 0
+
+    def name(self):
+        return self.id
+
+class ADC:
+    '''!@brief Simulated 12-bit ADC channel.
+    '''
+
+    def __init__(self, pin):
+        '''!@brief Creates an ADC on a pin and puts the pin in analog mode.
+        '''
+        self.pin = pin if isinstance(pin, Pin) else Pin(pin)
+        self.pin.init(Pin.ANALOG)
+
+    def read(self):
+        '''!@brief Returns one conversion.
+        '''
+        clock.advance(ADC_READ_US)
+        if pin_state[self.pin.id][0] != Pin.ANALOG:
+            return 0
+        source = analog.get(self.pin.id)
+        return source() if source else 0
+
+    def read_timed(self, buf, timer):
+        '''!@brief Fills buf with conversions taken at a fixed rate.
+            @param buf Buffer to fill.
+            @param timer Sample rate in Hz.
+        '''
+        source = analog.get(self.pin.id)
+        if pin_state[self.pin.id][0] != Pin.ANALOG or source is None:
+            source = _zero
+        for i in range(len(buf)):
+            buf[i] = source()
+        clock.advance(len(buf)*1_000_000//timer)
+        return len(buf)
+
+def _zero():
+    return 0
+
+class I2C:
+    '''!@brief Simulated I2C bus.
+        @details Each transfer advances the clock by the time the bytes take
+                 on the bus, including the address and register bytes, and
+                 is counted in transactions.
+    '''
+    CONTROLLER = 0
+    MASTER = 0
+    PERIPHERAL = 1
+    SLAVE = 1
+
+    def __init__(self, bus, mode=CONTROLLER, baudrate=400_000, **kwargs):
+        self.bus = bus
+        self.baudrate = baudrate
+        ## Number of transfers made on this bus object
+        self.transactions = 0
+
+    def init(self, mode=CONTROLLER, baudrate=400_000, **kwargs):
+        self.baudrate = baudrate
+
+    def _device(self, addr):
+        try:
+            return i2c_devices[(self.bus, addr)]
+        except KeyError:
+            raise OSError(5) from None
+
+    def _transfer(self, nbytes):
+        self.transactions += 1
+        clock.advance(I2C_SETUP_US + (nbytes + 4)*9*1_000_000//self.baudrate)
+
+    def mem_read(self, data, addr, memaddr, timeout=5000, addr_size=8):
+        '''!@brief Reads registers into a buffer or a new bytes object.
+        '''
+        device = self._device(addr)
+        if isinstance(data, int):
+            self._transfer(data)
+            return bytes(device.mem_read(data, memaddr))
+        view = memoryview(data).cast('B')
+        self._transfer(len(view))
+        view[:] = device.mem_read(len(view), memaddr)
+        return data
+
+    def mem_write(self, data, addr, memaddr, timeout=5000, addr_size=8):
+        '''!@brief Writes an integer or a buffer to registers.
+        '''
+        device = self._device(addr)
+        if isinstance(data, int):
+            data = bytes((data & 0xFF,))
+        data = bytes(memoryview(data).cast('B'))
+        self._transfer(len(data))
+        device.mem_write(data, memaddr)
+
+    def scan(self):
+        return [addr for bus, addr in i2c_devices if bus == self.bus]
+
+class ExtInt:
+    '''!@brief Placeholder for external interrupts, which are not simulated.
+    '''
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+    IRQ_RISING_FALLING = 3
+
+    def __init__(self, pin, mode, pull, callback):
+        self.pin = pin
+        self.callback = callback
+
+class TimerChannel:
+    '''!@brief Simulated output compare channel of a timer.
+    '''
+
+    def __init__(self, timer, channel, mode, pin=None):
+        self.timer = timer
+        self.number = channel
+        self.mode = mode
+        self.pin = pin
+        ## Compare register value
+        self.compare = 0
+        ## Number of writes to the compare register
+        self.writes = 0
+
+    def pulse_width(self, value=None):
+        if value is None:
+            return self.compare
+        self.compare = value
+        self.writes += 1
+
+    def pulse_width_percent(self, value=None):
+        if value is None:
+            return 100*self.compare/(self.timer.period() + 1)
+        self.compare = int(min(100, max(0, value))*(self.timer.period() + 1)/100)
+        self.writes += 1
+
+class Timer:
+    '''!@brief Simulated hardware timer.
+    '''
+    PWM = 0
+    PWM_INVERTED = 1
+    OC_TIMING = 2
+
+    ## @brief Frequency of the timer clock in Hz
+    #
+    SOURCE_FREQ = 84_000_000
+
+    def __init__(self, id, freq=None, prescaler=0, period=0xFFFF, **kwargs):
+        self.id = id
+        self.channels = {}
+        self._event = None
+        self._counter = 0
+        self.init(freq=freq, prescaler=prescaler, period=period)
+
+    def init(self, freq=None, prescaler=0, period=0xFFFF, **kwargs):
+        if freq is not None:
+            self._prescaler = 0
+            self._period = Timer.SOURCE_FREQ//int(freq) - 1
+            while self._period > 0xFFFF:
+                self._prescaler += 1
+                self._period = Timer.SOURCE_FREQ//((self._prescaler + 1)*int(freq)) - 1
+        else:
+            self._prescaler = prescaler
+            self._period = period
+
+    def freq(self):
+        return Timer.SOURCE_FREQ/((self._prescaler + 1)*(self._period + 1))
+
+    def period(self):
+        return self._period
+
+    def prescaler(self):
+        return self._prescaler
+
+    def callback(self, func):
+        '''!@brief Sets the function called at every update event, or None.
+        '''
+        if self._event is not None:
+            clock.remove_event(self._event)
+            self._event = None
+        if func is not None:
+            period = round(1_000_000/self.freq())
+            first = period - self._counter*period//(self._period + 1)
+            self._event = clock.add_event(period, lambda: func(self), first)
+
+    def counter(self, value=None):
+        '''!@brief Sets the counter, which shifts the phase of the callback.
+        '''
+        if value is None:
+            return self._counter
+        self._counter = value
+
+    def channel(self, channel, mode=None, pin=None, **kwargs):
+        if mode is None:
+            return self.channels.get(channel)
+        ch = TimerChannel(self, channel, mode, pin)
+        self.channels[channel] = ch
+        return ch
+
+    def deinit(self):
+        self.callback(None)
+        self.channels.clear()
+
+def delay(ms):
+    clock.advance(1000*ms)
+
+def udelay(us):
+    clock.advance(us)
+
+def millis():
+    return clock.ticks_ms()
+
+def micros():
+    return clock.ticks_us()
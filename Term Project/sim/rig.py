@@ -0,0 +1,274 @@
+"""!
+@file sim/rig.py
+@brief Runs the Term Project tasks on the simulated ball balancing platform.
+@details A Rig builds the same drivers, shares and tasks as main.py on top of
+         the stand-in pyb module, connects them to a sim.plant.BallPlate and
+         runs them on the scheduler with a simulated clock. The user task is
+         left out, the gains and the closed loop flag are set through the
+         shares instead. The tasks themselves are the unmodified firmware.
+
+         Each Rig works in its own temporary folder holding the calibration
+         files, so the tasks skip their interactive calibration.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import asyncio
+import contextlib
+import io
+import math
+import os
+import sys
+import tempfile
+from array import array
+
+import sim
+
+class Rig:
+    '''!@brief The firmware tasks running on the simulated platform.
+    '''
+
+    def __init__(self, inner=(4, 0, 0), outer=(0.1, 0, 0), ball=(30, -20),
+                 noise=4, seed=None, sampler=True, plant=None, logPeriod=10_000,
+                 dropTime=200_000, quiet=True, schedule=None, estimator=None, fast=False, aio=False,
+                 pid=False, touchFilter=None):
+        '''!@brief Builds the drivers, the tasks and the plant.
+            @param inner Gains (Kp, Kd, Ki) of the inner loops.
+            @param outer Gains (Kp, Kd, Ki) of the outer loops.
+            @param ball Position (x, y) in mm where the ball is dropped on the
+                        panel, or None to leave the panel empty.
+            @param noise Standard deviation of the panel readings in counts.
+            @param seed Seed for the panel noise.
+            @param sampler True to read the IMU with BNO055.MotionSampler as
+                           main.py does, False to read it from the IMU task.
+            @param plant sim.plant.BallPlate to use, a default one when left
+                         as None.
+            @param logPeriod Time in microseconds between trace samples.
+            @param dropTime Time in microseconds after the start at which the
+                            ball is dropped. TTask only reports contact once
+                            the panel has been empty for ten scans, so the
+                            ball is put down after the tasks have started,
+                            as it is on the real platform.
+            @param quiet True to hide what the tasks print.
+            @param schedule gainsched.GainTable passed to the control task, or
+                            None for fixed inner loop gains.
+            @param estimator Estimator from the estimator module passed to the
+                             touchpad task, or None for its alpha-beta filter.
+            @param fast True to run the control step from a timer with a
+                        fastloop.FastLoop, as main.py does when FAST_LOOP is
+                        True, instead of the control and motor tasks. The
+                        IMU sampler is then not used.
+            @param aio True to run the tasks as aiotasks coroutines on a
+                       sim.aioloop.SimEventLoop instead of on the scheduler,
+                       as main.py does when ASYNC_TASKS is True.
+            @param pid Passed to the closedloop5.ClosedLoop controllers. False
+                       runs the control law main.py runs, in which only the
+                       proportional gains act.
+            @param touchFilter Tuple (mode, nmin, nmax, trim) passed to
+                               touchpad.Touchpad.set_filter(), or None for
+                               the fixed 25-sample mean main.py uses.
+        '''
+        clock = sim.install()
+        from sim import pyb
+        from sim.bno055 import FakeBNO055
+        from sim.panel import TouchPanel
+        from sim.plant import BallPlate
+        from sim.aioloop import SimEventLoop
+        import aiotasks
+        import BNO055
+        import closedloop5
+        import CTask5
+        import fastloop
+        from estimator import AlphaBeta
+        import IMUTask
+        import MTask5
+        import motor5
+        import scheduler
+        import shares
+        import touchpad
+        import TTask
+
+        self.clock = clock
+        self._dir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self._dir.name, 'IMU_cal_coeffs.txt'), 'w') as f:
+            f.write(','.join(22*['0']))
+        with open(os.path.join(self._dir.name, 'Touchpad_cal_coeffs.txt'), 'w') as f:
+            f.write('1,0,0,0,1,0')
+
+        pyb.reset()
+        self.bno = FakeBNO055().attach()
+        Pin = pyb.Pin
+        self.panel = TouchPanel(Pin.cpu.A7, Pin.cpu.A1, Pin.cpu.A6, Pin.cpu.A0, 176, 100,
+                                noise=noise, seed=seed)
+
+        # Drivers and shares as in main.py
+        motor_1 = motor5.Motor(3, Pin.cpu.B4, Pin.cpu.B5, 1, 2)
+        motor_2 = motor5.Motor(3, Pin.cpu.B0, Pin.cpu.B1, 3, 4)
+        self.motors = (motor_1, motor_2)
+        bno_obj = BNO055.BNO055()
+        self.imuSampler = BNO055.MotionSampler(bno_obj, 4, 100) if sampler and not fast else None
+        touch = touchpad.Touchpad(Pin.cpu.A7, Pin.cpu.A1, Pin.cpu.A6, Pin.cpu.A0, 176, 100)
+        if touchFilter is not None:
+            touch.set_filter(*touchFilter)
+        CLC_O1 = closedloop5.ClosedLoop(0, 0, 0, 0, 12, -12, pid)
+        CLC_O2 = closedloop5.ClosedLoop(0, 0, 0, 0, 12, -12, pid)
+        CLC_I1 = closedloop5.ClosedLoop(0, 0, 0, 0, 45, -45, pid)
+        CLC_I2 = closedloop5.ClosedLoop(0, 0, 0, 0, 45, -45, pid)
+        self.duty1 = shares.Share(0)
+        self.duty2 = shares.Share(0)
+        self.gains = [shares.Share(k) for k in tuple(inner) + tuple(outer)]
+        KpShare, KdShare, KiShare, KpOut, KdOut, KiOut = self.gains
+        self.yShare = shares.Share(0)
+        self.YSHARE = shares.Share(0)
+        self.yFlag = shares.Share(False)
+        self.wFlag = shares.Share(True)
+        dFlag = shares.Share(False)
+        DFlag = shares.Share(False)
+        self.eulAng = shares.ArrayShare(3)
+        self.gyrVel = shares.ArrayShare(3)
+        self.Pos = shares.ArrayShare(3)
+        self.abfShare = shares.ArrayShare(5)
+
+        self.sched = scheduler.Scheduler(clock)
+        self.fastLoop = None
+        if fast:
+            if estimator is None:
+                estimator = AlphaBeta(0.85, 0.005, 10_000)
+            tracker = TTask.BallTracker(estimator)
+            cascade = CTask5.Cascade((CLC_O1, CLC_I1, CLC_O2, CLC_I2), tuple(self.gains),
+                                     (self.yShare, self.YSHARE), self.yFlag, (self.duty1, self.duty2), schedule)
+            self.fastLoop = fastloop.FastLoop(5, 100, touch, tracker, bno_obj, cascade, self.motors,
+                                              self.abfShare, self.eulAng, self.gyrVel, self.wFlag)
+            imuReady = shares.Share(False)
+            touchReady = shares.Share(False)
+            tasks = (('Task Fast Loop', 2, fastloop.fastFunction('Task Fast Loop', 10_000, self.fastLoop,
+                                                                  (imuReady, touchReady), dFlag, DFlag)),
+                     ('Task IMU', 3, IMUTask.bnoFunction('Task IMU', 10_000, shares.Share((0, 0, 0, 0)), bno_obj,
+                                                         self.eulAng, self.gyrVel, None, imuReady)),
+                     ('Task Touchpad', 3, TTask.TouchpadFunction('Task Touchpad', 10_000, self.Pos, touch, 0.85, 0.005,
+                                                                 self.abfShare, estimator, self.eulAng, touchReady,
+                                                                 tracker)))
+        else:
+            tasks = (('Task Motors', 1, MTask5.motorsFunction('Task Motors', 10_000, (motor_1, motor_2),
+                                                              (self.duty1, self.duty2))),
+                     ('Task Motor Control', 2, CTask5.pipelineFunction('Task Motor Control', 10_000, CLC_O1, CLC_I1, CLC_O2, CLC_I2,
+                                                                       self.eulAng, self.gyrVel, self.abfShare, self.wFlag,
+                                                                       KpShare, KdShare, KiShare, KpOut, KdOut, KiOut,
+                                                                       self.duty1, self.duty2, self.yShare, self.YSHARE,
+                                                                       self.yFlag, dFlag, DFlag, schedule)),
+                     ('Task IMU', 3, IMUTask.bnoFunction('Task IMU', 10_000, shares.Share((0, 0, 0, 0)), bno_obj,
+                                                         self.eulAng, self.gyrVel, self.imuSampler)),
+                     ('Task Touchpad', 3, TTask.TouchpadFunction('Task Touchpad', 10_000, self.Pos, touch, 0.85, 0.005,
+                                                                 self.abfShare, estimator, self.eulAng)))
+        ## The scheduler.Task objects of the firmware tasks
+        self.tasks = [scheduler.Task(name, 10_000, priority, gen) for name, priority, gen in tasks]
+        self._loop = None
+        if aio:
+            self._loop = SimEventLoop(clock)
+            # Starts the coroutines, which keep running on the loop between runs
+            self._loop.run_until_complete(aiotasks.main(self.tasks, duration=0))
+        else:
+            for task in self.tasks:
+                self.sched.add(task)
+
+        self.plant = BallPlate() if plant is None else plant
+        self.plant.lift()
+        self.ball = ball
+        self.dropTime = dropTime
+        self.quiet = quiet
+        self.logPeriod = logPeriod
+        ## Samples of the time in s, the ball position in mm, the tilts in
+        #  degrees and the duty cycles in percent, keyed by name
+        self.trace = {name: array('f') for name in ('t', 'x', 'y', 'tilt1', 'tilt2', 'duty1', 'duty2')}
+        ## Time in s at which the ball fell off the panel, or None
+        self.fallTime = None
+        self._placed = False
+        self._start = clock.now
+
+    def _log(self):
+        '''!@brief Appends the plant state to the trace.
+        '''
+        plant = self.plant
+        trace = self.trace
+        t = (self.clock.now - self._start)*1e-6
+        if self._placed and not plant.onPlate and self.fallTime is None:
+            self.fallTime = t
+        trace['t'].append(t)
+        trace['x'].append(plant.pos[0])
+        trace['y'].append(plant.pos[1])
+        trace['tilt1'].append(plant.tilt[0])
+        trace['tilt2'].append(plant.tilt[1])
+        trace['duty1'].append(plant.duty[0])
+        trace['duty2'].append(plant.duty[1])
+
+    def run(self, duration):
+        '''!@brief Runs the tasks and the plant.
+            @param duration Simulated time in microseconds.
+            @return The Rig, so calls can be chained.
+        '''
+        clock = self.clock
+        cwd = os.getcwd()
+        os.chdir(self._dir.name)
+        self.plant.attach(clock, self.motors, self.bno, self.panel)
+        log = clock.add_event(self.logPeriod, self._log)
+        try:
+            with contextlib.redirect_stdout(io.StringIO() if self.quiet else sys.stdout):
+                if self.ball is not None and not self._placed:
+                    wait = self.dropTime - (clock.now - self._start)
+                    if 0 < wait < duration:
+                        self._run_tasks(wait)
+                        duration -= wait
+                        wait = 0
+                    if wait <= 0:
+                        self.plant.place(*self.ball)
+                        self._placed = True
+                self._run_tasks(duration)
+        finally:
+            clock.remove_event(log)
+            self.plant.detach()
+            os.chdir(cwd)
+        return self
+
+    def _run_tasks(self, duration):
+        '''!@brief Runs the tasks on the scheduler or the event loop.
+            @param duration Simulated time in microseconds.
+        '''
+        if self._loop is None:
+            self.sched.run(duration)
+        else:
+            self._loop.run_until_complete(asyncio.sleep(duration*1e-6))
+
+    def close(self):
+        '''!@brief Stops the IMU and control timers and removes the temporary folder.
+        '''
+        if self.imuSampler is not None:
+            self.imuSampler.stop()
+        if self.fastLoop is not None:
+            self.fastLoop.stop()
+        if self._loop is not None:
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+        self._dir.cleanup()
+
+    def cost(self, start=0):
+        '''!@brief Scores how well the ball was balanced.
+            @param start Time in seconds from which to score the trace.
+            @return RMS distance of the ball from the center in mm, or
+                    infinity if the ball fell off the panel.
+        '''
+        if not self.plant.onPlate:
+            return math.inf
+        trace = self.trace
+        total = 0
+        n = 0
+        for t, x, y in zip(trace['t'], trace['x'], trace['y']):
+            if t >= start:
+                total += x*x + y*y
+                n += 1
+        return math.sqrt(total/n) if n else math.inf
@@ -0,0 +1,13 @@
+"""!
+@file sim/ulab.py
+@brief Stand-in for the ulab module backed by numpy.
+@details The firmware imports numpy from ulab. On a PC the real numpy
+         provides the same calls.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import numpy
@@ -0,0 +1,178 @@
+"""!
+@file teledecode.py
+@brief Decodes telemetry streams from telemetry.py on the PC.
+@details Runs on the PC, it is not copied to the Nucleo. Frames are found by
+         their sync bytes and checked with their checksum, so the printed
+         user interface text between frames is skipped. Gaps in the
+         sequence numbers count frames lost on the way. The board restarts
+         the sequence number and the time whenever streaming is switched
+         on, so a frame with sequence number 0 and an earlier time than the
+         last frame starts a new session instead of a gap.
+
+         Decode a capture of the serial port into a CSV file, and optionally
+         a NumPy .npy file, with
+             python teledecode.py capture.bin Data.csv [--npy Data.npy]
+         or record straight from the board with pyserial installed:
+             python teledecode.py --port COM3 --seconds 20 Data.csv
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import argparse
+import struct
+import time
+
+# Frame layout of telemetry.py, which only imports on the board
+SYNC = b'\xa5\x5a'
+HEADER_SIZE = 10
+FIELDS = ('x', 'vx', 'y', 'vy', 'thx', 'omx', 'thy', 'omy', 'duty1', 'duty2')
+
+def fletcher16(buf, start, stop):
+    '''!@brief Returns the Fletcher-16 checksum of buf[start:stop].
+    '''
+    a = 0
+    b = 0
+    for i in range(start, stop):
+        a = (a + buf[i]) % 255
+        b = (b + a) % 255
+    return (b << 8) | a
+
+class Decoder:
+    '''!@brief Finds and checks frames in a byte stream fed in pieces.
+    '''
+
+    def __init__(self):
+        '''!@brief Creates a decoder with an empty input buffer.
+        '''
+        self._data = bytearray()
+        ## Number of frames with a bad checksum
+        self.bad = 0
+        ## Number of frames missing from the sequence numbers
+        self.lost = 0
+        ## Number of streaming sessions found
+        self.sessions = 0
+        self._seq = None
+        self._t = 0
+
+    def feed(self, data):
+        '''!@brief Adds bytes and returns the frames completed by them.
+            @param data Bytes read from the stream.
+            @return List of (seq, t, values) tuples with the time in
+                    microseconds and the float fields as a tuple.
+        '''
+        buf = self._data
+        buf += data
+        frames = []
+        i = 0
+        n = len(buf)
+        while True:
+            i = buf.find(SYNC, i)
+            if i < 0:
+                i = max(n - 1, 0)
+                break
+            if n - i < HEADER_SIZE:
+                break
+            nfields = buf[i + 2]
+            end = i + HEADER_SIZE + 4*nfields
+            if nfields == 0 or buf[i + 3] != 0:
+                i += 1
+                continue
+            if n < end + 2:
+                break
+            if struct.unpack_from('<H', buf, end)[0] != fletcher16(buf, i + 2, end):
+                self.bad += 1
+                i += 1
+                continue
+            t, seq = struct.unpack_from('<IH', buf, i + 4)
+            values = struct.unpack_from(f'<{nfields}f', buf, i + HEADER_SIZE)
+            if self._seq is None or (seq == 0 and t < self._t):
+                self.sessions += 1
+            elif seq != (self._seq + 1) & 0xFFFF:
+                self.lost += (seq - self._seq - 1) & 0xFFFF
+            self._seq = seq
+            self._t = t
+            frames.append((seq, t, values))
+            i = end + 2
+        del buf[:i]
+        return frames
+
+def decode(data):
+    '''!@brief Decodes a complete capture.
+        @param data Bytes of the capture.
+        @return Tuple of the list of frames and the Decoder, which holds the
+                bad and lost frame counts.
+    '''
+    decoder = Decoder()
+    return decoder.feed(data), decoder
+
+def to_arrays(frames):
+    '''!@brief Converts frames to NumPy arrays.
+        @return Tuple of the time in seconds and a two-dimensional array with
+                one row per frame and one column per field.
+    '''
+    import numpy as np
+    t = np.array([frame[1] for frame in frames], dtype=np.float64)*1e-6
+    values = np.array([frame[2] for frame in frames], dtype=np.float32)
+    return t, values
+
+def write_csv(frames, filename, header=True):
+    '''!@brief Writes frames to a CSV file.
+        @details The first column is the time in seconds, followed by the
+                 fields. Without the header and the duty columns the file
+                 has the same columns as the Data.csv written by UTask5.
+        @param frames List of frames from decode() or Decoder.feed().
+        @param filename Name of the CSV file.
+        @param header True to start the file with the column names.
+    '''
+    with open(filename, 'w') as f:
+        if header and frames:
+            names = FIELDS if len(frames[0][2]) == len(FIELDS) else [f'f{k}' for k in range(len(frames[0][2]))]
+            f.write('t,' + ','.join(names) + '\n')
+        for seq, t, values in frames:
+            f.write(f'{t*1e-6:.6f},' + ','.join(f'{v:.6g}' for v in values) + '\n')
+
+def record(port, seconds, baud=115200):
+    '''!@brief Reads frames from a serial port with pyserial.
+        @param port Name of the serial port.
+        @param seconds How long to record for.
+        @param baud Baud rate, ignored by the USB serial port.
+        @return Tuple of the list of frames and the Decoder.
+    '''
+    import serial
+    decoder = Decoder()
+    frames = []
+    stop = time.monotonic() + seconds
+    with serial.Serial(port, baud, timeout=0.1) as ser:
+        while time.monotonic() < stop:
+            frames.extend(decoder.feed(ser.read(4096)))
+    return frames, decoder
+
+def main(argv=None):
+    '''!@brief Command line entry point.
+    '''
+    parser = argparse.ArgumentParser(description='Decode telemetry frames to CSV.')
+    parser.add_argument('capture', nargs='?', help='binary capture of the serial port')
+    parser.add_argument('csv', help='CSV file to write')
+    parser.add_argument('--npy', help='also save the fields as a NumPy array with time in the first column')
+    parser.add_argument('--port', help='record from this serial port instead of a capture file')
+    parser.add_argument('--seconds', type=float, default=15)
+    args = parser.parse_args(argv)
+
+    if args.port:
+        frames, decoder = record(args.port, args.seconds)
+    else:
+        with open(args.capture, 'rb') as f:
+            frames, decoder = decode(f.read())
+    write_csv(frames, args.csv)
+    if args.npy:
+        import numpy as np
+        t, values = to_arrays(frames)
+        np.save(args.npy, np.column_stack((t, values)))
+    print(f'{len(frames)} frames in {decoder.sessions} sessions, {decoder.lost} lost, '
+          f'{decoder.bad} bad checksums')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""!
+@file telemetry.py
+@brief Binary telemetry frames streamed over the USB serial port.
+@details Each frame holds one sample of the platform state as float32
+         values, framed so that the PC can find frames in a stream that also
+         carries the printed user interface text. All values are little
+         endian:
+
+         | Offset   | Size  | Contents                                    |
+         |----------|-------|---------------------------------------------|
+         | 0        | 2     | Sync bytes 0xA5 0x5A                        |
+         | 2        | 1     | Number of float fields n                    |
+         | 3        | 1     | Flags, always 0                             |
+         | 4        | 4     | uint32 time in us since streaming started   |
+         | 8        | 2     | uint16 sequence number                      |
+         | 10       | 4n    | float32 fields                              |
+         | 10 + 4n  | 2     | uint16 Fletcher-16 checksum of bytes 2 to 9 + 4n |
+
+         The stream task sends the ten fields listed in FIELDS every period
+         while streaming is switched on, 52 bytes per frame. teledecode.py
+         decodes a capture on the PC.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import sys
+import struct
+import micropython
+from array import array
+from time import ticks_us, ticks_add, ticks_diff
+from TTask import ABF_X, ABF_VX, ABF_Y, ABF_VY
+from IMUTask import EUL_X, EUL_Y, GYR_X, GYR_Y
+
+## @brief First sync byte of a frame
+#
+SYNC0 = micropython.const(0xA5)
+
+## @brief Second sync byte of a frame
+#
+SYNC1 = micropython.const(0x5A)
+
+## @brief Number of bytes before the float fields
+#
+HEADER_SIZE = micropython.const(10)
+
+## @brief Names of the fields sent by streamFunction(), in frame order
+#  @details The first eight match the columns of Data.csv after the time.
+#
+FIELDS = ('x', 'vx', 'y', 'vy', 'thx', 'omx', 'thy', 'omy', 'duty1', 'duty2')
+
+## @brief Creates a state called S0_INIT
+#  @details Variable will be the state 0 for starting the program
+#
+S0_INIT = micropython.const(0)
+
+## @brief Creates a state called S1_WAIT
+#  @details Variable will be the state 1 for waiting for streaming to start
+#
+S1_WAIT = micropython.const(1)
+
+## @brief Creates a state called S2_STREAM
+#  @details Variable will be the state 2 for sending frames
+#
+S2_STREAM = micropython.const(2)
+
+if sys.implementation.name == 'micropython':
+
+    @micropython.viper
+    def _fletcher16(buf, start: int, stop: int) -> int:
+        '''!@brief Returns the Fletcher-16 checksum of buf[start:stop].
+        '''
+        p = ptr8(buf)
+        a = 0
+        b = 0
+        i = start
+        while i < stop:
+            a = (a + p[i]) % 255
+            b = (b + a) % 255
+            i += 1
+        return (b << 8) | a
+
+else:
+
+    def _fletcher16(buf, start, stop):
+        '''!@brief Returns the Fletcher-16 checksum of buf[start:stop].
+        '''
+        a = 0
+        b = 0
+        for i in range(start, stop):
+            a = (a + buf[i]) % 255
+            b = (b + a) % 255
+        return (b << 8) | a
+
+class Frame:
+    '''!@brief A preallocated telemetry frame.
+    '''
+
+    def __init__(self, nfields):
+        '''!@brief Creates the frame buffer.
+            @param nfields Number of float32 fields per frame.
+        '''
+        self.nfields = nfields
+        self.size = HEADER_SIZE + 4*nfields + 2
+        ## Bytes of the frame, written to the serial port as is
+        self.buf = bytearray(self.size)
+        self.buf[0] = SYNC0
+        self.buf[1] = SYNC1
+        self.buf[2] = nfields
+        self._end = HEADER_SIZE + 4*nfields
+
+    def pack(self, seq, t, values):
+        '''!@brief Fills the frame with one sample.
+            @param seq Sequence number, kept to 16 bits.
+            @param t Time in microseconds, kept to 32 bits.
+            @param values Sequence of at least nfields numbers.
+            @return The frame buffer.
+        '''
+        buf = self.buf
+        struct.pack_into('<IH', buf, 4, t & 0xFFFFFFFF, seq & 0xFFFF)
+        offset = HEADER_SIZE
+        for i in range(self.nfields):
+            struct.pack_into('<f', buf, offset, values[i])
+            offset += 4
+        struct.pack_into('<H', buf, self._end, _fletcher16(buf, 2, self._end))
+        return buf
+
+def streamFunction(taskName, period, ser, streamFlag, abfShare, eulAng, gyrVel, duty1, duty2):
+    '''! @brief Task that streams the platform state while streamFlag is set.
+         @details Sends one frame of FIELDS per period with USB_VCP.write().
+                  The time and sequence number restart every time streaming
+                  is switched on. The ball position and velocity along x are
+                  negated back to panel coordinates, as in Data.csv.
+         @param taskName Names the task so that multiple tasks can be run simultaneously.
+         @param period Passes in the period at which the code is run.
+         @param ser The USB_VCP object to write to.
+         @param streamFlag A shared parameter that is True while frames should be sent.
+         @param abfShare A shares.ArrayShare holding the filtered ball position and velocities.
+         @param eulAng A shares.ArrayShare containing the euler angles.
+         @param gyrVel A shares.ArrayShare containing the angular velocities.
+         @param duty1 A shared parameter holding the duty cycle of motor 1.
+         @param duty2 A shared parameter holding the duty cycle of motor 2.
+    '''
+
+    state = S0_INIT
+
+    start_time = ticks_us()
+
+    next_time = ticks_add(start_time, period)
+
+    frame = Frame(len(FIELDS))
+
+    values = [0.0]*len(FIELDS)
+
+    # Copies of the shares, which a fast loop may write between two reads
+    abf = array('f', abfShare.read())
+
+    eul = array('f', eulAng.read())
+
+    gyr = array('f', gyrVel.read())
+
+    seq = 0
+
+    t0 = 0
+
+    while True:
+
+        current_time = ticks_us()
+        if ticks_diff(current_time, next_time) >= 0:
+
+            if state == S0_INIT:
+                state = S1_WAIT
+
+            elif state == S1_WAIT:
+                if streamFlag.read():
+                    seq = 0
+                    t0 = current_time
+                    state = S2_STREAM
+
+            if state == S2_STREAM:
+                if not streamFlag.read():
+                    state = S1_WAIT
+                elif abfShare.snapshot(abf) >= 0 and eulAng.snapshot(eul) >= 0 and gyrVel.snapshot(gyr) >= 0:
+                    values[0] = -abf[ABF_X]
+                    values[1] = -abf[ABF_VX]
+                    values[2] = abf[ABF_Y]
+                    values[3] = abf[ABF_VY]
+                    values[4] = eul[EUL_X]
+                    values[5] = gyr[GYR_X]
+                    values[6] = eul[EUL_Y]
+                    values[7] = gyr[GYR_Y]
+                    values[8] = duty1.read()
+                    values[9] = duty2.read()
+                    ser.write(frame.pack(seq, ticks_diff(current_time, t0), values))
+                    seq += 1
+
+            next_time = ticks_add(next_time, period)
+
+            yield state
+
+        else:
+
+            yield None
@@ -0,0 +1,10 @@
+"""!
+@file tests/__init__.py
+@brief Tests run on a PC against the simulated board.
+@details Run from the Term Project folder with python -m pytest tests.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
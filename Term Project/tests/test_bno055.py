@@ -0,0 +1,56 @@
+"""!
+@file tests/test_bno055.py
+@brief Checks the burst read of BNO055.read_motion_into() on the simulated I2C bus.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import struct
+from array import array
+import pytest
+import sim
+
+sim.install()
+import BNO055
+from sim import pyb
+from sim.bno055 import FakeBNO055
+
+## @brief Raw gyro x, y, z and heading, roll, pitch register values in 1/16 units
+#
+RAW = ((0, 0, 0, 0, 0, 0),
+       (16, -16, 1, -1, 5760, -2880),
+       (-32768, 32767, -2, 32767, -32768, -7),
+       (255, 256, -256, -255, 128, -129))
+
+@pytest.fixture
+def imu():
+    '''!@brief A BNO055 driver reading a FakeBNO055 on a fresh bus.
+    '''
+    pyb.reset()
+    fake = FakeBNO055().attach()
+    return fake, BNO055.BNO055()
+
+@pytest.mark.parametrize('raw', RAW)
+def test_read_motion_matches_separate_reads(imu, raw):
+    '''!@brief The burst read decodes the registers like get_euler() and get_omega().
+    '''
+    fake, bno = imu
+    struct.pack_into('<6h', fake.regs, 0x14, *raw)
+    buf = array('f', 6*[0])
+    assert bno.read_motion_into(buf) is buf
+    assert tuple(buf[:3]) == bno.get_euler()
+    assert tuple(buf[3:]) == bno.get_omega()
+    gyr_x, gyr_y, gyr_z, head, roll, pitch = raw
+    assert tuple(buf) == (-head/16, -roll/16, -pitch/16, gyr_x/16, gyr_y/16, gyr_z/16)
+
+def test_negative_register_bytes(imu):
+    '''!@brief Register bytes with the top bit set read as negative values.
+    '''
+    fake, bno = imu
+    fake.regs[0x14:0x20] = bytes((0xFF, 0xFF, 0x00, 0x80, 0xF0, 0xFF,
+                                  0x10, 0x00, 0xE0, 0xFF, 0x00, 0xFF))
+    buf = bno.read_motion_into(array('f', 6*[0]))
+    assert tuple(buf) == (-1, 2, 16, -1/16, -2048, -1)
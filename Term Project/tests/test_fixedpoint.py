@@ -0,0 +1,106 @@
+"""!
+@file tests/test_fixedpoint.py
+@brief Checks the fixed point touchpad calibration against the float code.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import random
+from array import array
+import pytest
+import sim
+
+sim.install()
+import adcfilter
+import fixedpoint
+import touchpad
+from sim.panel import TouchPanel
+
+## @brief Touchpad pins used with the simulated panel
+#
+PINS = ('A7', 'A1', 'A6', 'A0')
+
+## @brief Calibrations checked, from none to gains of 1.6 with large offsets
+#
+CALS = ((1, 0, 0, 0, 1, 0), (1.07, -0.04, 2.3, 0.03, 0.96, -1.7), (1.6, 0.3, -8, -0.3, 1.6, 8))
+
+@pytest.mark.parametrize('K', CALS)
+def test_affine2_matches_float(K):
+    '''!@brief affine2() stays within 0.05 mm of the float formula over the ADC range.
+    '''
+    coef = fixedpoint.cal_coeffs(K, 176/4096, 100/4096, 88, 50, 25, array('i', 6*[0]))
+    pos = array('i', 2*[0])
+    top = 25*fixedpoint.ADC_MAX
+    rand = random.Random(1)
+    sums = [(0, 0), (0, top), (top, 0), (top, top)]
+    sums += [(rand.randrange(0, top + 1), rand.randrange(0, top + 1)) for k in range(2000)]
+    for sx, sy in sums:
+        fixedpoint.affine2(coef, sx, sy, pos)
+        xsc = sx/25*176/4096 - 88
+        ysc = sy/25*100/4096 - 50
+        assert pos[0]*fixedpoint.POS_LSB == pytest.approx(K[0]*xsc + K[1]*ysc + K[2], abs=0.05)
+        assert pos[1]*fixedpoint.POS_LSB == pytest.approx(K[3]*xsc + K[4]*ysc + K[5], abs=0.05)
+        assert abs(coef[0]*sx + coef[1]*sy + coef[2]) < 2**31
+        assert abs(coef[3]*sx + coef[4]*sy + coef[5]) < 2**31
+
+@pytest.mark.parametrize('K', ((4.5, 0, 0, 0, 1, 0), (1, 0, 0, 3, -5, 0), (1, 0, 1e6, 0, 1, 0)))
+def test_cal_coeffs_rejects_overflow(K):
+    '''!@brief cal_coeffs() refuses gains whose products overflow and keeps coef.
+    '''
+    coef = array('i', range(6))
+    with pytest.raises(ValueError):
+        fixedpoint.cal_coeffs(K, 176/4096, 100/4096, 88, 50, 25, coef)
+    assert list(coef) == list(range(6))
+
+def test_fixed_touchpad_keeps_calibration_on_overflow():
+    '''!@brief A rejected calibration leaves the touchpad calibration unchanged.
+    '''
+    touch = touchpad.Touchpad(*PINS, 176, 100, fixed=True)
+    touch.set_cal_coeff(*CALS[1])
+    with pytest.raises(ValueError):
+        touch.set_cal_coeff(4.5, 0, 0, 0, 1, 0)
+    assert (touch.Kxx, touch.Kxy, touch.xo, touch.Kyx, touch.Kyy, touch.yo) == CALS[1]
+
+@pytest.mark.parametrize('mode', (None, adcfilter.TRIMMED))
+def test_touchpad_modes_agree(mode):
+    '''!@brief The fixed and float touchpads read the same noiseless panel to 0.05 mm.
+    '''
+    panel = TouchPanel(*PINS, 176, 100)
+    touches = (touchpad.Touchpad(*PINS, 176, 100), touchpad.Touchpad(*PINS, 176, 100, fixed=True))
+    bufs = (array('f', 3*[0]), array('f', 3*[0]))
+    for touch in touches:
+        touch.set_cal_coeff(*CALS[1])
+        touch.set_filter(mode, 8, 25)
+    rand = random.Random(2)
+    for k in range(200):
+        panel.contact = (rand.uniform(-80, 80), rand.uniform(-45, 45))
+        touches[0].scan_into(bufs[0])
+        touches[1].scan_into(bufs[1])
+        assert bufs[1][0] == pytest.approx(bufs[0][0], abs=0.05)
+        assert bufs[1][1] == pytest.approx(bufs[0][1], abs=0.05)
+        assert bufs[1][2] == bufs[0][2]
+
+@pytest.mark.parametrize('K', ((4.5, 0, 0, 0, 1, 0), CALS[1]))
+def test_touchpad_task_loads_any_saved_calibration(K, tmp_path, monkeypatch):
+    '''!@brief The touchpad task uses float positions for a saved calibration too large
+               for fixed point instead of stopping, and keeps fixed point otherwise.
+    '''
+    import shares
+    import TTask
+    clock = sim.install()
+    monkeypatch.chdir(tmp_path)
+    with open('Touchpad_cal_coeffs.txt', 'w') as f:
+        f.write(','.join(str(k) for k in K))
+    touch = touchpad.Touchpad(*PINS, 176, 100, fixed=True)
+    task = TTask.TouchpadFunction('Task Touchpad', 10_000, shares.ArrayShare(3), touch,
+                                  0.85, 0.005, shares.ArrayShare(5))
+    states = []
+    for k in range(4):
+        clock.advance(10_000)
+        states.append(next(task))
+    assert states[-1] == TTask.S1_RUN
+    assert (touch.Kxx, touch.Kxy, touch.xo, touch.Kyx, touch.Kyy, touch.yo) == K
+    assert touch.fixed == (K == CALS[1])
@@ -0,0 +1,70 @@
+"""!
+@file tests/test_logwriter.py
+@brief Checks the row formatting and buffering of logwriter.LogWriter.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import pytest
+import sim
+
+sim.install()
+import logwriter
+from logwriter import LogWriter, _put_fixed
+
+@pytest.mark.parametrize('n, decimals, text', ((1234, 2, b'12.34'), (-1234, 2, b'-12.34'),
+                                               (5, 2, b'0.05'), (-5, 3, b'-0.005'),
+                                               (0, 2, b'0.00'), (7, 0, b'7'), (-70, 0, b'-70')))
+def test_put_fixed(n, decimals, text):
+    '''!@brief _put_fixed() writes the sign, leading zero and decimal point.
+    '''
+    buf = bytearray(16)
+    end = _put_fixed(buf, 1, n, decimals)
+    assert bytes(buf[1:end]) == text
+
+@pytest.fixture
+def log(tmp_path):
+    '''!@brief A LogWriter on a temporary file, closed after the test.
+    '''
+    log = LogWriter(str(tmp_path / 'Data.csv'), 'w', size=128, page=16)
+    yield log
+    log.close()
+
+def test_write_row_rounds_half_away_from_zero(log):
+    '''!@brief Values are rounded to the decimals with the sign kept.
+    '''
+    row = log.write_row((1.5, -1.5, 0.125, -0.126, 0.004))
+    assert bytes(row) == b'1.50,-1.50,0.13,-0.13,0.00,\n'
+
+def test_write_row_falls_back_to_text(log):
+    '''!@brief Values too large for fixed point, inf and nan are written as text.
+    '''
+    big = (logwriter.FIXED_MAX + 1)/100
+    row = log.write_row((1e9, -2.5e12, big, float('inf'), float('-inf'), float('nan')), end='\n')
+    assert bytes(row).split(b',') == [b'1e+09', b'-2.5e+12', b'1.07374e+07', b'inf', b'-inf', b'nan\n']
+
+def test_room_compacts_pending_bytes(tmp_path):
+    '''!@brief Pending bytes move to the front when that frees room at the end.
+    '''
+    name = str(tmp_path / 'Data.csv')
+    log = LogWriter(name, 'w', size=64, page=16)
+    assert log.write(40*b'a')
+    assert log.service() == 8
+    assert log.write(30*b'b')
+    assert log._start == 0
+    assert bytes(log.buf[:38]) == 8*b'a' + 30*b'b'
+    log.close()
+    with open(name, 'rb') as f:
+        assert f.read() == 40*b'a' + 30*b'b'
+
+def test_room_refuses_overlapping_move(log):
+    '''!@brief A move onto the pending bytes themselves is refused and nothing is lost.
+    '''
+    assert log.write(120*b'a')
+    assert log.service(budget=-1) == 104
+    assert not log.write(10*b'b')
+    assert log.write_row((1, 2)) is None
+    assert log.pending() == 104
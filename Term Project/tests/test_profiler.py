@@ -0,0 +1,38 @@
+"""!
+@file tests/test_profiler.py
+@brief Checks the lateness recorded by profiler.TaskProfiler.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+from profiler import TaskProfiler
+from sim.clock import SimClock
+
+def periodic(clock, period):
+    '''!@brief Generator task with the period logic of the firmware tasks.
+    '''
+    next_time = clock.ticks_add(clock.ticks_us(), period)
+    while True:
+        if clock.ticks_diff(clock.ticks_us(), next_time) >= 0:
+            next_time = clock.ticks_add(next_time, period)
+            yield 1
+        else:
+            yield None
+
+def test_late_first_run_is_measured():
+    '''!@brief A late first run counts as late and later runs keep the scheduled release.
+    '''
+    clock = SimClock()
+    prof = TaskProfiler('task', 10_000, clock=clock)
+    gen = prof.wrap(periodic(clock, 10_000))
+    assert next(gen) is None
+    clock.advance(13_000)
+    assert next(gen) == 1
+    assert prof.lateMax == 3_000
+    clock.advance(7_000)
+    assert next(gen) == 1
+    assert prof.runs == 2
+    assert prof.lateSum == 3_000
@@ -0,0 +1,58 @@
+"""!
+@file tests/test_scheduler.py
+@brief Checks the order in which scheduler.Scheduler resumes tasks.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import pytest
+from scheduler import Scheduler, Task
+from sim.clock import SimClock
+
+def periodic(clock, period, name, log):
+    '''!@brief Generator task that logs its name each period, as the firmware tasks do.
+    '''
+    next_time = clock.ticks_add(clock.ticks_us(), period)
+    while True:
+        if clock.ticks_diff(clock.ticks_us(), next_time) >= 0:
+            log.append(name)
+            next_time = clock.ticks_add(next_time, period)
+            yield 1
+        else:
+            yield None
+
+def test_empty_scheduler_raises():
+    '''!@brief Stepping without tasks raises instead of failing on the empty heap.
+    '''
+    sched = Scheduler(SimClock())
+    with pytest.raises(RuntimeError):
+        sched.step()
+
+def test_priority_orders_staggered_tasks():
+    '''!@brief Tasks added a few microseconds apart run in priority order every period.
+    '''
+    clock = SimClock()
+    sched = Scheduler(clock)
+    log = []
+    for name, priority in (('motor', 1), ('control', 2), ('sensor', 3)):
+        sched.add(Task(name, 10_000, priority, periodic(clock, 10_000, name, log)))
+        clock.advance(5)
+    sched.run(100_000)
+    assert len(log) >= 27
+    assert log[:27] == 9*['sensor', 'control', 'motor']
+    assert all(task.early == 0 for task in sched.tasks)
+
+def test_later_task_waits_for_earlier():
+    '''!@brief A higher priority task due more than one retry later does not jump ahead.
+    '''
+    clock = SimClock()
+    sched = Scheduler(clock)
+    log = []
+    sched.add(Task('low', 10_000, 0, periodic(clock, 10_000, 'low', log)))
+    clock.advance(500)
+    sched.add(Task('high', 10_000, 5, periodic(clock, 10_000, 'high', log)))
+    sched.run(35_000)
+    assert log[:6] == 3*['low', 'high']
@@ -0,0 +1,124 @@
+"""!
+@file tests/test_shares.py
+@brief Checks the circular queue and the array share of shares.py.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+from array import array
+import pytest
+from shares import ArrayShare, RingQueue
+
+def test_empty():
+    '''!@brief An empty queue has no items and get() raises.
+    '''
+    q = RingQueue(4)
+    assert q.num_in() == 0
+    assert not q.full()
+    with pytest.raises(IndexError):
+        q.get()
+    assert q.get_into(array('f', 4*[0])) == 0
+
+def test_wrap_around():
+    '''!@brief Items come out in order while head and tail wrap many times.
+    '''
+    q = RingQueue(3, 'i')
+    out = []
+    for k in range(10):
+        q.put(2*k)
+        q.put(2*k + 1)
+        out.append(q.get())
+        out.append(q.get())
+    assert out == list(range(20))
+    assert q.num_in() == 0
+
+def test_full_rejects():
+    '''!@brief A full queue rejects new items and counts them.
+    '''
+    q = RingQueue(3, 'i')
+    assert [q.put(k) for k in range(5)] == [True, True, True, False, False]
+    assert q.full()
+    assert q.dropped == 2
+    assert [q.get() for k in range(3)] == [0, 1, 2]
+
+def test_full_overwrites():
+    '''!@brief A full queue in overwrite mode keeps the newest items.
+    '''
+    q = RingQueue(3, 'i', overwrite=True)
+    for k in range(7):
+        assert q.put(k)
+    assert q.full()
+    assert q.dropped == 4
+    assert [q.get() for k in range(3)] == [4, 5, 6]
+
+def test_bulk():
+    '''!@brief put_many() stops at capacity and get_into() copies across the wrap.
+    '''
+    q = RingQueue(5, 'i')
+    q.put_many(array('i', (0, 1, 2)))
+    assert q.get() == 0 and q.get() == 1
+    assert q.put_many(range(10, 20), 6) == 4
+    buf = array('i', 8*[0])
+    assert q.get_into(buf, 3) == 3
+    assert list(buf[:3]) == [2, 10, 11]
+    assert q.get_into(buf) == 2
+    assert list(buf[:2]) == [12, 13]
+    q.put(7)
+    q.clear()
+    assert q.num_in() == 0
+
+class InterruptedBuffer(list):
+    '''!@brief Snapshot buffer whose first writes let an "interrupt" write the share.
+    '''
+
+    def __init__(self, size, share, writes):
+        super().__init__(size*[0])
+        self.share = share
+        self.writes = writes
+
+    def __setitem__(self, i, value):
+        super().__setitem__(i, value)
+        if i == 0 and self.writes:
+            self.writes -= 1
+            self.share.write((9, 9, 9))
+
+def test_write_in_place():
+    '''!@brief A write fills the same array and advances seq by two.
+    '''
+    share = ArrayShare(3)
+    buf = share.read()
+    seq = share.seq()
+    share.write((1, 2, 3))
+    assert share.read() is buf
+    assert share.begin_write() is buf
+    share.end_write()
+    assert list(buf) == [1, 2, 3]
+    assert share.seq() == seq + 4
+
+def test_snapshot_during_write():
+    '''!@brief A snapshot taken while a write is open fails after its tries.
+    '''
+    share = ArrayShare(3)
+    share.write((1, 2, 3))
+    share.begin_write()[0] = 7
+    assert share.seq() & 1
+    buf = array('f', 3*[0])
+    assert share.snapshot(buf, tries=4) == -1
+    assert list(buf) == [0, 0, 0]
+    share.end_write()
+    assert share.snapshot(buf) == share.seq()
+    assert list(buf) == [7, 2, 3]
+
+def test_snapshot_detects_interrupting_write():
+    '''!@brief A write between the two seq reads is detected and the copy retried.
+    '''
+    share = ArrayShare(3)
+    share.write((1, 2, 3))
+    buf = InterruptedBuffer(3, share, 1)
+    assert share.snapshot(buf) == share.seq()
+    assert buf == [9, 9, 9]
+    buf = InterruptedBuffer(3, share, 3)
+    assert share.snapshot(buf, tries=3) == -1
@@ -0,0 +1,60 @@
+"""!
+@file tests/test_teledecode.py
+@brief Checks that teledecode.Decoder reads back the frames of telemetry.Frame.
+
+@author Baxter Bartlett
+@author Nick DeSimone
+@author Miles Ibarra
+@date 10-18-26
+"""
+
+import sim
+
+sim.install()
+import telemetry
+from teledecode import Decoder
+
+def session(frame, first, count, period=10_000):
+    '''!@brief Returns the bytes of count frames starting at sequence number first.
+    '''
+    data = bytearray()
+    for k in range(count):
+        seq = first + k
+        data += frame.pack(seq, k*period, [seq + i/10 for i in range(frame.nfields)])
+    return data
+
+def test_two_sessions_with_text_and_corruption():
+    '''!@brief Frames are found between UI text, a corrupted one is dropped, and a
+               restart of streaming is not counted as lost frames.
+    '''
+    frame = telemetry.Frame(len(telemetry.FIELDS))
+    data = bytearray(b'Streaming on\r\n')
+    data += session(frame, 0, 10)
+    # Corrupt a value in the frame with sequence number 4
+    data[14 + 4*frame.size + telemetry.HEADER_SIZE + 2] ^= 0x10
+    data += b'Streaming off\r\nKp: 4\r\nStreaming on\r\n'
+    data += session(frame, 0, 5)
+    decoder = Decoder()
+    frames = []
+    for i in range(0, len(data), 37):
+        frames.extend(decoder.feed(data[i:i + 37]))
+    assert [f[0] for f in frames] == [0, 1, 2, 3, 5, 6, 7, 8, 9, 0, 1, 2, 3, 4]
+    assert decoder.bad == 1
+    assert decoder.lost == 1
+    assert decoder.sessions == 2
+    seq, t, values = frames[4]
+    assert t == 50_000
+    assert values[0] == 5 and abs(values[9] - 5.9) < 1e-6
+
+def test_sequence_wrap_is_one_session():
+    '''!@brief A sequence number wrapping to 0 while the time runs on is not a new session.
+    '''
+    frame = telemetry.Frame(2)
+    data = bytearray(frame.pack(0xFFFF, 100, (1, 2)))
+    data += frame.pack(0x10000, 200, (3, 4))
+    data += frame.pack(0x10002, 300, (5, 6))
+    decoder = Decoder()
+    frames = decoder.feed(data)
+    assert [f[0] for f in frames] == [0xFFFF, 0, 2]
+    assert decoder.sessions == 1
+    assert decoder.lost == 1
@@ -32,6 +32,8 @@ from math import pi
 from time import ticks_us, ticks_diff
 import micropython
 from array import array
+import adcfilter
+import fixedpoint
 
 class Touchpad:
     '''!@brief      Contains methods to obtain values from the touchpad.
@@ -40,7 +42,7 @@ class Touchpad:
     '''
     
     @micropython.native
-    def __init__ (self, xpPin, xmPin, ypPin, ymPin, xwidth, ylength):
+    def __init__ (self, xpPin, xmPin, ypPin, ymPin, xwidth, ylength, fixed=False):
         
         '''! @brief Creates the initial setup for the touchpad
              @details Sets up all the pins associated with the touchpad
@@ -50,6 +52,10 @@ class Touchpad:
              @param ymPin A pin used the negative y terminal of the touchpad.
              @param xwidth A value used for the physical width of the pad.
              @param ylength A value used for the physical length of the pad.
+             @param fixed True to compute the calibrated position from the
+                          ADC sums with fixedpoint.affine2() instead of in
+                          float. Readings of set_filter() filters are first
+                          scaled to the sum of 25 samples.
         '''
         
         self.xpPin = xpPin
@@ -74,6 +80,25 @@ class Touchpad:
         self._buf = array('h',25*[0])
         self._freq = micropython.const(200000)
         self._avgdiv = micropython.const(25)
+        # Pin and ADC objects reused by scan_into(), which only changes
+        # the pin modes instead of creating new objects on every scan
+        self.ANALOG = Pin.ANALOG
+        self._xp = Pin(xpPin, self.IN)
+        self._yp = Pin(ypPin, self.IN)
+        self._xm = Pin(xmPin)
+        self._ym = Pin(ymPin)
+        self._xmADC = ADC(self._xm)
+        self._ymADC = ADC(self._ym)
+        # Optional filters used by scan_into() in place of the 25-sample mean
+        self.xfilt = None
+        self.yfilt = None
+        self.fixed = fixed
+        # Calibration folded into integers by fixedpoint.cal_coeffs()
+        self._coef = array('i', 6*[0])
+        self._pos = array('i', 2*[0])
+        self._sx = 0
+        self._sy = 0
+        self.set_cal_coeff(1, 0, 0, 0, 1, 0)
 
     @micropython.native
     def xScan(self):
@@ -96,7 +121,8 @@ class Touchpad:
         
         ym_rt = ym.read_timed(self._buf, self._freq)
         
-        ym_filt = sum(self._buf)/self._avgdiv
+        self._sx = sum(self._buf)
+        ym_filt = self._sx/self._avgdiv
     
         self.xADC = ym_filt*self.xscale - self.xc
         return self.xADC
@@ -123,7 +149,8 @@ class Touchpad:
         
         xm_rt = xm.read_timed(self._buf, self._freq)
         
-        xm_filt = sum(self._buf)/self._avgdiv
+        self._sy = sum(self._buf)
+        xm_filt = self._sy/self._avgdiv
         
         self.yADC = xm_filt*self.yscale - self.yc
         return self.yADC
@@ -166,17 +193,127 @@ class Touchpad:
         xsc = self.xScan()
         self.zScan()
         ysc = self.yScan()
-        self.x = self.Kxx*xsc + self.Kxy*ysc + self.xo
-        self.y = self.Kyx*xsc + self.Kyy*ysc + self.yo
+        if self.fixed:
+            fixedpoint.affine2(self._coef, self._sx, self._sy, self._pos)
+            self.x = self._pos[0]*fixedpoint.POS_LSB
+            self.y = self._pos[1]*fixedpoint.POS_LSB
+        else:
+            self.x = self.Kxx*xsc + self.Kxy*ysc + self.xo
+            self.y = self.Kyx*xsc + self.Kyy*ysc + self.yo
         return(self.x, self.y, self.z)
         
+    @micropython.native
+    def scan_into(self, buf):
+        
+        '''! @brief Fast scan of the ball position into a caller-provided buffer.
+             @details Reuses the pin and ADC objects made in the constructor and
+                      switches pin modes with init(). The z scan runs first and
+                      the x and y scans are skipped when the ball is not in
+                      contact, in which case the x and y entries of buf keep
+                      their previous values. The scans are ordered so that
+                      only the pins that change are reconfigured.
+             @param buf A preallocated buffer of three values that receives
+                        the calibrated x and y positions in mm and z.
+             @return buf
+        '''
+        xp = self._xp
+        xm = self._xm
+        yp = self._yp
+        ym = self._ym
+        
+        # z scan: yp high, xm low, xp floating, read ym
+        yp.init(self.OUT, value=1)
+        xm.init(self.OUT, value=0)
+        xp.init(self.IN)
+        ym.init(self.ANALOG)
+        if self._ymADC.read() >= 4050:
+            self.z = 0
+            buf[2] = 0
+            if self.xfilt is not None:
+                self.xfilt.reset()
+                self.yfilt.reset()
+            return buf
+        self.z = 1
+        
+        # x scan: xp high, xm still low, yp floating, ym still read
+        xp.init(self.OUT, value=1)
+        yp.init(self.IN)
+        if self.xfilt is None:
+            self._ymADC.read_timed(self._buf, self._freq)
+            sx = sum(self._buf)
+        else:
+            samples = self.xfilt.buffer()
+            self._ymADC.read_timed(samples, self._freq)
+            xf = self.xfilt.apply(len(samples))
+            # Filtered counts are scaled to a 25-sample sum for affine2()
+            sx = int(xf*self._avgdiv + 0.5)
+        
+        # y scan: yp high, ym low, xp floating, read xm
+        yp.init(self.OUT, value=1)
+        ym.init(self.OUT, value=0)
+        xp.init(self.IN)
+        xm.init(self.ANALOG)
+        if self.yfilt is None:
+            self._xmADC.read_timed(self._buf, self._freq)
+            sy = sum(self._buf)
+        else:
+            samples = self.yfilt.buffer()
+            self._xmADC.read_timed(samples, self._freq)
+            yf = self.yfilt.apply(len(samples))
+            sy = int(yf*self._avgdiv + 0.5)
+        
+        if self.fixed:
+            fixedpoint.affine2(self._coef, sx, sy, self._pos)
+            self.x = self._pos[0]*fixedpoint.POS_LSB
+            self.y = self._pos[1]*fixedpoint.POS_LSB
+        else:
+            if self.xfilt is None:
+                xsc = sx/self._avgdiv*self.xscale - self.xc
+            else:
+                xsc = xf*self.xscale - self.xc
+            if self.yfilt is None:
+                ysc = sy/self._avgdiv*self.yscale - self.yc
+            else:
+                ysc = yf*self.yscale - self.yc
+            self.x = self.Kxx*xsc + self.Kxy*ysc + self.xo
+            self.y = self.Kyx*xsc + self.Kyy*ysc + self.yo
+        buf[0] = self.x
+        buf[1] = self.y
+        buf[2] = 1
+        return buf
+        
+    def set_filter(self, mode, nmin=25, nmax=25, trim=2):
+        
+        '''! @brief Selects the filter used by scan_into() for the x and y readings.
+             @details Creates one adcfilter.ADCFilter per axis. The number of
+                      samples adapts between nmin and nmax to the recent
+                      variance of each reading.
+             @param mode adcfilter.MEAN, adcfilter.MEDIAN or adcfilter.TRIMMED,
+                         or None for the fixed 25-sample mean.
+             @param nmin Number of samples taken while the ball is settled.
+             @param nmax Number of samples taken while the ball is moving.
+             @param trim Number of samples dropped from each end for TRIMMED.
+        '''
+        if mode is None:
+            self.xfilt = None
+            self.yfilt = None
+        else:
+            self.xfilt = adcfilter.ADCFilter(mode, nmin, nmax, trim)
+            self.yfilt = adcfilter.ADCFilter(mode, nmin, nmax, trim)
+        
     @micropython.native
     def set_cal_coeff(self, Kxx, Kxy, xo, Kyx, Kyy, yo):
         
         '''! @brief Sets values for calibration coefficients.
              @details Calculated values for the calibration coefficients computed
                       in TTask using the matricies.
+             @exception ValueError The touchpad is fixed and the gains are too
+                                   large for fixedpoint.affine2(). The old
+                                   coefficients are kept.
         '''
+        if self.fixed:
+            fixedpoint.cal_coeffs((Kxx, Kxy, xo, Kyx, Kyy, yo), self.xscale, self.yscale,
+                                  self.xc, self.yc, self._avgdiv, self._coef)
         self.Kxx = Kxx
         self.Kxy = Kxy
         self.xo = xo
@@ -197,4 +334,13 @@ if __name__ == '__main__':
 #    print(t1)
 #    print(t2)
     t = utime.ticks_diff(t2, t1)/100
-    print(f'Run time for all 3 Scans: {t} microseconds')
\ No newline at end of file
+    print(f'Run time for all 3 Scans: {t} microseconds')
+    buf = array('f', 3*[0])
+    n = 0
+    t1 = utime.ticks_us()
+    while n < 100:
+        x.scan_into(buf)
+        n += 1
+    t2 = utime.ticks_us()
+    t = utime.ticks_diff(t2, t1)/100
+    print(f'Run time for the fast scan: {t} microseconds')
\ No newline at end of file